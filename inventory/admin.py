@@ -11,13 +11,13 @@ class InventoryAccessoryAdmin(admin.ModelAdmin):
 
 @admin.register(Packaging)
 class PackagingAdmin(admin.ModelAdmin):
-    list_display = ['name', 'minimum_quantity', 'price', 'delivery_time_days', 'updated_at']
+    list_display = ['name', 'minimum_quantity', 'price', 'delivery_time_days', 'quantity_per_piece', 'updated_at']
     search_fields = ['name']
     list_filter = ['created_at', 'updated_at']
 
 
 @admin.register(Gift)
 class GiftAdmin(admin.ModelAdmin):
-    list_display = ['name', 'minimum_quantity', 'price', 'delivery_time_days', 'updated_at']
+    list_display = ['name', 'minimum_quantity', 'price', 'delivery_time_days', 'quantity_per_piece', 'updated_at']
     search_fields = ['name']
     list_filter = ['created_at', 'updated_at']
@@ -7,6 +7,8 @@ class Migration(migrations.Migration):
 
     dependencies = [
         ('inventory', '0002_inventorypiece_has_variations_inventorypiece_stock_g_and_more'),
+        # Piece.tiny_erp_piece points at InventoryPiece until this migration
+        ('store_collections', '0006_remove_piece_tiny_erp_piece_piece_tiny_parent_id_and_more'),
     ]
 
     operations = [
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_delete_inventorypiece'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gift',
+            name='quantity_per_piece',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='Units used per produced piece in the replenishment plan (0 = not planned)', max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='packaging',
+            name='quantity_per_piece',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='Units used per produced piece in the replenishment plan (0 = not planned)', max_digits=8),
+        ),
+    ]
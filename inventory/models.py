@@ -25,6 +25,12 @@ class Packaging(models.Model):
     minimum_quantity = models.PositiveIntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     delivery_time_days = models.PositiveIntegerField(help_text="Delivery time in business days")
+    quantity_per_piece = models.DecimalField(
+        max_digits=8,
+        decimal_places=3,
+        default=0,
+        help_text="Units used per produced piece in the replenishment plan (0 = not planned)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -43,6 +49,12 @@ class Gift(models.Model):
     minimum_quantity = models.PositiveIntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     delivery_time_days = models.PositiveIntegerField(help_text="Delivery time in business days")
+    quantity_per_piece = models.DecimalField(
+        max_digits=8,
+        decimal_places=3,
+        default=0,
+        help_text="Units used per produced piece in the replenishment plan (0 = not planned)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -4,7 +4,12 @@ from .models import (
     PieceSalesStatistics,
     CollectionSalesStatistics,
     FabricSalesStatistics,
-    SalesForecast
+    SalesForecast,
+    VariantSalesMetrics,
+    ReplenishmentRun,
+    ReplenishmentLine,
+    ReplenishmentFabricLine,
+    ReplenishmentMaterialLine
 )
 
 
@@ -13,6 +18,8 @@ class SalesDataAdmin(admin.ModelAdmin):
     list_display = [
         'piece_name',
         'piece_sku',
+        'piece',
+        'size',
         'sale_date',
         'quantity_sold',
         'unit_price',
@@ -20,12 +27,15 @@ class SalesDataAdmin(admin.ModelAdmin):
         'last_synced'
     ]
     search_fields = ['piece_name', 'piece_sku', 'external_id']
-    list_filter = ['sale_date', 'last_synced']
+    list_filter = ['sale_date', 'last_synced', 'size']
     readonly_fields = [
         'external_id',
         'sale_date',
         'piece_sku',
         'piece_name',
+        'tiny_product_id',
+        'piece',
+        'size',
         'quantity_sold',
         'unit_price',
         'total_amount',
@@ -147,6 +157,33 @@ class FabricSalesStatisticsAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(VariantSalesMetrics)
+class VariantSalesMetricsAdmin(admin.ModelAdmin):
+    list_display = [
+        'piece',
+        'size',
+        'units_sold_7d',
+        'units_sold_30d',
+        'units_sold_120d',
+        'daily_velocity',
+        'current_stock',
+        'days_of_cover',
+        'sell_through',
+        'last_movement_date'
+    ]
+    search_fields = ['piece__name', 'piece__collection__name']
+    list_filter = ['size', 'piece__launch_status', 'piece__collection', 'last_movement_date']
+    list_select_related = ['piece']
+    ordering = ['days_of_cover']
+
+    def has_add_permission(self, request):
+        # Calculated from the stock history
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(SalesForecast)
 class SalesForecastAdmin(admin.ModelAdmin):
     list_display = [
@@ -185,3 +222,62 @@ class SalesForecastAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+class ReplenishmentFabricLineInline(admin.TabularInline):
+    model = ReplenishmentFabricLine
+    extra = 0
+    can_delete = False
+    readonly_fields = ['fabric', 'fabric_name', 'fabric_color', 'm2_needed', 'rolls', 'surplus_m2', 'cost']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class ReplenishmentLineInline(admin.TabularInline):
+    model = ReplenishmentLine
+    extra = 0
+    can_delete = False
+    readonly_fields = ['piece', 'piece_name', 'fabric_label', 'launch_status', 'size', 'needed', 'surplus', 'quantity']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class ReplenishmentMaterialLineInline(admin.TabularInline):
+    model = ReplenishmentMaterialLine
+    extra = 0
+    can_delete = False
+    readonly_fields = [
+        'kind', 'item_id', 'item_name', 'needed', 'minimum_quantity', 'order_quantity', 'unit_price', 'cost',
+        'delivery_time_days'
+    ]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReplenishmentRun)
+class ReplenishmentRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'status',
+        'window_days',
+        'minimum_stock',
+        'total_pieces',
+        'total_cost',
+        'requested_by',
+        'created_at',
+        'finished_at'
+    ]
+    list_filter = ['status', 'created_at']
+    readonly_fields = [
+        'status', 'window_days', 'minimum_stock', 'optimize_rolls', 'data_version', 'fabric_cost', 'production_cost',
+        'materials_cost', 'total_cost', 'total_pieces', 'error', 'requested_by', 'created_at', 'started_at', 'finished_at'
+    ]
+    inlines = [ReplenishmentFabricLineInline, ReplenishmentMaterialLineInline, ReplenishmentLineInline]
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        # Cálculos são criados pela página de estatísticas ou pelo comando generate_replenishment
+        return False
@@ -0,0 +1,304 @@
+"""
+Cold-storage archival of old StockHistory and SalesData rows
+Rows older than the retention period are exported to gzip CSV files
+partitioned by month (ARCHIVE_ROOT/<table>/<YYYY-MM>/part-NNNN.csv.gz) and
+then deleted in batches; the units and revenue of archived sales are
+added to ArchivedSalesTotal in the same transaction. Rows already present
+in a month's parts (a run interrupted between writing and deleting) are
+only deleted, never written twice. The readers combine archived and live
+rows so analytics do not need to know where a row lives.
+"""
+import csv
+import gzip
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# table name -> (model label, date field, retention setting)
+ARCHIVED_TABLES = {
+    'stock_history': ('store_collections.StockHistory', 'date', 'STOCK_HISTORY_RETENTION_DAYS'),
+    'sales_data': ('sales_stats.SalesData', 'sale_date', 'SALES_DATA_RETENTION_DAYS'),
+}
+
+
+def _month_start(value, offset=0):
+    month_index = value.year * 12 + (value.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _table_spec(table):
+    if table not in ARCHIVED_TABLES:
+        raise ValueError(f"Unknown archive table: {table}")
+    label, date_field, retention_setting = ARCHIVED_TABLES[table]
+    model = apps.get_model(label)
+    return model, model._meta.get_field(date_field), retention_setting
+
+
+def _is_datetime(field):
+    return isinstance(field, models.DateTimeField)
+
+
+def _boundary(field, day):
+    """Lookup value for the start of `day` on a date or datetime field"""
+    if _is_datetime(field):
+        return timezone.make_aware(datetime.combine(day, time.min))
+    return day
+
+
+def _row_day(field, value):
+    return timezone.localdate(value) if _is_datetime(field) else value
+
+
+def archive_dir(table):
+    """Directory holding the archive files of `table`"""
+    return Path(settings.ARCHIVE_ROOT) / table
+
+
+def archive_cutoff(retention_days, today=None):
+    """
+    First day kept in the live table
+    Rounded down to a month start so every archived month is complete
+    """
+    today = today or timezone.localdate()
+    return _month_start(today - timedelta(days=retention_days))
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _next_part_path(month_dir):
+    existing = sorted(month_dir.glob('part-*.csv.gz'))
+    return month_dir / f"part-{len(existing) + 1:04d}.csv.gz"
+
+
+def _archived_pks(model, month_dir):
+    """Primary keys already written to the part files of `month_dir`"""
+    pk_field = model._meta.pk
+    pks = set()
+    for path in sorted(month_dir.glob('part-*.csv.gz')):
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as archive_file:
+            pks.update(pk_field.to_python(row[pk_field.attname]) for row in csv.DictReader(archive_file))
+    return pks
+
+
+def _before_delete(table):
+    """Hook folding rows into the totals that outlive them, run in the delete transaction"""
+    if table == 'sales_data':
+        from .piece_statistics import add_archived_sales
+        return add_archived_sales
+    return None
+
+
+def _delete_rows(model, pks, batch_size, before_delete=None):
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        with transaction.atomic():
+            if before_delete:
+                before_delete(batch)
+            model.objects.filter(pk__in=batch).delete()
+
+
+def _write_month(model, rows, month_dir, columns, batch_size):
+    """
+    Stream `rows` into a new part file of `month_dir`
+
+    Returns:
+        tuple: (path, list of archived primary keys)
+    """
+    month_dir.mkdir(parents=True, exist_ok=True)
+    path = _next_part_path(month_dir)
+    temp_path = path.with_suffix('.tmp')
+    pk_index = columns.index(model._meta.pk.attname)
+    pks = []
+
+    with gzip.open(temp_path, 'wt', newline='', encoding='utf-8') as archive_file:
+        writer = csv.writer(archive_file)
+        writer.writerow(columns)
+        for row in rows.values_list(*columns).iterator(chunk_size=batch_size):
+            writer.writerow(['' if value is None else value for value in row])
+            pks.append(row[pk_index])
+
+    # Only publish complete files
+    os.replace(temp_path, path)
+    return path, pks
+
+
+def _ensure_stock_snapshot(cutoff):
+    """
+    Close the month before `cutoff` so stock-as-of queries after the cutoff
+    still know the stock of variants whose last movement gets archived
+    """
+    from store_collections.models import MonthlyStockSnapshot
+    from store_collections.stock_snapshots import take_monthly_snapshot
+
+    month = _month_start(cutoff, -1)
+    if not MonthlyStockSnapshot.objects.filter(month=month).exists():
+        take_monthly_snapshot(month)
+
+
+def archive_table(table, retention_days=None, batch_size=5000, dry_run=False):
+    """
+    Export rows of `table` older than the retention period and delete them
+
+    Args:
+        table: Key of ARCHIVED_TABLES ('stock_history' or 'sales_data')
+        retention_days: Days kept live (default: the table's setting, 0 disables)
+        batch_size: Rows per delete statement
+        dry_run: Only count the rows that would be archived
+
+    Returns:
+        dict: {'table', 'cutoff', 'rows', 'files'}
+    """
+    model, date_field, retention_setting = _table_spec(table)
+    if retention_days is None:
+        retention_days = getattr(settings, retention_setting)
+
+    result = {'table': table, 'cutoff': None, 'rows': 0, 'files': []}
+    if not retention_days:
+        return result
+
+    cutoff = archive_cutoff(retention_days)
+    result['cutoff'] = cutoff
+    old_rows = model.objects.filter(**{f'{date_field.name}__lt': _boundary(date_field, cutoff)})
+
+    oldest = old_rows.aggregate(oldest=Min(date_field.name))['oldest']
+    if oldest is None:
+        return result
+
+    if dry_run:
+        result['rows'] = old_rows.count()
+        return result
+
+    if table == 'stock_history':
+        _ensure_stock_snapshot(cutoff)
+
+    columns = _columns(model)
+    before_delete = _before_delete(table)
+    month = _month_start(_row_day(date_field, oldest))
+
+    while month < cutoff:
+        following = _month_start(month, 1)
+        rows = old_rows.filter(**{
+            f'{date_field.name}__gte': _boundary(date_field, month),
+            f'{date_field.name}__lt': _boundary(date_field, following),
+        }).order_by(date_field.name, 'pk')
+
+        month_dir = archive_dir(table) / f"{month:%Y-%m}"
+
+        # Written by an earlier run that stopped before deleting them
+        archived = _archived_pks(model, month_dir) if month_dir.exists() else set()
+        if archived:
+            leftover = [pk for pk in rows.values_list('pk', flat=True).iterator(chunk_size=batch_size) if pk in archived]
+            _delete_rows(model, leftover, batch_size, before_delete)
+            result['rows'] += len(leftover)
+            if leftover:
+                logger.info(f"Deleted {len(leftover)} {table} rows of {month:%m/%Y} already archived")
+
+        if rows.exists():
+            path, pks = _write_month(model, rows, month_dir, columns, batch_size)
+            _delete_rows(model, pks, batch_size, before_delete)
+
+            result['rows'] += len(pks)
+            result['files'].append(str(path))
+            logger.info(f"Archived {len(pks)} {table} rows of {month:%m/%Y} to {path}")
+
+        month = following
+
+    return result
+
+
+def archive_old_data(batch_size=5000, dry_run=False, **retention_days):
+    """
+    Archive every table in ARCHIVED_TABLES
+
+    Args:
+        retention_days: Per-table override, e.g. stock_history=365
+
+    Returns:
+        list: One archive_table result per table
+    """
+    return [
+        archive_table(table, retention_days.get(table), batch_size=batch_size, dry_run=dry_run)
+        for table in ARCHIVED_TABLES
+    ]
+
+
+def read_archive(table, start=None, end=None):
+    """
+    Iterate archived rows of `table` as dicts of typed values
+
+    Args:
+        start: First day included (default: everything)
+        end: Last day included (default: everything)
+    """
+    model, date_field, retention_setting = _table_spec(table)
+    directory = archive_dir(table)
+    if not directory.exists():
+        return
+
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    first_month = f"{start:%Y-%m}" if start else None
+    last_month = f"{end:%Y-%m}" if end else None
+
+    for month_dir in sorted(directory.iterdir()):
+        if (first_month and month_dir.name < first_month) or (last_month and month_dir.name > last_month):
+            continue
+
+        for path in sorted(month_dir.glob('part-*.csv.gz')):
+            with gzip.open(path, 'rt', newline='', encoding='utf-8') as archive_file:
+                for raw in csv.DictReader(archive_file):
+                    row = {
+                        name: None if value == '' and fields[name].null else fields[name].to_python(value)
+                        for name, value in raw.items()
+                        if name in fields
+                    }
+                    day = _row_day(date_field, row[date_field.attname])
+                    if (start and day < start) or (end and day > end):
+                        continue
+                    yield row
+
+
+def iter_rows(table, start=None, end=None, **filters):
+    """
+    Iterate archived and live rows of `table`, oldest archive first
+
+    Args:
+        start: First day included (default: everything)
+        end: Last day included (default: everything)
+        filters: Equality filters on column names, e.g. piece_id=3
+
+    Yields:
+        dict: Column name -> value, same shape for archived and live rows
+    """
+    model, date_field, retention_setting = _table_spec(table)
+
+    for row in read_archive(table, start, end):
+        if all(row.get(name) == value for name, value in filters.items()):
+            yield row
+
+    live = model.objects.filter(**filters)
+    if start:
+        live = live.filter(**{f'{date_field.name}__gte': _boundary(date_field, start)})
+    if end:
+        live = live.filter(**{f'{date_field.name}__lt': _boundary(date_field, end + timedelta(days=1))})
+
+    yield from live.order_by(date_field.name, 'pk').values(*_columns(model)).iterator()
+
+
+def stock_history_rows(start=None, end=None, **filters):
+    """Archived and live StockHistory rows (see iter_rows)"""
+    return iter_rows('stock_history', start, end, **filters)
+
+
+def sales_rows(start=None, end=None, **filters):
+    """Archived and live SalesData rows (see iter_rows)"""
+    return iter_rows('sales_data', start, end, **filters)
@@ -0,0 +1,257 @@
+"""
+Scale benchmark of the replenishment engine
+Builds a synthetic catalog (pieces spread over fabrics and categories, with
+StockHistory sales spread over the last days), rebuilds the daily summary and
+times `generate_replenishment` end to end: queries, database time, Python
+time and peak memory. Everything runs inside a transaction that is rolled
+back at the end, so the database is left as it was.
+"""
+import csv
+import io
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Catalog size presets: pieces and StockHistory rows
+SCALES = {
+    '1k': {'pieces': 1_000, 'history_rows': 1_000_000},
+    '10k': {'pieces': 10_000, 'history_rows': 5_000_000},
+    '100k': {'pieces': 100_000, 'history_rows': 20_000_000},
+}
+
+# Pieces per fabric and number of categories of the synthetic catalog
+PIECES_PER_FABRIC = 50
+CATEGORIES = 20
+
+# Days of history generated (covers the default 120-day window)
+HISTORY_DAYS = 180
+
+# StockHistory rows written per insert
+INSERT_BATCH = 50_000
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and the time spent in them
+    (see connection.execute_wrapper)
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def measure(trace_memory=False):
+    """
+    Measure the block: yields a dict filled with wall_seconds, db_seconds,
+    python_seconds and queries when the block ends, plus peak_memory_mb with
+    trace_memory (tracemalloc slows Python down, so it is kept off the timed runs)
+    """
+    timer = QueryTimer()
+    stats = {}
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(timer):
+            yield stats
+    finally:
+        wall = time.perf_counter() - start
+        stats.update({
+            'wall_seconds': round(wall, 4),
+            'db_seconds': round(timer.seconds, 4),
+            'python_seconds': round(wall - timer.seconds, 4),
+            'queries': timer.queries,
+        })
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats['peak_memory_mb'] = round(peak / 2 ** 20, 2)
+
+
+def _insert_history(rows):
+    """
+    Write StockHistory rows (piece_id, size, quantity, movement_type,
+    stock_after_movement, date): COPY on PostgreSQL, bulk_create elsewhere
+    """
+    from store_collections.models import StockHistory
+
+    now = timezone.now()
+    if connection.vendor == 'postgresql':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow((*row, now.isoformat()))
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY "{StockHistory._meta.db_table}" (piece_id, size, quantity, movement_type, '
+                'stock_after_movement, date, created_at) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
+        return
+
+    StockHistory.objects.bulk_create([
+        StockHistory(
+            piece_id=piece_id, size=size, quantity=quantity, movement_type=movement_type,
+            stock_after_movement=stock_after, date=date,
+        )
+        for piece_id, size, quantity, movement_type, stock_after, date in rows
+    ], batch_size=2000)
+
+
+def build_catalog(pieces, history_rows, fabrics=None, categories=CATEGORIES, days=HISTORY_DAYS, seed=0):
+    """
+    Create a synthetic catalog and its sales history
+
+    Args:
+        pieces: Number of pieces (4 sizes each)
+        history_rows: StockHistory rows spread over all variants
+        fabrics: Number of fabrics (default: one per PIECES_PER_FABRIC pieces)
+        categories: Number of piece categories
+        days: Days of history before now
+        seed: Random seed
+
+    Returns:
+        dict: pieces, fabrics, categories and history_rows created
+    """
+    from business_settings.models import PieceCategory, Supplier
+    from store_collections.models import Collection, Fabric, Piece
+
+    rng = np.random.default_rng(seed)
+    fabrics = fabrics or max(pieces // PIECES_PER_FABRIC, 1)
+
+    supplier = Supplier.objects.create(name='Benchmark', delivery_time_days=10)
+    collection = Collection.objects.create(
+        name='Benchmark', modeling_time=5, pilot_piece_time=5, test_piece_time=5,
+        production_time=20, preparation_time=3, transportation_time=4,
+    )
+    category_objects = PieceCategory.objects.bulk_create([
+        PieceCategory(name=f'Categoria {index}', production_cost_per_piece=Decimal(int(rng.integers(8, 30))))
+        for index in range(categories)
+    ])
+    fabric_objects = Fabric.objects.bulk_create([
+        Fabric(
+            name=f'Tecido {index}', color='Benchmark', supplier=supplier, roll_weight_kg=Decimal(20),
+            yield_area_per_kg=Decimal('3.5'), price_per_roll=Decimal(int(rng.integers(200, 800))),
+        )
+        for index in range(fabrics)
+    ], batch_size=2000)
+
+    consumption = np.round(rng.uniform(0.8, 2.5, size=(pieces, 1)) + np.arange(4) * 0.2, 2)
+    stock = rng.integers(0, 30, size=(pieces, 4))
+    piece_objects = Piece.objects.bulk_create([
+        Piece(
+            name=f'Peça {index}', collection=collection,
+            category=category_objects[index % categories], fabric=fabric_objects[index % fabrics],
+            launch_status='em_lancamento' if index % 10 == 0 else 'lancada',
+            sale_price=Decimal(150), total_cost=Decimal(60),
+            **{f'fabric_consumption_{size.lower()}': Decimal(str(consumption[index, position]))
+               for position, size in enumerate(SIZES)},
+            **{f'current_stock_{size.lower()}': int(stock[index, position]) for position, size in enumerate(SIZES)},
+            **{f'initial_quantity_{size.lower()}': 10 for size in SIZES},
+        )
+        for index in range(pieces)
+    ], batch_size=2000)
+
+    # Sales spread uniformly over the variants and the last `days` days
+    piece_ids = np.array([piece.pk for piece in piece_objects], dtype=np.int64)
+    now = timezone.now()
+    written = 0
+    while written < history_rows:
+        count = min(INSERT_BATCH, history_rows - written)
+        variants = rng.integers(0, pieces * 4, size=count)
+        seconds = rng.integers(0, days * 86400, size=count)
+        quantities = rng.integers(1, 4, size=count)
+        stock_after = rng.integers(0, 50, size=count)
+        _insert_history(
+            (int(piece_ids[variant // 4]), SIZES[variant % 4], int(quantity), 'saida', int(after),
+             now - timedelta(seconds=int(second)))
+            for variant, quantity, after, second in zip(variants, quantities, stock_after, seconds)
+        )
+        written += count
+
+    return {'pieces': pieces, 'fabrics': fabrics, 'categories': categories, 'history_rows': history_rows}
+
+
+def benchmark_scale(name, pieces, history_rows, repeat=3, optimize_rolls=True, seed=0):
+    """
+    Build one synthetic catalog and time generate_replenishment on it
+
+    Returns:
+        dict: scale, catalog sizes, setup_seconds, the timed runs, the median
+            of each measure and the peak memory of one extra traced run
+    """
+    from store_collections.stock_history import rebuild_daily_summary
+
+    with transaction.atomic():
+        setup_start = time.perf_counter()
+        catalog = build_catalog(pieces, history_rows, seed=seed)
+        summary_rows = rebuild_daily_summary()
+        setup_seconds = time.perf_counter() - setup_start
+
+        def generate(trace_memory=False):
+            with measure(trace_memory) as stats:
+                call_command('generate_replenishment', optimize_rolls=optimize_rolls, stdout=io.StringIO())
+            return stats
+
+        runs = [generate() for _ in range(repeat)]
+        peak_memory_mb = generate(trace_memory=True)['peak_memory_mb']
+
+        transaction.set_rollback(True)
+
+    return {
+        'scale': name,
+        **catalog,
+        'summary_rows': summary_rows,
+        'setup_seconds': round(setup_seconds, 2),
+        'runs': runs,
+        'median': {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]},
+        'peak_memory_mb': peak_memory_mb,
+    }
+
+
+def run_benchmark(scales, repeat=3, optimize_rolls=True, history_rows=None, seed=0):
+    """
+    Benchmark every scale (names of SCALES)
+
+    Args:
+        history_rows: Override the StockHistory rows of every scale
+
+    Returns:
+        dict: database vendor, parameters and the result of each scale
+    """
+    started_at = timezone.now()
+    results = []
+    for name in scales:
+        scale = SCALES[name]
+        results.append(benchmark_scale(
+            name, scale['pieces'], history_rows or scale['history_rows'],
+            repeat=repeat, optimize_rolls=optimize_rolls, seed=seed,
+        ))
+
+    return {
+        'database': connection.vendor,
+        'started_at': started_at.isoformat(),
+        'repeat': repeat,
+        'optimize_rolls': optimize_rolls,
+        'results': results,
+    }
@@ -0,0 +1,225 @@
+"""
+Columnar analytics export
+Writes StockHistory, SalesData, Piece and Fabric snapshots to Arrow IPC files
+(ANALYTICS_EXPORT_ROOT/<dataset>.arrow) and memory-maps them back into
+pandas/NumPy, so experiments never touch Django models or the production DB.
+
+Files are uncompressed so the loader can map them without copying; string
+columns with few distinct values are dictionary-encoded.
+"""
+import logging
+import os
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from .archive import ARCHIVED_TABLES, iter_rows
+
+logger = logging.getLogger(__name__)
+
+# dataset -> (model label, dictionary-encoded columns)
+DATASETS = {
+    'stock_history': ('store_collections.StockHistory', ['size', 'movement_type']),
+    'sales_data': ('sales_stats.SalesData', ['piece_sku', 'piece_name']),
+    'pieces': ('store_collections.Piece', ['status', 'launch_status']),
+    'fabrics': ('store_collections.Fabric', ['color']),
+}
+
+
+def export_root():
+    return Path(settings.ANALYTICS_EXPORT_ROOT)
+
+
+def dataset_path(name, root=None):
+    return Path(root or export_root()) / f"{name}.arrow"
+
+
+def _arrow_type(field):
+    """Arrow type for a concrete Django field"""
+    if isinstance(field, (models.AutoField, models.ForeignKey)):
+        return pa.int64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int32()
+    if isinstance(field, models.DecimalField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def dataset_schema(name):
+    """Arrow schema of a dataset, derived from its model fields"""
+    label, dictionary_columns = DATASETS[name]
+    model = apps.get_model(label)
+    return pa.schema([
+        pa.field(
+            field.attname,
+            pa.dictionary(pa.int32(), pa.string()) if field.attname in dictionary_columns else _arrow_type(field),
+            nullable=field.null,
+        )
+        for field in model._meta.concrete_fields
+    ])
+
+
+class DictionaryEncoder:
+    """
+    Growing dictionary for one column
+    Each batch reuses the codes of earlier batches, new values are appended,
+    so the IPC writer only emits dictionary deltas
+    """
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, column):
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()),
+            pa.array(self.values, type=pa.string()),
+        )
+
+
+def _dataset_rows(name):
+    """Rows of a dataset as tuples in schema order, archived rows first"""
+    label, dictionary_columns = DATASETS[name]
+    model = apps.get_model(label)
+    columns = [field.attname for field in model._meta.concrete_fields]
+
+    # Include the rows moved to the cold-storage archive
+    if name in ARCHIVED_TABLES:
+        for row in iter_rows(name):
+            yield tuple(row[column] for column in columns)
+        return
+
+    yield from model.objects.order_by('pk').values_list(*columns).iterator(chunk_size=5000)
+
+
+def export_dataset(name, root=None, batch_size=50000):
+    """
+    Write one dataset to an Arrow IPC file, streaming record batches
+
+    Returns:
+        tuple: (path, number of rows)
+    """
+    schema = dataset_schema(name).with_metadata({
+        'dataset': name,
+        'exported_at': timezone.now().isoformat(),
+    })
+    encoders = {
+        field.name: DictionaryEncoder()
+        for field in schema
+        if pa.types.is_dictionary(field.type)
+    }
+
+    path = dataset_path(name, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix('.tmp')
+    total = 0
+
+    def write_batch(writer, rows):
+        arrays = []
+        for index, field in enumerate(schema):
+            column = [row[index] for row in rows]
+            if field.name in encoders:
+                arrays.append(encoders[field.name].encode(column))
+            elif pa.types.is_floating(field.type):
+                # Decimal fields
+                arrays.append(pa.array([None if value is None else float(value) for value in column], type=field.type))
+            else:
+                arrays.append(pa.array(column, type=field.type))
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+    options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with ipc.new_file(str(temp_path), schema, options=options) as writer:
+        batch = []
+        for row in _dataset_rows(name):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write_batch(writer, batch)
+                total += len(batch)
+                batch = []
+        if batch or total == 0:
+            write_batch(writer, batch)
+            total += len(batch)
+
+    # Readers may have the previous file mapped, replace it atomically
+    os.replace(temp_path, path)
+    logger.info(f"Exported {total} {name} rows to {path}")
+    return path, total
+
+
+def export_datasets(names=None, root=None, batch_size=50000):
+    """
+    Export several datasets (default: all)
+
+    Returns:
+        dict: {dataset: (path, rows)}
+    """
+    return {
+        name: export_dataset(name, root=root, batch_size=batch_size)
+        for name in (names or DATASETS)
+    }
+
+
+def load_table(name, columns=None, root=None):
+    """
+    Memory-map an exported dataset as a pyarrow Table
+    Buffers point into the mapped file, nothing is read until it is used
+    """
+    source = pa.memory_map(str(dataset_path(name, root)), 'r')
+    table = ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def load_frame(name, columns=None, root=None):
+    """
+    Exported dataset as a pandas DataFrame
+    Dictionary columns become Categorical columns
+    """
+    return load_table(name, columns=columns, root=root).to_pandas(split_blocks=True)
+
+
+def load_arrays(name, columns, root=None):
+    """
+    Exported dataset columns as NumPy arrays
+    Numeric columns without nulls stored in a single batch are zero-copy views
+    of the mapped file; dictionary columns return their integer codes
+
+    Returns:
+        dict: {column: numpy array}, plus '<column>_values' with the
+            dictionary of every dictionary-encoded column
+    """
+    table = load_table(name, columns=columns, root=root)
+    arrays = {}
+
+    for column in columns:
+        chunked = table.column(column)
+        if pa.types.is_dictionary(chunked.type):
+            chunked = chunked.unify_dictionaries()
+            combined = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+            arrays[column] = combined.indices.to_numpy(zero_copy_only=False)
+            arrays[f"{column}_values"] = combined.dictionary.to_numpy(zero_copy_only=False)
+        elif chunked.num_chunks == 1:
+            arrays[column] = chunked.chunk(0).to_numpy(zero_copy_only=False)
+        else:
+            arrays[column] = chunked.to_numpy()
+
+    return arrays
@@ -0,0 +1,462 @@
+"""
+Batch sales forecasting
+Builds a pieces x days matrix of daily units sold from the StockDailySummary
+rollup and fits every piece at once with NumPy, one vector step per day:
+- Simple exponential smoothing, with the smoothing constant chosen per piece
+  from ALPHA_GRID by the one-step squared error
+- Croston (Syntetos-Boylan approximation) for intermittent pieces, whose
+  average interval between sales is above INTERMITTENT_ADI
+- Optionally Holt's damped trend for the regular pieces, fitted series by
+  series with SciPy across a process pool (sales_stats.parallel)
+
+The one-step errors give the confidence intervals. The collection, fabric
+and overall forecasts add up the piece forecasts; their intervals come from
+a fit of the group's summed series, so they capture how pieces sell
+together. Each forecast stores a hash of the sale days in its window (dates
+and units) and parameters, which only changes when a sale enters or leaves
+the window. Forecasts that stay put between sales (Croston, or no sales at
+all) are carried forward while their hash is unchanged, so the nightly run
+only fits the regular pieces, the pieces whose sales changed and the
+pieces due for their weekly refit. Reuse is approximate: a refit would
+place the same sales at other positions of the sliding window (warm-up,
+days since the last sale), moving the forecast by a few percent at most
+before the weekly refit (REFIT_DAYS). Forecasts are bulk-written to
+SalesForecast.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+from scipy.optimize import minimize
+from scipy.stats import norm
+from .parallel import run_per_series
+
+logger = logging.getLogger(__name__)
+
+# Days of sales history fitted and days forecast
+HISTORY_DAYS = 180
+HORIZON_DAYS = 30
+
+# Days averaged for the initial smoothed level
+INITIAL_DAYS = 14
+
+# Smoothing constants tried per piece (SES) and used for Croston
+ALPHA_GRID = np.array([0.05, 0.1, 0.2, 0.3, 0.5])
+CROSTON_ALPHA = 0.1
+
+# Average days between sales above which demand is intermittent (Syntetos-Boylan)
+INTERMITTENT_ADI = 1.32
+
+# Confidence level (%) of the intervals
+CONFIDENCE_LEVEL = 95
+
+# Models for the pieces with regular demand: 'ses' is fitted for every piece
+# at once; 'damped_trend' is fitted series by series with SciPy in a process pool
+MODELS = ('ses', 'damped_trend')
+
+# Part of every input hash; bump it when a model changes so every piece is refitted
+FORECAST_VERSION = 2
+
+# Reused forecasts are refitted at least this often (on a day set by the piece
+# id, so refits are spread over the week), bounding their drift from a refit
+REFIT_DAYS = 7
+
+# Bounds of the damped trend parameters (alpha, beta, phi)
+DAMPED_TREND_BOUNDS = [(0.01, 0.99), (0.01, 0.99), (0.8, 0.98)]
+
+
+class SalesMatrix:
+    """
+    Daily units sold per piece
+
+    Attributes:
+        pieces: List of dicts (id, name, sale_price, collection, fabric)
+        units: (n, days) units sold per day, oldest first
+        start: Date of the first column
+    """
+
+    def __init__(self, pieces, units, start):
+        self.pieces = pieces
+        self.units = units
+        self.start = start
+
+
+def load_sales_matrix(today=None, history_days=HISTORY_DAYS):
+    """
+    Build the pieces x days matrix of the history_days before today (two queries)
+
+    Returns:
+        SalesMatrix
+    """
+    from store_collections.models import Piece, StockDailySummary
+
+    today = today or timezone.localdate()
+    start = today - timedelta(days=history_days)
+
+    pieces = list(Piece.objects.order_by('pk').values(
+        'pk', 'name', 'sale_price', 'collection_id', 'collection__name',
+        'fabric_id', 'fabric__name', 'fabric__color',
+    ))
+    position = {piece['pk']: index for index, piece in enumerate(pieces)}
+
+    units = np.zeros((len(pieces), history_days))
+    rows = StockDailySummary.objects.filter(
+        day__gte=start, day__lt=today, saidas__gt=0
+    ).values('piece_id', 'day').annotate(units=Sum('saidas')).values_list('piece_id', 'day', 'units')
+    for piece_id, day, sold in rows.iterator(chunk_size=10000):
+        units[position[piece_id], (day - start).days] = sold
+
+    return SalesMatrix(pieces, units, start)
+
+
+def _initial_state(units):
+    """Initial SES level and Croston size/interval of every piece"""
+    level = units[:, :INITIAL_DAYS].mean(axis=1)
+    selling_days = (units > 0).sum(axis=1)
+    adi = np.divide(units.shape[1], selling_days, out=np.full(len(units), np.inf), where=selling_days > 0)
+    size = np.divide(units.sum(axis=1), selling_days, out=np.zeros(len(units)), where=selling_days > 0)
+    return level, size, adi
+
+
+def select_alpha(units, alphas=ALPHA_GRID):
+    """
+    Smoothing constant of every piece with the smallest one-step squared
+    error over the history (all pieces and constants in one pass)
+
+    Returns:
+        numpy array: (n,) alpha per piece
+    """
+    level, _, _ = _initial_state(units)
+    level = np.repeat(level[:, None], len(alphas), axis=1)
+    sse = np.zeros(level.shape)
+    for day in range(INITIAL_DAYS, units.shape[1]):
+        error = units[:, day, None] - level
+        sse += error ** 2
+        level += alphas * error
+    return alphas[sse.argmin(axis=1)]
+
+
+def fit_forecasts(units):
+    """
+    Fit every series and return the daily forecast rate and error spread
+
+    Args:
+        units: (n, days) units sold per day
+
+    Returns:
+        dict: rate (n,) units per day, sigma (n,) one-step error standard
+            deviation, croston (n,) bool and alpha (n,)
+    """
+    count, days = units.shape
+    level, size, adi = _initial_state(units)
+    croston = np.isfinite(adi) & (adi > INTERMITTENT_ADI)
+    alpha = np.where(croston, CROSTON_ALPHA, select_alpha(units))
+    interval = np.where(np.isfinite(adi), adi, 1.0)
+    since_sale = np.ones(count)
+    bias = 1 - alpha / 2
+
+    steps = max(days - INITIAL_DAYS, 1)
+    sse = np.zeros(count)
+
+    def forecast():
+        return np.where(croston, bias * size / interval, level)
+
+    for day in range(INITIAL_DAYS, days):
+        sold = units[:, day]
+        error = sold - forecast()
+        sse += error ** 2
+
+        level += alpha * error
+        sale = croston & (sold > 0)
+        size = np.where(sale, size + alpha * (sold - size), size)
+        interval = np.where(sale, interval + alpha * (since_sale - interval), interval)
+        since_sale = np.where(sold > 0, 1, since_sale + 1)
+
+    return {
+        'rate': np.maximum(forecast(), 0),
+        'sigma': np.sqrt(sse / steps),
+        'croston': croston,
+        'alpha': alpha,
+    }
+
+
+def _damped_trend_state(params, series):
+    """One-step squared error and final level/trend of a damped trend series"""
+    alpha, beta, phi = params
+    level, trend = series[:INITIAL_DAYS].mean(), 0.0
+    sse = 0.0
+    for sold in series[INITIAL_DAYS:]:
+        forecast = level + phi * trend
+        error = sold - forecast
+        sse += error * error
+        level = forecast + alpha * error
+        trend = phi * trend + alpha * beta * error
+    return sse, level, trend
+
+
+def fit_damped_trend(units, horizon_days=HORIZON_DAYS):
+    """
+    Fit Holt's damped trend to every row of `units`, one SciPy minimize per
+    series (run through parallel.run_per_series)
+
+    Returns:
+        dict: total (k,) units over the horizon, sigma (k,) one-step error
+            standard deviation, alpha, beta and phi (k,)
+    """
+    count = len(units)
+    steps = max(units.shape[1] - INITIAL_DAYS, 1)
+    damping = np.arange(1, horizon_days + 1)
+    result = {key: np.zeros(count) for key in ('total', 'sigma', 'alpha', 'beta', 'phi')}
+
+    for index, series in enumerate(units):
+        fit = minimize(
+            lambda params: _damped_trend_state(params, series)[0],
+            x0=[0.2, 0.1, 0.9],
+            bounds=DAMPED_TREND_BOUNDS,
+            method='L-BFGS-B',
+        )
+        sse, level, trend = _damped_trend_state(fit.x, series)
+        alpha, beta, phi = fit.x
+        daily = level + trend * np.cumsum(phi ** damping)
+        result['total'][index] = max(daily.sum(), 0)
+        result['sigma'][index] = np.sqrt(sse / steps)
+        result['alpha'][index], result['beta'][index], result['phi'][index] = alpha, beta, phi
+
+    return result
+
+
+def _interval(total, sigma, horizon_days, z):
+    """Units over the horizon with lower/upper bounds (independent daily errors)"""
+    spread = z * sigma * np.sqrt(horizon_days)
+    return total, np.maximum(total - spread, 0), total + spread
+
+
+def _decimal(value):
+    return Decimal(str(round(float(value), 2)))
+
+
+def sales_hash(params, series, start, price=''):
+    """
+    Hash of the sale days of one input window (dates and units) with the
+    model parameters and sale price; unchanged while the window slides over
+    days without sales
+    """
+    days = np.flatnonzero(series)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{params}|{price}|".encode())
+    digest.update((days + start.toordinal()).astype(np.int64).tobytes())
+    digest.update(np.ascontiguousarray(series[days], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def load_previous_forecasts(today=None):
+    """
+    Latest stored piece forecasts up to `today`, for reuse
+
+    Returns:
+        dict: {piece id: dict with input_hash, predicted_units, predicted_revenue,
+            confidence_interval_lower, confidence_interval_upper, model_used}
+    """
+    from .models import SalesForecast
+
+    today = today or timezone.localdate()
+    pieces = SalesForecast.objects.filter(forecast_type='piece', forecast_date__lte=today, target_id__isnull=False)
+    latest = pieces.aggregate(latest=Max('forecast_date'))['latest']
+    if latest is None:
+        return {}
+
+    return {
+        row['target_id']: row
+        for row in pieces.filter(forecast_date=latest).exclude(input_hash='').values(
+            'target_id', 'input_hash', 'predicted_units', 'predicted_revenue',
+            'confidence_interval_lower', 'confidence_interval_upper', 'model_used',
+        )
+    }
+
+
+def build_forecasts(matrix, today=None, horizon_days=HORIZON_DAYS, confidence_level=CONFIDENCE_LEVEL, model='ses',
+                    previous=None):
+    """
+    SalesForecast objects (unsaved) for every piece, collection, fabric and overall
+
+    Pieces whose input hash (sale days, sale price, parameters and refit
+    week) matches their forecast in `previous` reuse it; only the others are
+    fitted. Only forecasts that do not move between sales (Croston, or no
+    sales in the window) store a hash, so regular pieces, whose smoothed
+    level decays every day without sales, are always fitted. Reuse is
+    approximate (see the module docstring). Group
+    forecasts add up the piece forecasts, with the spread of a fit of the
+    group's summed series.
+
+    Args:
+        matrix: SalesMatrix
+        today: First day forecast (default: today)
+        horizon_days: Days added up in each forecast
+        confidence_level: Confidence level (%) of the intervals
+        model: Model of the pieces with regular demand (see MODELS)
+        previous: Stored piece forecasts (see load_previous_forecasts)
+
+    Returns:
+        tuple: (list of SalesForecast objects, number of pieces fitted)
+    """
+    from .models import SalesForecast
+
+    today = today or timezone.localdate()
+    previous = previous or {}
+    pieces = matrix.pieces
+    params = f"{model}|{matrix.units.shape[1]}|{horizon_days}|{confidence_level}|{FORECAST_VERSION}"
+    z = norm.ppf(0.5 + confidence_level / 200)
+    end = today + timedelta(days=horizon_days - 1)
+    notes = f"{horizon_days} dias ({today.strftime('%d/%m/%Y')} a {end.strftime('%d/%m/%Y')})"
+
+    def forecast(forecast_type, target_id, name, input_hash, units, revenue, lower, upper, model_used):
+        return SalesForecast(
+            forecast_type=forecast_type,
+            target_id=target_id,
+            target_name=name[:200],
+            input_hash=input_hash,
+            forecast_date=today,
+            predicted_units=units,
+            predicted_revenue=revenue,
+            confidence_interval_lower=lower,
+            confidence_interval_upper=upper,
+            confidence_level=Decimal(confidence_level),
+            model_used=model_used,
+            notes=notes,
+        )
+
+    # Fit only the pieces whose sales changed
+    hashes = [
+        sales_hash(
+            f"{params}|{(today.toordinal() + piece['pk']) // REFIT_DAYS}", series, matrix.start, piece['sale_price']
+        )
+        for piece, series in zip(pieces, matrix.units)
+    ]
+    changed = np.array([
+        previous.get(piece['pk'], {}).get('input_hash') != input_hash
+        for piece, input_hash in zip(pieces, hashes)
+    ], dtype=bool)
+    units = matrix.units[changed]
+
+    fit = fit_forecasts(units)
+    total = fit['rate'] * horizon_days
+    sigma = fit['sigma']
+    models = [
+        f"Croston SBA (alpha={alpha:g})" if croston else f"Simple Exponential Smoothing (alpha={alpha:g})"
+        for croston, alpha in zip(fit['croston'], fit['alpha'])
+    ]
+
+    if model == 'damped_trend':
+        regular = np.flatnonzero(~fit['croston'] & (units.sum(axis=1) > 0))
+        damped = run_per_series(fit_damped_trend, units[regular], horizon_days=horizon_days)
+        if len(regular):
+            total[regular] = damped['total']
+            sigma[regular] = damped['sigma']
+            for position, index in enumerate(regular):
+                models[index] = (
+                    f"Damped Trend (alpha={damped['alpha'][position]:.2f}, "
+                    f"beta={damped['beta'][position]:.2f}, phi={damped['phi'][position]:.2f})"
+                )
+
+    total, lower, upper = _interval(total, sigma, horizon_days, z)
+    fitted = iter(range(len(units)))
+    # Carried forward while the sales do not change
+    reusable = fit['croston'] | (units.sum(axis=1) == 0)
+
+    forecasts = []
+    piece_units = np.zeros(len(pieces))
+    piece_revenue = []
+    for index, piece in enumerate(pieces):
+        input_hash = hashes[index]
+        if changed[index]:
+            position = next(fitted)
+            if not reusable[position]:
+                input_hash = ''
+            values = {
+                'units': int(round(total[position])),
+                'revenue': _decimal(total[position] * float(piece['sale_price'])),
+                'lower': _decimal(lower[position]),
+                'upper': _decimal(upper[position]),
+                'model_used': models[position],
+            }
+        else:
+            stored = previous[piece['pk']]
+            values = {
+                'units': stored['predicted_units'],
+                'revenue': stored['predicted_revenue'],
+                'lower': stored['confidence_interval_lower'],
+                'upper': stored['confidence_interval_upper'],
+                'model_used': stored['model_used'],
+            }
+        piece_units[index] = values['units']
+        piece_revenue.append(values['revenue'])
+        forecasts.append(forecast('piece', piece['pk'], piece['name'], input_hash, **values))
+
+    # Group position of every piece, with the group ids and names in position order
+    groups = {'collection': ({}, []), 'fabric': ({}, []), 'overall': ({}, [])}
+    group_index = {forecast_type: np.zeros(len(pieces), dtype=np.intp) for forecast_type in groups}
+    for index, piece in enumerate(pieces):
+        for forecast_type, target_id, name in (
+            ('collection', piece['collection_id'], piece['collection__name']),
+            ('fabric', piece['fabric_id'], f"{piece['fabric__name']} - {piece['fabric__color']}"),
+            ('overall', None, 'Geral'),
+        ):
+            positions, targets = groups[forecast_type]
+            if target_id not in positions:
+                positions[target_id] = len(targets)
+                targets.append((target_id, name))
+            group_index[forecast_type][index] = positions[target_id]
+
+    # Rollups: points added up from the pieces, spread from the group's summed series
+    for forecast_type, (_, targets) in groups.items():
+        group = group_index[forecast_type]
+        series = np.zeros((len(targets), matrix.units.shape[1]))
+        np.add.at(series, group, matrix.units)
+        group_sigma = fit_forecasts(series)['sigma']
+        group_total, group_lower, group_upper = _interval(
+            np.bincount(group, weights=piece_units, minlength=len(targets)), group_sigma, horizon_days, z
+        )
+        group_revenue = [Decimal('0.00')] * len(targets)
+        for position, revenue in zip(group, piece_revenue):
+            group_revenue[position] += revenue
+
+        for position, (target_id, name) in enumerate(targets):
+            forecasts.append(forecast(
+                forecast_type, target_id, name, sales_hash(params, series[position], matrix.start),
+                int(group_total[position]), group_revenue[position],
+                _decimal(group_lower[position]), _decimal(group_upper[position]), 'Sum of piece forecasts',
+            ))
+
+    return forecasts, int(changed.sum())
+
+
+def generate_forecasts(today=None, history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS,
+                       confidence_level=CONFIDENCE_LEVEL, model='ses'):
+    """
+    Forecast the whole catalog and replace the forecasts made for the same day
+    Intermittent and non-selling pieces whose sales did not change since the last run reuse their forecast (refitted at least every REFIT_DAYS)
+
+    Returns:
+        tuple: (SalesForecast rows written, pieces fitted)
+    """
+    from .models import SalesForecast
+
+    today = today or timezone.localdate()
+    matrix = load_sales_matrix(today=today, history_days=history_days)
+    forecasts, fitted = build_forecasts(
+        matrix, today=today, horizon_days=horizon_days, confidence_level=confidence_level, model=model,
+        previous=load_previous_forecasts(today),
+    )
+
+    with transaction.atomic():
+        SalesForecast.objects.filter(forecast_date=today).delete()
+        SalesForecast.objects.bulk_create(forecasts, batch_size=2000)
+
+    logger.info(
+        f"Sales forecasts generated: {len(forecasts)} rows, {fitted} of {len(matrix.pieces)} pieces fitted"
+    )
+    return len(forecasts), fitted
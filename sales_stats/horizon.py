@@ -0,0 +1,208 @@
+"""
+Lead-time-aware replenishment over a planning horizon
+Instead of assuming units arrive at once, each variant's stock is projected
+week by week from its sales velocity. The weekly net requirements (units
+needed to stay at the minimum stock) are offset by the lead time of the
+piece: fabric supplier delivery + collection production and transportation.
+Orders due now (or already late) are separated from the ones that can wait,
+so fabric is only bought for what has to start now.
+
+plan_horizon() works on arrays only (ReplenishmentInputs + lead times).
+"""
+import math
+from datetime import timedelta
+import numpy as np
+from django.utils import timezone
+from .replenishment import MINIMUM_STOCK, SIZES, WINDOW_DAYS, load_replenishment_inputs
+
+HORIZON_WEEKS = 12
+
+
+def business_to_calendar_days(days):
+    """Supplier delivery times are in business days (5 per week)"""
+    return np.ceil(np.asarray(days, dtype=np.float64) * 7 / 5).astype(np.int64)
+
+
+class HorizonPlan:
+    """
+    Output of plan_horizon
+
+    Attributes:
+        weeks: Number of weeks planned
+        lead_days: (n,) lead time of each piece in days
+        velocity: (n, 4) units sold per day
+        stockout_week: (n, 4) first week the projected stock falls below the
+            minimum without new orders (-1: not within the horizon)
+        orders: (n, 4, weeks) units to order in each week (week 0 = now)
+        late: (n, 4) variants whose order now arrives after they fall below the minimum
+        order_now: (n, 4) orders[:, :, 0]
+        fabric_m2: (f, weeks) fabric m² of the orders of each week
+        rolls_now: (f,) rolls to buy now for the orders of week 0
+    """
+
+    def __init__(self, weeks, lead_days, velocity, stockout_week, orders, late, fabric_m2, rolls_now):
+        self.weeks = weeks
+        self.lead_days = lead_days
+        self.velocity = velocity
+        self.stockout_week = stockout_week
+        self.orders = orders
+        self.late = late
+        self.order_now = orders[:, :, 0]
+        self.fabric_m2 = fabric_m2
+        self.rolls_now = rolls_now
+
+
+def plan_horizon(inputs, lead_days, weeks=HORIZON_WEEKS, minimum_stock=MINIMUM_STOCK, window_days=WINDOW_DAYS):
+    """
+    Weekly order plan for every variant
+
+    - Launched pieces: weekly demand is the sales velocity of the window;
+      the requirement of week t is what keeps the projected stock at the
+      minimum by the end of week t, ordered lead time weeks earlier
+    - Pieces 'em_lancamento': their initial quantity, ordered now
+    - Requirements whose order week has already passed are ordered now and
+      flagged as late
+
+    Args:
+        inputs: ReplenishmentInputs
+        lead_days: (n,) lead time of each piece in days
+        weeks: Weeks in the horizon
+        minimum_stock: Minimum stock, a number or a (n,) array
+        window_days: Days of sales in inputs.sold (for the velocity)
+
+    Returns:
+        HorizonPlan
+    """
+    lead_days = np.asarray(lead_days, dtype=np.int64)
+    minimum_stock = np.asarray(minimum_stock, dtype=np.float64)
+    if minimum_stock.ndim:
+        minimum_stock = minimum_stock[:, None]
+
+    velocity = inputs.sold / window_days
+    weekly_demand = velocity * 7
+    launched = inputs.launched[:, None]
+
+    # Cumulative units needed by the end of weeks 1..weeks: (n, 4, weeks)
+    week_numbers = np.arange(1, weeks + 1)
+    cumulative = np.ceil(np.round(
+        minimum_stock[..., None] + weekly_demand[..., None] * week_numbers - inputs.stock[..., None], 9
+    ))
+    cumulative = np.maximum(cumulative, 0).astype(np.int64)
+    cumulative = np.where(launched[..., None], cumulative, 0)
+    requirements = np.diff(cumulative, axis=2, prepend=0)
+
+    # Week each requirement has to be ordered in; past weeks collapse into now
+    lead_weeks = np.ceil(lead_days / 7).astype(np.int64)
+    order_week = week_numbers[None, :] - lead_weeks[:, None]
+    orders = np.zeros(requirements.shape, dtype=np.int64)
+    for week in range(weeks):
+        due = (np.maximum(order_week, 0) == week)[:, None, :]
+        orders[:, :, week] = np.where(due, requirements, 0).sum(axis=2)
+
+    late = ((order_week < 0)[:, None, :] & (requirements > 0)).any(axis=2)
+
+    # Pieces in launch get their initial quantity now
+    in_launch = inputs.in_launch[:, None]
+    orders[:, :, 0] = np.where(in_launch, inputs.initial, orders[:, :, 0])
+
+    # First week below the minimum without orders
+    projected = inputs.stock[..., None] - weekly_demand[..., None] * week_numbers
+    below = launched[..., None] & (projected < minimum_stock[..., None])
+    stockout_week = np.where(below.any(axis=2), below.argmax(axis=2) + 1, -1)
+    stockout_week = np.where(launched & (inputs.stock < minimum_stock), 0, stockout_week)
+
+    # Fabric per week and rolls for the orders placed now
+    fabric_count = len(inputs.m2_per_roll)
+    piece_m2 = (inputs.consumption[..., None] * orders).sum(axis=1)
+    fabric_m2 = np.zeros((fabric_count, weeks))
+    np.add.at(fabric_m2, inputs.fabric_index, piece_m2)
+
+    rolls_now = np.zeros(fabric_count, dtype=np.int64)
+    has_rolls = (inputs.m2_per_roll > 0) & (fabric_m2[:, 0] > 0)
+    rolls_now[has_rolls] = np.ceil(np.round(fabric_m2[has_rolls, 0] / inputs.m2_per_roll[has_rolls], 9))
+
+    return HorizonPlan(weeks, lead_days, velocity, stockout_week, orders, late, fabric_m2, rolls_now)
+
+
+def load_lead_times(inputs):
+    """
+    (n,) lead time in days of each piece of `inputs` (one query)
+    Fabric supplier delivery (business days) + collection production and
+    transportation time
+    """
+    from store_collections.models import Piece
+
+    times = {
+        pk: (supplier_days, production + transportation)
+        for pk, supplier_days, production, transportation in Piece.objects.filter(
+            active_for_replenishment=True
+        ).values_list(
+            'pk', 'fabric__supplier__delivery_time_days', 'collection__production_time',
+            'collection__transportation_time'
+        )
+    }
+    supplier_days = np.array([times[piece.pk][0] for piece in inputs.pieces], dtype=np.int64)
+    collection_days = np.array([times[piece.pk][1] for piece in inputs.pieces], dtype=np.int64)
+
+    return business_to_calendar_days(supplier_days) + collection_days
+
+
+def run_horizon_plan(today=None, weeks=HORIZON_WEEKS, window_days=WINDOW_DAYS, minimum_stock=MINIMUM_STOCK):
+    """
+    Load the inputs and lead times from the database and plan the horizon
+
+    Returns:
+        tuple: (ReplenishmentInputs, HorizonPlan)
+    """
+    inputs = load_replenishment_inputs(today=today, window_days=window_days)
+    plan = plan_horizon(
+        inputs, load_lead_times(inputs), weeks=weeks, minimum_stock=minimum_stock, window_days=window_days
+    )
+    return inputs, plan
+
+
+def horizon_summary(inputs, plan, today=None):
+    """
+    Plan as plain data: totals per week and the variants to order now
+
+    Returns:
+        dict: 'weeks' ([{week, starts_on, units, fabric_m2}]), 'order_now'
+            ([{piece_id, piece_name, size, quantity, lead_days, stockout_week, late}],
+            late first) and 'rolls_now' ([{fabric_id, fabric, rolls}])
+    """
+    today = today or timezone.localdate()
+    weeks = [
+        {
+            'week': week,
+            'starts_on': today + timedelta(weeks=week),
+            'units': int(plan.orders[:, :, week].sum()),
+            'fabric_m2': round(float(plan.fabric_m2[:, week].sum()), 3),
+        }
+        for week in range(plan.weeks)
+    ]
+
+    order_now = []
+    for index, size_index in zip(*np.nonzero(plan.order_now)):
+        piece = inputs.pieces[index]
+        order_now.append({
+            'piece_id': piece.pk,
+            'piece_name': piece.name,
+            'size': SIZES[size_index],
+            'quantity': int(plan.order_now[index, size_index]),
+            'lead_days': int(plan.lead_days[index]),
+            'stockout_week': int(plan.stockout_week[index, size_index]),
+            'late': bool(plan.late[index, size_index]),
+        })
+    order_now.sort(key=lambda row: (not row['late'], row['stockout_week'] if row['stockout_week'] >= 0 else math.inf,
+                                    row['piece_name'], SIZES.index(row['size'])))
+
+    rolls_now = [
+        {
+            'fabric_id': inputs.fabrics[index].pk,
+            'fabric': f"{inputs.fabrics[index].name} - {inputs.fabrics[index].color}",
+            'rolls': int(plan.rolls_now[index]),
+        }
+        for index in np.flatnonzero(plan.rolls_now)
+    ]
+
+    return {'weeks': weeks, 'order_now': order_now, 'rolls_now': rolls_now}
@@ -0,0 +1,78 @@
+"""
+Management command to move old StockHistory and SalesData rows to the
+cold-storage archive (gzip CSV files partitioned by month)
+Usage:
+    python manage.py archive_old_data
+    python manage.py archive_old_data --stock-days 365 --sales-days 1095
+    python manage.py archive_old_data --dry-run
+    python manage.py archive_old_data --rebuild-totals
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sales_stats.archive import archive_old_data
+from sales_stats.piece_statistics import rebuild_archived_sales
+
+
+class Command(BaseCommand):
+    help = 'Arquiva histórico de estoque e vendas antigos em arquivos CSV compactados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stock-days',
+            type=int,
+            help='Days of StockHistory kept live (default: STOCK_HISTORY_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--sales-days',
+            type=int,
+            help='Days of SalesData kept live (default: SALES_DATA_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per statement (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be archived',
+        )
+        parser.add_argument(
+            '--rebuild-totals',
+            action='store_true',
+            help='Recompute the archived sales totals from the archive files and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild_totals']:
+            pieces = rebuild_archived_sales()
+            self.stdout.write(self.style.SUCCESS(f"✓ Totais de vendas arquivadas recalculados para {pieces} peça(s)"))
+            return
+
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🔍 MODO DRY-RUN: Nada será arquivado ou removido'))
+
+        self.stdout.write(f"📦 Destino: {settings.ARCHIVE_ROOT}")
+
+        results = archive_old_data(
+            batch_size=options['batch_size'],
+            dry_run=dry_run,
+            stock_history=options.get('stock_days'),
+            sales_data=options.get('sales_days'),
+        )
+
+        for result in results:
+            if result['cutoff'] is None:
+                self.stdout.write(f"⏭️  {result['table']}: arquivamento desativado")
+                continue
+
+            action = 'seriam arquivadas' if dry_run else 'arquivadas'
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {result['table']}: {result['rows']} linha(s) anteriores a "
+                f"{result['cutoff']:%d/%m/%Y} {action}"
+            ))
+            for path in result['files']:
+                self.stdout.write(f"   → {path}")
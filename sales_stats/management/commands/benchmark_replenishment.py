@@ -0,0 +1,88 @@
+"""
+Management command to benchmark the replenishment engine on synthetic catalogs
+Run it against a development database: the synthetic data is rolled back at
+the end, but the existing pieces would be part of every measurement
+Usage:
+    python manage.py benchmark_replenishment
+    python manage.py benchmark_replenishment --scale 1k 10k 100k --repeat 5 --output bench.json
+    python manage.py benchmark_replenishment --scale 10k --history-rows 2000000 --no-optimize-rolls
+"""
+import argparse
+import json
+from django.core.management.base import BaseCommand, CommandError
+from sales_stats.benchmark import SCALES, run_benchmark
+from store_collections.models import Piece
+
+
+class Command(BaseCommand):
+    help = 'Mede o cálculo de reposição em catálogos sintéticos (consultas, tempo e memória) e gera JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            nargs='+',
+            choices=list(SCALES),
+            default=['1k'],
+            help='Catalog sizes to benchmark (default: 1k)',
+        )
+        parser.add_argument(
+            '--history-rows',
+            type=int,
+            help='StockHistory rows of every scale (default: 1M, 5M and 20M)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed runs per scale (default: 3)',
+        )
+        parser.add_argument(
+            '--optimize-rolls',
+            action=argparse.BooleanOptionalAction,
+            default=True,
+            help='Run with the MILP roll optimizer (default: on)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the synthetic catalog',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON to this file instead of the terminal',
+        )
+        parser.add_argument(
+            '--allow-existing-data',
+            action='store_true',
+            help='Run even if the database already has pieces',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat deve ser no mínimo 1')
+        if Piece.objects.exists() and not options['allow_existing_data']:
+            raise CommandError(
+                'O banco já tem peças, que entrariam nas medições. '
+                'Use um banco de desenvolvimento ou --allow-existing-data'
+            )
+
+        for scale in options['scale']:
+            self.stderr.write(f"⏱️ Medindo catálogo {scale}...")
+
+        report = run_benchmark(
+            options['scale'],
+            repeat=options['repeat'],
+            optimize_rolls=options['optimize_rolls'],
+            history_rows=options['history_rows'],
+            seed=options['seed'],
+        )
+        output = json.dumps(report, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"✅ Resultado salvo em {options['output']}"))
+        else:
+            self.stdout.write(output)
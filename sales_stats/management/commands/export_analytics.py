@@ -0,0 +1,46 @@
+"""
+Management command to export analytics datasets to Arrow IPC files
+Usage:
+    python manage.py export_analytics
+    python manage.py export_analytics --dataset stock_history --dataset pieces
+    python manage.py export_analytics --output /data/analytics
+"""
+import time
+from django.core.management.base import BaseCommand
+from sales_stats.columnar import DATASETS, export_datasets, export_root
+
+
+class Command(BaseCommand):
+    help = 'Exporta histórico de estoque, vendas, peças e tecidos em arquivos Arrow para análises'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dataset',
+            action='append',
+            choices=list(DATASETS),
+            help='Dataset to export (repeatable, default: all)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Output directory (default: ANALYTICS_EXPORT_ROOT)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows per record batch (default: 50000)',
+        )
+
+    def handle(self, *args, **options):
+        output = options.get('output') or export_root()
+        self.stdout.write(f"📦 Destino: {output}")
+
+        start_time = time.time()
+        results = export_datasets(options.get('dataset'), root=output, batch_size=options['batch_size'])
+
+        for name, (path, rows) in results.items():
+            size_kb = path.stat().st_size / 1024
+            self.stdout.write(self.style.SUCCESS(f"✓ {name}: {rows} linha(s) → {path.name} ({size_kb:.1f} KB)"))
+
+        self.stdout.write(f"⏱️  Tempo de execução: {time.time() - start_time:.2f} segundos")
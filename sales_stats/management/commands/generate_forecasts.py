@@ -0,0 +1,62 @@
+"""
+Management command to forecast the sales of the whole catalog
+Usage:
+    python manage.py generate_forecasts
+    python manage.py generate_forecasts --history-days 120 --horizon-days 14
+    python manage.py generate_forecasts --model damped_trend
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from sales_stats.forecasting import (
+    CONFIDENCE_LEVEL, HISTORY_DAYS, HORIZON_DAYS, INITIAL_DAYS, MODELS, generate_forecasts,
+)
+
+
+class Command(BaseCommand):
+    help = 'Gera as previsões de venda por peça, coleção, tecido e geral'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=HISTORY_DAYS,
+            help=f'Days of sales history fitted (default: {HISTORY_DAYS})',
+        )
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            default=HORIZON_DAYS,
+            help=f'Days added up in each forecast (default: {HORIZON_DAYS})',
+        )
+        parser.add_argument(
+            '--confidence-level',
+            type=int,
+            default=CONFIDENCE_LEVEL,
+            help=f'Confidence level of the intervals in % (default: {CONFIDENCE_LEVEL})',
+        )
+        parser.add_argument(
+            '--model',
+            choices=MODELS,
+            default='ses',
+            help='Model of the pieces with regular demand; damped_trend runs on every core (FORECAST_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['history_days'] <= INITIAL_DAYS:
+            raise CommandError(f'--history-days deve ser maior que {INITIAL_DAYS}')
+        if options['horizon_days'] < 1:
+            raise CommandError('--horizon-days deve ser no mínimo 1')
+        if not 0 < options['confidence_level'] < 100:
+            raise CommandError('--confidence-level deve estar entre 1 e 99')
+
+        start_time = time.time()
+        written, fitted = generate_forecasts(
+            history_days=options['history_days'],
+            horizon_days=options['horizon_days'],
+            confidence_level=options['confidence_level'],
+            model=options['model'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"🔮 {written} previsão(ões) gerada(s) em {time.time() - start_time:.2f} segundos"
+        ))
+        self.stdout.write(f"   ♻️ {fitted} peça(s) recalculada(s); as demais reutilizaram a previsão anterior")
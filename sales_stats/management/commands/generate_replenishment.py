@@ -0,0 +1,118 @@
+"""
+Management command to calculate replenishment numbers from the terminal
+Same engine as the "Gerar Números de Reposição" page
+Usage:
+    python manage.py generate_replenishment
+    python manage.py generate_replenishment --window-days 90 --minimum-stock 3 --verbose
+    python manage.py generate_replenishment --save
+    python manage.py generate_replenishment --no-optimize-rolls
+"""
+import argparse
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sales_stats.materials import material_requirements, materials_cost
+from sales_stats.replenishment import MINIMUM_STOCK, WINDOW_DAYS, replenishment_context, run_replenishment
+from sales_stats.replenishment_runs import start_replenishment_run
+
+
+class Command(BaseCommand):
+    help = 'Calcula os números de reposição (peças, rolos de tecido e custos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            default=WINDOW_DAYS,
+            help=f'Days of sales considered (default: {WINDOW_DAYS})',
+        )
+        parser.add_argument(
+            '--minimum-stock',
+            type=int,
+            default=MINIMUM_STOCK,
+            help=f'Minimum stock for launched pieces (default: {MINIMUM_STOCK})',
+        )
+        parser.add_argument(
+            '--optimize-rolls',
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help='Allocate the leftover fabric with the MILP roll optimizer (default: REPLENISHMENT_OPTIMIZE_ROLLS)',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='List the quantities per piece and size',
+        )
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Store the result as a replenishment run (shown on the statistics page)',
+        )
+
+    def handle(self, *args, **options):
+        if options['optimize_rolls'] is None:
+            options['optimize_rolls'] = settings.REPLENISHMENT_OPTIMIZE_ROLLS
+
+        if options['save']:
+            self.save_run(options)
+            return
+
+        start_time = time.time()
+        inputs, result = run_replenishment(
+            window_days=options['window_days'],
+            minimum_stock=options['minimum_stock'],
+            optimize_rolls=options['optimize_rolls'],
+            time_limit=settings.REPLENISHMENT_OPTIMIZER_TIME_LIMIT,
+        )
+        context = replenishment_context(inputs, result)
+        materials = material_requirements(inputs, result)
+        elapsed = time.time() - start_time
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("🧵 ROLOS DE TECIDO"))
+        for fabric, rolls in context['fabric_rolls'].items():
+            leftover = result.leftover_m2[inputs.fabrics.index(fabric)]
+            self.stdout.write(f"  {fabric.name} - {fabric.color}: {rolls} rolo(s), sobra {leftover:.2f} m²")
+
+        self.stdout.write(self.style.SUCCESS("\n🧷 ACESSÓRIOS, EMBALAGENS E BRINDES"))
+        for line in materials:
+            self.stdout.write(
+                f"  {line['item_name']}: comprar {line['order_quantity']} "
+                f"(necessário {line['needed']}, prazo {line['delivery_time_days']} dias)"
+            )
+
+        if options['verbose']:
+            self.stdout.write(self.style.SUCCESS("\n👕 PEÇAS"))
+            for piece, sizes in context['pieces_replenishment'].items():
+                quantities = ', '.join(f"{size}={quantity}" for size, quantity in sizes.items())
+                self.stdout.write(f"  {piece.name}: {quantities}")
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"📦 Peças para reposição: {context['total_pieces_count']}")
+        self.stdout.write(f"💰 Custo de tecido: R$ {context['fabric_cost']:.2f}")
+        self.stdout.write(f"💰 Custo de produção: R$ {context['production_cost']:.2f}")
+        self.stdout.write(f"💰 Custo de acessórios e embalagens: R$ {materials_cost(materials):.2f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"💰 Custo total: R$ {context['total_cost'] + materials_cost(materials):.2f}"
+        ))
+        self.stdout.write(f"⏱️  Tempo de execução: {elapsed:.3f} segundos")
+
+    def save_run(self, options):
+        start_time = time.time()
+        run, reused = start_replenishment_run(
+            window_days=options['window_days'],
+            minimum_stock=options['minimum_stock'],
+            optimize_rolls=options['optimize_rolls'],
+            force=True,
+            run_async=False,
+        )
+        elapsed = time.time() - start_time
+
+        if run.status != 'done':
+            self.stdout.write(self.style.ERROR(f"❌ Cálculo #{run.pk} falhou: {run.error}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Cálculo #{run.pk} salvo"))
+        self.stdout.write(f"📦 Peças para reposição: {run.total_pieces}")
+        self.stdout.write(self.style.SUCCESS(f"💰 Custo total: R$ {run.total_cost:.2f}"))
+        self.stdout.write(f"⏱️  Tempo de execução: {elapsed:.3f} segundos")
@@ -0,0 +1,84 @@
+"""
+Management command to plan replenishment orders over the coming weeks
+Takes supplier delivery, production and transportation times into account
+Usage:
+    python manage.py plan_replenishment_horizon
+    python manage.py plan_replenishment_horizon --weeks 8 --window-days 90 --verbose
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from sales_stats.horizon import HORIZON_WEEKS, horizon_summary, run_horizon_plan
+from sales_stats.replenishment import MAX_WINDOW_DAYS, MINIMUM_STOCK, WINDOW_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Planeja os pedidos de reposição semana a semana considerando os prazos de entrega'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=HORIZON_WEEKS,
+            help=f'Weeks in the planning horizon (default: {HORIZON_WEEKS})',
+        )
+        parser.add_argument(
+            '--window-days',
+            type=int,
+            default=WINDOW_DAYS,
+            help=f'Days of sales used for the sales velocity (default: {WINDOW_DAYS})',
+        )
+        parser.add_argument(
+            '--minimum-stock',
+            type=int,
+            default=MINIMUM_STOCK,
+            help=f'Minimum stock for launched pieces (default: {MINIMUM_STOCK})',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='List the variants to order now',
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options['window_days'] <= MAX_WINDOW_DAYS:
+            raise CommandError(f"--window-days deve estar entre 1 e {MAX_WINDOW_DAYS}")
+
+        start_time = time.time()
+        inputs, plan = run_horizon_plan(
+            weeks=options['weeks'],
+            window_days=options['window_days'],
+            minimum_stock=options['minimum_stock'],
+        )
+        summary = horizon_summary(inputs, plan)
+        elapsed = time.time() - start_time
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS("📅 PEDIDOS POR SEMANA"))
+        for week in summary['weeks']:
+            label = 'agora' if week['week'] == 0 else week['starts_on'].strftime('%d/%m/%Y')
+            self.stdout.write(f"  Semana {week['week']} ({label}): {week['units']} peça(s), {week['fabric_m2']:.2f} m²")
+
+        self.stdout.write(self.style.SUCCESS("\n🧵 ROLOS PARA COMPRAR AGORA"))
+        for fabric in summary['rolls_now']:
+            self.stdout.write(f"  {fabric['fabric']}: {fabric['rolls']} rolo(s)")
+
+        late = [row for row in summary['order_now'] if row['late']]
+        if late:
+            self.stdout.write(self.style.WARNING(
+                f"\n⚠️ {len(late)} variante(s) vão ficar abaixo do estoque mínimo antes da entrega"
+            ))
+
+        if options['verbose']:
+            self.stdout.write(self.style.SUCCESS("\n👕 PEDIR AGORA"))
+            for row in summary['order_now']:
+                stockout = f"semana {row['stockout_week']}" if row['stockout_week'] >= 0 else 'fora do horizonte'
+                self.stdout.write(
+                    f"  {row['piece_name']} {row['size']}: {row['quantity']} "
+                    f"(prazo {row['lead_days']} dias, ruptura {stockout}){' ⚠️' if row['late'] else ''}"
+                )
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(row['quantity'] for row in summary['order_now'])} peça(s) para pedir agora "
+            f"({elapsed:.2f}s)"
+        ))
@@ -0,0 +1,37 @@
+"""
+Management command to recalculate the piece sales statistics
+Usage:
+    python manage.py refresh_piece_statistics
+    python manage.py refresh_piece_statistics --full
+    python manage.py refresh_piece_statistics --piece-id 12 --piece-id 15
+"""
+import time
+from django.core.management.base import BaseCommand
+from sales_stats.piece_statistics import recalculate_piece_statistics, refresh_piece_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas de venda das peças alteradas desde a última atualização'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recalculate every piece instead of the ones touched since the last refresh',
+        )
+        parser.add_argument(
+            '--piece-id',
+            type=int,
+            action='append',
+            help='Only recalculate this piece (repeatable, does not move the watermark)',
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        if options.get('piece_id'):
+            written = recalculate_piece_statistics(options['piece_id'])
+        else:
+            written = refresh_piece_statistics(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} peça(s) recalculada(s) em {time.time() - start_time:.2f} segundos"
+        ))
@@ -0,0 +1,33 @@
+"""
+Management command to recompute the collection and fabric sales statistics
+Usage:
+    python manage.py refresh_sales_rollups
+    python manage.py refresh_sales_rollups --with-pieces
+"""
+import time
+from django.core.management.base import BaseCommand
+from sales_stats.piece_statistics import refresh_piece_statistics
+from sales_stats.rollups import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os totais de venda por coleção e por tecido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--with-pieces',
+            action='store_true',
+            help='Refresh the piece statistics touched since the last refresh first',
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        if options['with_pieces']:
+            pieces = refresh_piece_statistics()
+            self.stdout.write(f"📊 {pieces} peça(s) recalculada(s)")
+
+        collections, fabrics = refresh_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {collections} coleção(ões) e {fabrics} tecido(s) atualizados em "
+            f"{time.time() - start_time:.2f} segundos"
+        ))
@@ -0,0 +1,28 @@
+"""
+Management command to recompute the per-variant sales metrics
+Usage:
+    python manage.py refresh_variant_metrics
+    python manage.py refresh_variant_metrics --piece-id 12 --piece-id 15
+"""
+import time
+from django.core.management.base import BaseCommand
+from sales_stats.metrics import refresh_variant_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as métricas de giro, cobertura e sell-through por peça e tamanho'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--piece-id',
+            type=int,
+            action='append',
+            help='Only refresh this piece (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        written = refresh_variant_metrics(options.get('piece_id'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} variação(ões) atualizada(s) em {time.time() - start_time:.2f} segundos"
+        ))
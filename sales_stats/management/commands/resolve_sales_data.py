@@ -0,0 +1,39 @@
+"""
+Management command to link stored sales to their piece and size
+Usage:
+    python manage.py resolve_sales_data
+    python manage.py resolve_sales_data --all
+"""
+import time
+from django.core.management.base import BaseCommand
+from sales_stats.piece_statistics import recalculate_piece_statistics
+from sales_stats.rollups import refresh_sales_rollups
+from sales_stats.tiny_erp import resolve_sales_data
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de produtos do Tiny e vincula as vendas às peças'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-resolve every sale, not only the unresolved ones',
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        resolved, unresolved, piece_ids = resolve_sales_data(resolve_all=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f"🔗 {resolved} venda(s) vinculada(s) em {time.time() - start_time:.2f} segundos"
+        ))
+        if unresolved:
+            self.stdout.write(self.style.WARNING(f"⚠️ {unresolved} venda(s) sem peça correspondente"))
+
+        # The sales of these pieces changed without a new sync
+        if piece_ids:
+            pieces = recalculate_piece_statistics(piece_ids)
+            collections, fabrics = refresh_sales_rollups()
+            self.stdout.write(
+                f"📊 {pieces} peça(s), {collections} coleção(ões) e {fabrics} tecido(s) recalculados"
+            )
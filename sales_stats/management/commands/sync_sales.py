@@ -2,7 +2,9 @@
 Management command to sync sales data from Tiny ERP API
 """
 from django.core.management.base import BaseCommand
-from sales_stats.tiny_erp import TinyERPSalesAPI
+from sales_stats.piece_statistics import recalculate_piece_statistics, refresh_piece_statistics
+from sales_stats.rollups import refresh_sales_rollups
+from sales_stats.tiny_erp import TinyERPSalesAPI, resolve_linked_sales
 
 
 class Command(BaseCommand):
@@ -36,6 +38,20 @@ class Command(BaseCommand):
                 )
             )
 
+        # Link the stored sales of pieces linked to Tiny ERP since the last sync
+        resolved, unresolved, resolved_piece_ids = resolve_linked_sales()
+        self.stdout.write(f'Stored sales linked: {resolved} linked, {unresolved} without piece')
+
+        # Only the pieces touched since the last refresh are recalculated; linking
+        # does not touch last_synced, so the linked pieces are recalculated explicitly
+        statistics_count = refresh_piece_statistics()
+        if resolved_piece_ids:
+            statistics_count += recalculate_piece_statistics(resolved_piece_ids)
+        self.stdout.write(f'Piece statistics recalculated: {statistics_count} pieces')
+
+        collections_count, fabrics_count = refresh_sales_rollups()
+        self.stdout.write(f'Rollups refreshed: {collections_count} collections, {fabrics_count} fabrics')
+
         if verbose:
             self.stdout.write(f'Created: {created}')
             self.stdout.write(f'Updated: {updated}')
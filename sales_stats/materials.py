@@ -0,0 +1,86 @@
+"""
+Bill of materials of a replenishment plan
+Rolls up the accessories (Piece.accessories), packaging and gifts used by
+the planned units, raises each need to the supplier minimum
+(minimum_quantity) and orders the list by delivery time, longest first,
+so the items that take longest to arrive are bought first.
+"""
+import math
+from decimal import Decimal
+
+
+def _line(kind, item_id, name, needed, minimum_quantity, price, delivery_time_days):
+    order_quantity = max(needed, minimum_quantity)
+    return {
+        'kind': kind,
+        'item_id': item_id,
+        'item_name': name,
+        'needed': needed,
+        'minimum_quantity': minimum_quantity,
+        'order_quantity': order_quantity,
+        'unit_price': price,
+        'cost': price * order_quantity,
+        'delivery_time_days': delivery_time_days,
+    }
+
+
+def material_requirements(inputs, result):
+    """
+    Accessories, packaging and gifts needed by the planned units
+
+    One accessory of each kind linked to a piece is used per unit of that
+    piece; packaging and gifts use quantity_per_piece per planned unit.
+
+    Args:
+        inputs: ReplenishmentInputs (with pieces)
+        result: ReplenishmentResult
+
+    Returns:
+        list: dicts with kind, item_id, item_name, needed, minimum_quantity,
+            order_quantity, unit_price, cost and delivery_time_days
+    """
+    from inventory.models import Gift, Packaging
+    from store_collections.models import Piece
+
+    units = result.quantities.sum(axis=1)
+    piece_units = {piece.pk: int(count) for piece, count in zip(inputs.pieces, units) if count > 0}
+    total_units = int(units.sum())
+    lines = []
+
+    # Accessories of the planned pieces, one query through the M2M table
+    accessory_links = Piece.accessories.through.objects.filter(
+        piece__active_for_replenishment=True
+    ).values_list(
+        'piece_id',
+        'inventoryaccessory_id',
+        'inventoryaccessory__name',
+        'inventoryaccessory__minimum_quantity',
+        'inventoryaccessory__price',
+        'inventoryaccessory__delivery_time_days',
+    )
+    accessories = {}
+    for piece_id, accessory_id, name, minimum_quantity, price, delivery_time_days in accessory_links:
+        if piece_id not in piece_units:
+            continue
+        accessory = accessories.setdefault(accessory_id, [name, 0, minimum_quantity, price, delivery_time_days])
+        accessory[1] += piece_units[piece_id]
+
+    for accessory_id, (name, needed, minimum_quantity, price, delivery_time_days) in accessories.items():
+        lines.append(_line('accessory', accessory_id, name, needed, minimum_quantity, price, delivery_time_days))
+
+    # Packaging and gifts per planned unit
+    if total_units:
+        for kind, model in (('packaging', Packaging), ('gift', Gift)):
+            for item in model.objects.filter(quantity_per_piece__gt=0):
+                needed = math.ceil(item.quantity_per_piece * total_units)
+                lines.append(_line(
+                    kind, item.pk, item.name, needed, item.minimum_quantity, item.price, item.delivery_time_days
+                ))
+
+    lines.sort(key=lambda line: (-line['delivery_time_days'], line['kind'], line['item_name']))
+    return lines
+
+
+def materials_cost(lines):
+    """Total cost of material_requirements lines"""
+    return sum((line['cost'] for line in lines), Decimal('0.00'))
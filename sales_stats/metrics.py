@@ -0,0 +1,99 @@
+"""
+Per-variant sell-through and velocity metrics
+Materializes VariantSalesMetrics from the StockDailySummary rollup with one
+aggregate query, so pages sort and filter on indexed columns
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+# Days averaged for the daily velocity
+VELOCITY_WINDOW_DAYS = 30
+
+
+def refresh_variant_metrics(piece_ids=None, today=None):
+    """
+    Recompute VariantSalesMetrics
+
+    Args:
+        piece_ids: Only refresh these pieces (default: every piece)
+        today: Reference day for the sales windows (default: today)
+
+    Returns:
+        int: Number of metric rows written
+    """
+    from store_collections.models import Piece, StockDailySummary
+    from .models import VariantSalesMetrics
+
+    today = today or timezone.localdate()
+
+    pieces = Piece.objects.all()
+    summaries = StockDailySummary.objects.all()
+    if piece_ids is not None:
+        pieces = pieces.filter(pk__in=piece_ids)
+        summaries = summaries.filter(piece_id__in=piece_ids)
+
+    def sold_since(days):
+        return Sum('saidas', filter=Q(day__gt=today - timedelta(days=days)), default=0)
+
+    totals = {
+        (row['piece_id'], row['size']): row
+        for row in summaries.values('piece_id', 'size').annotate(
+            sold_7d=sold_since(7),
+            sold_30d=sold_since(30),
+            sold_120d=sold_since(120),
+            sold_total=Sum('saidas', default=0),
+            last_movement=Max('day'),
+        )
+    }
+
+    metrics = []
+    for piece in pieces.only('pk', *[f'current_stock_{size.lower()}' for size in SIZES],
+                             *[f'initial_quantity_{size.lower()}' for size in SIZES]):
+        for size in SIZES:
+            row = totals.get((piece.pk, size), {})
+            current_stock = getattr(piece, f'current_stock_{size.lower()}')
+            initial_quantity = getattr(piece, f'initial_quantity_{size.lower()}')
+            sold_total = row.get('sold_total', 0)
+
+            velocity = Decimal(row.get('sold_30d', 0)) / VELOCITY_WINDOW_DAYS
+            days_of_cover = (Decimal(current_stock) / velocity).quantize(Decimal('0.1')) if velocity else None
+            sell_through = (
+                Decimal(sold_total * 100) / initial_quantity
+            ).quantize(Decimal('0.01')) if initial_quantity else Decimal('0')
+
+            metrics.append(VariantSalesMetrics(
+                piece_id=piece.pk,
+                size=size,
+                units_sold_7d=row.get('sold_7d', 0),
+                units_sold_30d=row.get('sold_30d', 0),
+                units_sold_120d=row.get('sold_120d', 0),
+                units_sold_total=sold_total,
+                daily_velocity=velocity.quantize(Decimal('0.001')),
+                current_stock=current_stock,
+                days_of_cover=days_of_cover,
+                sell_through=sell_through,
+                last_movement_date=row.get('last_movement'),
+                last_calculated=timezone.now(),
+            ))
+
+    VariantSalesMetrics.objects.bulk_create(
+        metrics,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['piece', 'size'],
+        update_fields=[
+            'units_sold_7d', 'units_sold_30d', 'units_sold_120d', 'units_sold_total',
+            'daily_velocity', 'current_stock', 'days_of_cover', 'sell_through',
+            'last_movement_date', 'last_calculated',
+        ],
+    )
+
+    logger.info(f"Variant sales metrics refreshed: {len(metrics)} rows")
+    return len(metrics)
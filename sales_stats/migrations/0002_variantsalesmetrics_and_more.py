@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0001_initial'),
+        ('store_collections', '0013_monthlystocksnapshot_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantSalesMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], max_length=2)),
+                ('units_sold_7d', models.PositiveIntegerField(default=0, verbose_name='Units Sold 7d')),
+                ('units_sold_30d', models.PositiveIntegerField(default=0, verbose_name='Units Sold 30d')),
+                ('units_sold_120d', models.PositiveIntegerField(default=0, verbose_name='Units Sold 120d')),
+                ('units_sold_total', models.PositiveIntegerField(default=0)),
+                ('daily_velocity', models.DecimalField(decimal_places=3, default=0, help_text='Average units sold per day over the last 30 days', max_digits=10)),
+                ('current_stock', models.PositiveIntegerField(default=0)),
+                ('days_of_cover', models.DecimalField(blank=True, decimal_places=1, help_text='Days the current stock lasts at the daily velocity (empty when not selling)', max_digits=10, null=True)),
+                ('sell_through', models.DecimalField(decimal_places=2, default=0, help_text='Units sold as % of the initial quantity', max_digits=7)),
+                ('last_movement_date', models.DateField(blank=True, null=True)),
+                ('last_calculated', models.DateTimeField(auto_now=True)),
+                ('piece', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variant_metrics', to='store_collections.piece')),
+            ],
+            options={
+                'verbose_name': 'Variant Sales Metrics',
+                'verbose_name_plural': 'Variant Sales Metrics',
+                'ordering': ['piece', 'size'],
+                'indexes': [models.Index(fields=['daily_velocity'], name='sales_stats_daily_v_a58bc0_idx'), models.Index(fields=['days_of_cover'], name='sales_stats_days_of_5be24c_idx'), models.Index(fields=['sell_through'], name='sales_stats_sell_th_d1819b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='variantsalesmetrics',
+            constraint=models.UniqueConstraint(fields=('piece', 'size'), name='unique_variant_sales_metrics'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0002_variantsalesmetrics_and_more'),
+        ('store_collections', '0013_monthlystocksnapshot_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplenishmentRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('running', 'Calculando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=10)),
+                ('window_days', models.PositiveIntegerField(default=120, help_text='Days of sales considered')),
+                ('minimum_stock', models.PositiveIntegerField(default=5, help_text='Minimum stock for launched pieces')),
+                ('data_version', models.CharField(blank=True, db_index=True, help_text='Version of the input data when requested (reused while unchanged)', max_length=64)),
+                ('fabric_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('production_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_pieces', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replenishment_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Replenishment Run',
+                'verbose_name_plural': 'Replenishment Runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReplenishmentLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('piece_name', models.CharField(max_length=200)),
+                ('fabric_label', models.CharField(blank=True, help_text='Fabric name and color', max_length=300)),
+                ('launch_status', models.CharField(choices=[('em_lancamento', 'Em Lançamento'), ('lancada', 'Lançada')], max_length=20)),
+                ('size', models.CharField(choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], max_length=2)),
+                ('needed', models.PositiveIntegerField(default=0, help_text='Units to reach the target stock')),
+                ('surplus', models.PositiveIntegerField(default=0, help_text='Units from the surplus fabric')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('piece', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='store_collections.piece')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='sales_stats.replenishmentrun')),
+            ],
+            options={
+                'verbose_name': 'Replenishment Line',
+                'verbose_name_plural': 'Replenishment Lines',
+                'ordering': ['run', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReplenishmentFabricLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fabric_name', models.CharField(max_length=200)),
+                ('fabric_color', models.CharField(blank=True, max_length=100)),
+                ('m2_needed', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('rolls', models.PositiveIntegerField(default=0)),
+                ('surplus_m2', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fabric', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='store_collections.fabric')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fabric_lines', to='sales_stats.replenishmentrun')),
+            ],
+            options={
+                'verbose_name': 'Replenishment Fabric Line',
+                'verbose_name_plural': 'Replenishment Fabric Lines',
+                'ordering': ['run', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='replenishmentrun',
+            index=models.Index(fields=['status', '-created_at'], name='sales_stats_status_897daa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='replenishmentline',
+            index=models.Index(fields=['run', 'piece'], name='sales_stats_run_id_95d743_idx'),
+        ),
+    ]
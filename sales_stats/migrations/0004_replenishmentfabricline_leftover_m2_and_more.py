@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0003_replenishmentrun_replenishmentline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='replenishmentfabricline',
+            name='leftover_m2',
+            field=models.DecimalField(decimal_places=3, default=0, help_text='m² unused after the surplus units (negative: more fabric than the rolls hold)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='replenishmentrun',
+            name='optimize_rolls',
+            field=models.BooleanField(default=False, help_text='Leftover fabric allocated by the MILP roll optimizer instead of the proportional split'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0004_replenishmentfabricline_leftover_m2_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='replenishmentrun',
+            name='materials_cost',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Accessories, packaging and gifts', max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='ReplenishmentMaterialLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('accessory', 'Acessório'), ('packaging', 'Embalagem'), ('gift', 'Brinde')], max_length=10)),
+                ('item_id', models.PositiveIntegerField(help_text='InventoryAccessory, Packaging or Gift id')),
+                ('item_name', models.CharField(max_length=200)),
+                ('needed', models.PositiveIntegerField(default=0, help_text='Units used by the planned pieces')),
+                ('minimum_quantity', models.PositiveIntegerField(default=0)),
+                ('order_quantity', models.PositiveIntegerField(default=0)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('delivery_time_days', models.PositiveIntegerField(default=0)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='material_lines', to='sales_stats.replenishmentrun')),
+            ],
+            options={
+                'verbose_name': 'Replenishment Material Line',
+                'verbose_name_plural': 'Replenishment Material Lines',
+                'ordering': ['-delivery_time_days', 'kind', 'item_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0005_replenishmentrun_materials_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('processed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistics Watermark',
+                'verbose_name_plural': 'Statistics Watermarks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='salesdata',
+            index=models.Index(fields=['last_synced'], name='sales_stats_last_sy_0742a7_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0006_statisticswatermark_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesforecast',
+            name='input_hash',
+            field=models.CharField(blank=True, help_text='Hash of the input window and model parameters; unchanged inputs reuse the forecast', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='salesforecast',
+            name='target_id',
+            field=models.PositiveIntegerField(blank=True, help_text='Id of the piece/collection/fabric being forecasted (empty for overall)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='salesforecast',
+            index=models.Index(fields=['forecast_type', 'forecast_date'], name='sales_stats_forecas_3daa3a_idx'),
+        ),
+    ]
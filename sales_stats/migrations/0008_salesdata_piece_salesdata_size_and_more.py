@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0007_salesforecast_input_hash_salesforecast_target_id_and_more'),
+        ('store_collections', '0015_tinyproductindex_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesdata',
+            name='piece',
+            field=models.ForeignKey(blank=True, help_text='Piece sold (empty if the product is not linked)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='store_collections.piece'),
+        ),
+        migrations.AddField(
+            model_name='salesdata',
+            name='size',
+            field=models.CharField(blank=True, choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], max_length=2),
+        ),
+        migrations.AddField(
+            model_name='salesdata',
+            name='tiny_product_id',
+            field=models.CharField(blank=True, help_text='Product/variation ID in Tiny ERP', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='salesdata',
+            index=models.Index(fields=['piece', 'sale_date'], name='sales_stats_piece_i_8065d5_idx'),
+        ),
+    ]
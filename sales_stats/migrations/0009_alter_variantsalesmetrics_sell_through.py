@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0008_salesdata_piece_salesdata_size_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='variantsalesmetrics',
+            name='sell_through',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Units sold as % of the initial quantity', max_digits=14),
+        ),
+    ]
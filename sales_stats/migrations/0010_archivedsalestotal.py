@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0009_alter_variantsalesmetrics_sell_through'),
+        ('store_collections', '0015_tinyproductindex_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSalesTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('piece', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archived_sales', to='store_collections.piece')),
+            ],
+            options={
+                'verbose_name': 'Archived Sales Total',
+                'verbose_name_plural': 'Archived Sales Totals',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales_stats', '0010_archivedsalestotal'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salesforecast',
+            name='input_hash',
+            field=models.CharField(blank=True, help_text='Hash of the sale days in the window and model parameters; unchanged sales reuse the forecast', max_length=64),
+        ),
+    ]
@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.db import models
-from store_collections.models import Piece, Collection, Fabric
+from store_collections.models import Piece, Collection, Fabric, StockHistory
 
 
 class SalesData(models.Model):
@@ -11,6 +12,7 @@ class SalesData(models.Model):
     sale_date = models.DateField()
     piece_sku = models.CharField(max_length=100, help_text="SKU of the piece sold")
     piece_name = models.CharField(max_length=200)
+    tiny_product_id = models.CharField(max_length=100, blank=True, help_text="Product/variation ID in Tiny ERP")
     quantity_sold = models.PositiveIntegerField(default=0)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -21,12 +23,28 @@ class SalesData(models.Model):
     quantity_g = models.PositiveIntegerField(default=0, verbose_name="Quantity G")
     quantity_gg = models.PositiveIntegerField(default=0, verbose_name="Quantity GG")
 
+    # Resolved at ingestion through TinyProductIndex (see store_collections.tiny_index)
+    piece = models.ForeignKey(
+        Piece,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sales',
+        help_text="Piece sold (empty if the product is not linked)"
+    )
+    size = models.CharField(max_length=2, choices=Piece.SIZE_CHOICES, blank=True)
+
     # API sync tracking
     last_synced = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-sale_date', '-created_at']
+        indexes = [
+            # Sales synced since the last statistics refresh
+            models.Index(fields=['last_synced']),
+            models.Index(fields=['piece', 'sale_date']),
+        ]
         verbose_name = "Sales Data (Tiny ERP)"
         verbose_name_plural = "Sales Data (Tiny ERP)"
 
@@ -69,6 +87,25 @@ class PieceSalesStatistics(models.Model):
         return f"Stats: {self.piece} ({self.total_units_sold} sold)"
 
 
+class ArchivedSalesTotal(models.Model):
+    """
+    Units and revenue of the archived SalesData rows of a piece
+    Added to by sales_stats.archive in the transaction that deletes the rows,
+    so piece statistics keep the revenue of archived days
+    """
+    piece = models.OneToOneField(Piece, on_delete=models.CASCADE, related_name='archived_sales')
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Archived Sales Total"
+        verbose_name_plural = "Archived Sales Totals"
+
+    def __str__(self):
+        return f"{self.piece}: {self.units_sold} archived units"
+
+
 class CollectionSalesStatistics(models.Model):
     """
     Aggregated statistics for collections
@@ -131,6 +168,83 @@ class FabricSalesStatistics(models.Model):
         return f"Stats: {self.fabric} ({self.total_units_sold} pieces sold)"
 
 
+class StatisticsWatermark(models.Model):
+    """
+    How far an incremental statistics refresh has processed
+    Changes made after processed_until are picked up by the next refresh
+    """
+    name = models.CharField(max_length=50, unique=True)
+    processed_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistics Watermark"
+        verbose_name_plural = "Statistics Watermarks"
+
+    def __str__(self):
+        return f"{self.name}: {self.processed_until}"
+
+
+class VariantSalesMetrics(models.Model):
+    """
+    Sell-through and velocity metrics per piece and size
+    Materialized from StockDailySummary, refreshed after every stock sync
+    """
+    SIZE_CHOICES = StockHistory.SIZE_CHOICES
+
+    piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name='variant_metrics')
+    size = models.CharField(max_length=2, choices=SIZE_CHOICES)
+
+    # Units sold (saídas) per window
+    units_sold_7d = models.PositiveIntegerField(default=0, verbose_name="Units Sold 7d")
+    units_sold_30d = models.PositiveIntegerField(default=0, verbose_name="Units Sold 30d")
+    units_sold_120d = models.PositiveIntegerField(default=0, verbose_name="Units Sold 120d")
+    units_sold_total = models.PositiveIntegerField(default=0)
+
+    # Performance metrics
+    daily_velocity = models.DecimalField(
+        max_digits=10,
+        decimal_places=3,
+        default=0,
+        help_text="Average units sold per day over the last 30 days"
+    )
+    current_stock = models.PositiveIntegerField(default=0)
+    days_of_cover = models.DecimalField(
+        max_digits=10,
+        decimal_places=1,
+        null=True,
+        blank=True,
+        help_text="Days the current stock lasts at the daily velocity (empty when not selling)"
+    )
+    sell_through = models.DecimalField(
+        # Units sold can exceed the initial quantity many times over (restocks)
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Units sold as % of the initial quantity"
+    )
+    last_movement_date = models.DateField(null=True, blank=True)
+
+    # Tracking
+    last_calculated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['piece', 'size']
+        constraints = [
+            models.UniqueConstraint(fields=['piece', 'size'], name='unique_variant_sales_metrics'),
+        ]
+        indexes = [
+            models.Index(fields=['daily_velocity']),
+            models.Index(fields=['days_of_cover']),
+            models.Index(fields=['sell_through']),
+        ]
+        verbose_name = "Variant Sales Metrics"
+        verbose_name_plural = "Variant Sales Metrics"
+
+    def __str__(self):
+        return f"Metrics: {self.piece} ({self.size})"
+
+
 class SalesForecast(models.Model):
     """
     Sales forecasts calculated using data science (NumPy, Pandas, SciPy)
@@ -145,6 +259,11 @@ class SalesForecast(models.Model):
 
     forecast_type = models.CharField(max_length=20, choices=FORECAST_TYPES)
     target_name = models.CharField(max_length=200, help_text="Name of piece/collection/fabric being forecasted")
+    target_id = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Id of the piece/collection/fabric being forecasted (empty for overall)"
+    )
 
     # Forecast data
     forecast_date = models.DateField(help_text="Date for which forecast is made")
@@ -166,6 +285,11 @@ class SalesForecast(models.Model):
         help_text="Statistical model used (e.g., Linear Regression, ARIMA)"
     )
     notes = models.TextField(blank=True, help_text="Additional notes about the forecast")
+    input_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Hash of the sale days in the window and model parameters; unchanged sales reuse the forecast"
+    )
 
     # Tracking
     created_at = models.DateTimeField(auto_now_add=True)
@@ -173,8 +297,171 @@ class SalesForecast(models.Model):
 
     class Meta:
         ordering = ['-forecast_date', '-created_at']
+        indexes = [
+            models.Index(fields=['forecast_type', 'forecast_date']),
+        ]
         verbose_name = "Sales Forecast"
         verbose_name_plural = "Sales Forecasts"
 
     def __str__(self):
         return f"{self.forecast_type}: {self.target_name} ({self.forecast_date})"
+
+
+class ReplenishmentRun(models.Model):
+    """
+    One replenishment calculation: parameters, status and totals
+    Computed in the background by sales_stats.tasks.run_replenishment_task
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Na fila'),
+        ('running', 'Calculando'),
+        ('done', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+
+    # Parameters
+    window_days = models.PositiveIntegerField(default=120, help_text="Days of sales considered")
+    minimum_stock = models.PositiveIntegerField(default=5, help_text="Minimum stock for launched pieces")
+    optimize_rolls = models.BooleanField(
+        default=False,
+        help_text="Leftover fabric allocated by the MILP roll optimizer instead of the proportional split"
+    )
+    data_version = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="Version of the input data when requested (reused while unchanged)"
+    )
+
+    # Totals
+    fabric_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    production_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    materials_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text="Accessories, packaging and gifts"
+    )
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_pieces = models.PositiveIntegerField(default=0)
+
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='replenishment_runs'
+    )
+
+    # Tracking
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+        ]
+        verbose_name = "Replenishment Run"
+        verbose_name_plural = "Replenishment Runs"
+
+    def __str__(self):
+        return f"Replenishment #{self.pk} ({self.get_status_display()}) - {self.created_at:%d/%m/%Y %H:%M}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class ReplenishmentFabricLine(models.Model):
+    """
+    Fabric rolls of a replenishment run
+    Names are copied so past runs stay readable after edits or deletions
+    """
+    run = models.ForeignKey(ReplenishmentRun, on_delete=models.CASCADE, related_name='fabric_lines')
+    fabric = models.ForeignKey(Fabric, on_delete=models.SET_NULL, null=True, blank=True)
+    fabric_name = models.CharField(max_length=200)
+    fabric_color = models.CharField(max_length=100, blank=True)
+
+    m2_needed = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    rolls = models.PositiveIntegerField(default=0)
+    surplus_m2 = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    leftover_m2 = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        help_text="m² unused after the surplus units (negative: more fabric than the rolls hold)"
+    )
+    cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['run', 'id']
+        verbose_name = "Replenishment Fabric Line"
+        verbose_name_plural = "Replenishment Fabric Lines"
+
+    def __str__(self):
+        return f"{self.fabric_name} - {self.rolls} rolls"
+
+
+class ReplenishmentLine(models.Model):
+    """
+    Quantity to produce for one piece and size in a replenishment run
+    """
+    SIZE_CHOICES = StockHistory.SIZE_CHOICES
+
+    run = models.ForeignKey(ReplenishmentRun, on_delete=models.CASCADE, related_name='lines')
+    piece = models.ForeignKey(Piece, on_delete=models.SET_NULL, null=True, blank=True)
+    piece_name = models.CharField(max_length=200)
+    fabric_label = models.CharField(max_length=300, blank=True, help_text="Fabric name and color")
+    launch_status = models.CharField(max_length=20, choices=Piece.LAUNCH_STATUS_CHOICES)
+    size = models.CharField(max_length=2, choices=SIZE_CHOICES)
+
+    needed = models.PositiveIntegerField(default=0, help_text="Units to reach the target stock")
+    surplus = models.PositiveIntegerField(default=0, help_text="Units from the surplus fabric")
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['run', 'id']
+        indexes = [
+            models.Index(fields=['run', 'piece']),
+        ]
+        verbose_name = "Replenishment Line"
+        verbose_name_plural = "Replenishment Lines"
+
+    def __str__(self):
+        return f"{self.piece_name} ({self.size}): {self.quantity}"
+
+
+class ReplenishmentMaterialLine(models.Model):
+    """
+    Accessories, packaging and gifts needed by a replenishment run
+    Order quantity is the need raised to the supplier minimum (minimum_quantity)
+    """
+    KIND_CHOICES = [
+        ('accessory', 'Acessório'),
+        ('packaging', 'Embalagem'),
+        ('gift', 'Brinde'),
+    ]
+
+    run = models.ForeignKey(ReplenishmentRun, on_delete=models.CASCADE, related_name='material_lines')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    item_id = models.PositiveIntegerField(help_text="InventoryAccessory, Packaging or Gift id")
+    item_name = models.CharField(max_length=200)
+    needed = models.PositiveIntegerField(default=0, help_text="Units used by the planned pieces")
+    minimum_quantity = models.PositiveIntegerField(default=0)
+    order_quantity = models.PositiveIntegerField(default=0)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    delivery_time_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-delivery_time_days', 'kind', 'item_name']
+        verbose_name = "Replenishment Material Line"
+        verbose_name_plural = "Replenishment Material Lines"
+
+    def __str__(self):
+        return f"#{self.run_id} {self.item_name}: {self.order_quantity}"
@@ -0,0 +1,94 @@
+"""
+Process-pool runner for per-series models
+Models that fit one series at a time (e.g. SciPy optimizers) are run over
+chunks of rows of a (series, days) matrix in a pool of processes. The matrix
+is placed once in shared memory and every worker maps it read-only, so only
+the (start, stop) bounds of each chunk are sent to the workers and only the
+compact per-series results come back.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Series per work unit
+CHUNK_SIZE = 250
+
+# Matrix mapped by each worker process (set by _attach)
+_worker_state = {}
+
+
+def pool_size(series_count, chunk_size=CHUNK_SIZE):
+    """
+    Processes to use: FORECAST_WORKERS (0: every core), no more than the chunks;
+    1 inside daemon processes (Celery prefork workers), which cannot start children
+    """
+    if multiprocessing.current_process().daemon:
+        return 1
+    workers = settings.FORECAST_WORKERS or os.cpu_count() or 1
+    chunks = -(-series_count // chunk_size)
+    return max(min(workers, chunks), 1)
+
+
+def _attach(name, shape, dtype, func, params):
+    """Pool initializer: map the shared matrix read-only"""
+    memory = shared_memory.SharedMemory(name=name)
+    matrix = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    matrix.flags.writeable = False
+    _worker_state.update(memory=memory, matrix=matrix, func=func, params=params)
+
+
+def _run_chunk(bounds):
+    start, stop = bounds
+    return _worker_state['func'](_worker_state['matrix'][start:stop], **_worker_state['params'])
+
+
+def _concatenate(results):
+    """Join the per-chunk result dicts key by key"""
+    if not results:
+        return {}
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def run_per_series(func, matrix, chunk_size=CHUNK_SIZE, workers=None, **params):
+    """
+    Apply `func` to every chunk of rows of `matrix` in a process pool
+
+    Args:
+        func: Module-level function (picklable) taking a (k, days) read-only
+            array and keyword params, returning a dict of (k,) arrays
+        matrix: (series, days) NumPy array
+        chunk_size: Rows per work unit
+        workers: Processes (default: pool_size)
+        **params: Passed to func
+
+    Returns:
+        dict: The arrays of func for all rows, in row order
+    """
+    matrix = np.ascontiguousarray(matrix)
+    bounds = [(start, min(start + chunk_size, len(matrix))) for start in range(0, len(matrix), chunk_size)]
+    workers = workers or pool_size(len(matrix), chunk_size)
+
+    if workers == 1 or len(bounds) <= 1:
+        return _concatenate([func(matrix[start:stop], **params) for start, stop in bounds])
+
+    memory = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=memory.buf)[:] = matrix
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(memory.name, matrix.shape, matrix.dtype, func, params),
+        ) as executor:
+            results = list(executor.map(_run_chunk, bounds))
+    finally:
+        memory.close()
+        memory.unlink()
+
+    logger.info(f"{func.__name__} fitted {len(matrix)} series in {len(bounds)} chunks on {workers} processes")
+    return _concatenate(results)
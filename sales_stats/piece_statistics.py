@@ -0,0 +1,295 @@
+"""
+PieceSalesStatistics recalculation
+Units sold, the size breakdown and the first/last sale dates come from the
+StockDailySummary rollup of StockHistory (saídas, including days whose
+history was archived); revenue comes from the SalesData rows resolved to
+the piece at ingestion (SalesData.piece) plus ArchivedSalesTotal, which
+keeps the revenue of sales rows moved to the archive (0, with no average
+price, for pieces without sales; it is never estimated from stock
+outflows, which include returns and adjustments). Both are read with
+grouped aggregates and written with one bulk upsert per chunk of pieces.
+
+refresh_piece_statistics() only recalculates the pieces touched since the
+last refresh (StatisticsWatermark), found through the indexed
+StockDailySummary.updated_at and SalesData.last_synced columns.
+"""
+import logging
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+WATERMARK_NAME = 'piece_sales_statistics'
+
+# Pieces recalculated per aggregate query and upsert
+CHUNK_SIZE = 2000
+
+UPDATE_FIELDS = [
+    'total_units_sold', 'total_revenue', 'average_sale_price',
+    'total_sold_p', 'total_sold_m', 'total_sold_g', 'total_sold_gg',
+    'first_sale_date', 'last_sale_date', 'days_since_launch', 'last_calculated',
+]
+
+
+def _days_since_launch(launch_date, today):
+    return max((today - launch_date).days, 0) if launch_date else 0
+
+
+def _recalculate_chunk(pieces, today):
+    """Build and upsert the statistics of a list of pieces (with collection)"""
+    from store_collections.models import StockDailySummary
+    from .models import ArchivedSalesTotal, PieceSalesStatistics, SalesData
+
+    sold = {
+        row['piece_id']: row
+        for row in StockDailySummary.objects.filter(
+            piece_id__in=[piece.pk for piece in pieces], saidas__gt=0
+        ).values('piece_id').annotate(
+            total=Sum('saidas'),
+            first_sale=Min('day'),
+            last_sale=Max('day'),
+            **{f'sold_{size.lower()}': Sum('saidas', filter=Q(size=size), default=0) for size in SIZES},
+        )
+    }
+
+    revenue = {
+        row['piece_id']: row
+        for row in SalesData.objects.filter(
+            piece_id__in=[piece.pk for piece in pieces]
+        ).values('piece_id').annotate(
+            revenue=Sum('total_amount'),
+            units=Sum('quantity_sold'),
+        )
+    }
+    archived = {
+        piece_id: (units, archived_revenue)
+        for piece_id, units, archived_revenue in ArchivedSalesTotal.objects.filter(
+            piece_id__in=[piece.pk for piece in pieces]
+        ).values_list('piece_id', 'units_sold', 'revenue')
+    }
+
+    now = timezone.now()
+    statistics = []
+    for piece in pieces:
+        row = sold.get(piece.pk, {})
+        units = row.get('total', 0)
+        sales = revenue.get(piece.pk, {})
+        archived_units, archived_revenue = archived.get(piece.pk, (0, Decimal('0')))
+        sales_units = (sales.get('units') or 0) + archived_units
+
+        total_revenue = (sales.get('revenue') or Decimal('0')) + archived_revenue
+        average_price = Decimal('0')
+        if sales_units:
+            average_price = (total_revenue / sales_units).quantize(Decimal('0.01'))
+
+        launch_date = piece.collection.actual_launch_date or row.get('first_sale')
+        statistics.append(PieceSalesStatistics(
+            piece_id=piece.pk,
+            total_units_sold=units,
+            total_revenue=total_revenue,
+            average_sale_price=average_price,
+            **{f'total_sold_{size.lower()}': row.get(f'sold_{size.lower()}', 0) for size in SIZES},
+            first_sale_date=row.get('first_sale'),
+            last_sale_date=row.get('last_sale'),
+            days_since_launch=_days_since_launch(launch_date, today),
+            last_calculated=now,
+        ))
+
+    PieceSalesStatistics.objects.bulk_create(
+        statistics,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['piece'],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(statistics)
+
+
+def add_archived_sales(sales_ids):
+    """
+    Add SalesData rows about to be archived to the ArchivedSalesTotal of
+    their pieces (bulk-create the missing rows, lock, increment in memory,
+    bulk-update). Must run in the transaction that deletes the rows
+    """
+    from .models import ArchivedSalesTotal, SalesData
+
+    totals = {
+        row['piece_id']: row
+        for row in SalesData.objects.filter(pk__in=sales_ids, piece__isnull=False).values('piece_id').annotate(
+            units=Sum('quantity_sold'),
+            revenue=Sum('total_amount'),
+        )
+    }
+    if not totals:
+        return
+
+    ArchivedSalesTotal.objects.bulk_create(
+        [ArchivedSalesTotal(piece_id=piece_id) for piece_id in totals],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    changed = []
+    for total in ArchivedSalesTotal.objects.select_for_update().filter(piece_id__in=totals):
+        total.units_sold += totals[total.piece_id]['units']
+        total.revenue += totals[total.piece_id]['revenue']
+        total.updated_at = now
+        changed.append(total)
+    ArchivedSalesTotal.objects.bulk_update(changed, ['units_sold', 'revenue', 'updated_at'], batch_size=1000)
+
+
+def rebuild_archived_sales():
+    """
+    Recompute ArchivedSalesTotal from the archive files (for sales archived
+    before the totals existed); one pass over the archived sales
+
+    Returns:
+        int: Pieces with archived sales
+    """
+    from store_collections.models import Piece
+    from .archive import read_archive
+    from .models import ArchivedSalesTotal
+
+    totals = {}
+    for row in read_archive('sales_data'):
+        if row['piece_id'] is None:
+            continue
+        units, total_revenue = totals.get(row['piece_id'], (0, Decimal('0')))
+        totals[row['piece_id']] = (units + row['quantity_sold'], total_revenue + row['total_amount'])
+
+    # Archived sales of pieces deleted since then
+    existing = set(Piece.objects.filter(pk__in=totals).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        ArchivedSalesTotal.objects.all().delete()
+        ArchivedSalesTotal.objects.bulk_create(
+            [ArchivedSalesTotal(piece_id=piece_id, units_sold=units, revenue=total_revenue)
+             for piece_id, (units, total_revenue) in totals.items() if piece_id in existing],
+            batch_size=1000,
+        )
+    return len(existing)
+
+
+def recalculate_piece_statistics(piece_ids=None, today=None):
+    """
+    Recompute PieceSalesStatistics
+
+    Args:
+        piece_ids: Only recalculate these pieces (default: every piece)
+        today: Reference day for days_since_launch (default: today)
+
+    Returns:
+        int: Number of statistics rows written
+    """
+    from store_collections.models import Piece
+
+    today = today or timezone.localdate()
+
+    pieces = Piece.objects.select_related('collection').only(
+        'pk', 'collection__actual_launch_date'
+    ).order_by('pk')
+    if piece_ids is not None:
+        piece_ids = sorted(set(piece_ids))
+
+    written = 0
+    if piece_ids is None:
+        chunk = []
+        for piece in pieces.iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(piece)
+            if len(chunk) == CHUNK_SIZE:
+                written += _recalculate_chunk(chunk, today)
+                chunk = []
+        if chunk:
+            written += _recalculate_chunk(chunk, today)
+    else:
+        for start in range(0, len(piece_ids), CHUNK_SIZE):
+            chunk = list(pieces.filter(pk__in=piece_ids[start:start + CHUNK_SIZE]))
+            if chunk:
+                written += _recalculate_chunk(chunk, today)
+
+    logger.info(f"Piece sales statistics recalculated: {written} pieces")
+    return written
+
+
+def touched_piece_ids(since):
+    """
+    Pieces whose statistics may have changed after `since`: new stock
+    movements, synced sales resolved to them, edited pieces and pieces
+    without statistics
+
+    Returns:
+        set: Piece ids
+    """
+    from store_collections.models import Piece, StockDailySummary
+    from .models import SalesData
+
+    piece_ids = set(StockDailySummary.objects.filter(updated_at__gte=since).values_list('piece_id', flat=True))
+    piece_ids.update(Piece.objects.filter(
+        Q(updated_at__gte=since) | Q(sales_statistics__isnull=True)
+    ).values_list('pk', flat=True))
+
+    piece_ids.update(SalesData.objects.filter(
+        last_synced__gte=since, piece__isnull=False
+    ).values_list('piece_id', flat=True).distinct())
+
+    return piece_ids
+
+
+def refresh_days_since_launch(today=None):
+    """
+    Move days_since_launch to `today` for every piece (it changes daily even
+    without sales); one read of the pieces and one bulk update, no aggregates
+    """
+    from .models import PieceSalesStatistics
+
+    today = today or timezone.localdate()
+    statistics = list(PieceSalesStatistics.objects.select_related('piece__collection').only(
+        'pk', 'days_since_launch', 'first_sale_date', 'piece__collection__actual_launch_date'
+    ))
+
+    changed = []
+    for stats in statistics:
+        launch_date = stats.piece.collection.actual_launch_date or stats.first_sale_date
+        days = _days_since_launch(launch_date, today)
+        if days != stats.days_since_launch:
+            stats.days_since_launch = days
+            changed.append(stats)
+
+    PieceSalesStatistics.objects.bulk_update(changed, ['days_since_launch'], batch_size=1000)
+    return len(changed)
+
+
+def refresh_piece_statistics(full=False, today=None):
+    """
+    Recalculate the statistics of the pieces touched since the last refresh
+    and move the watermark forward (a full recalculation on the first run)
+
+    Args:
+        full: Recalculate every piece
+        today: Reference day for days_since_launch (default: today)
+
+    Returns:
+        int: Number of statistics rows written
+    """
+    from .models import StatisticsWatermark
+
+    today = today or timezone.localdate()
+    # Taken before reading, so changes made during the refresh are caught next time
+    started_at = timezone.now()
+
+    watermark = StatisticsWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if full or watermark is None:
+        written = recalculate_piece_statistics(today=today)
+    else:
+        written = recalculate_piece_statistics(touched_piece_ids(watermark.processed_until), today=today)
+        if timezone.localdate(watermark.processed_until) != today:
+            refresh_days_since_launch(today)
+
+    StatisticsWatermark.objects.update_or_create(
+        name=WATERMARK_NAME,
+        defaults={'processed_until': started_at},
+    )
+    return written
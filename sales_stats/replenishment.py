@@ -0,0 +1,380 @@
+"""
+Vectorized replenishment engine
+Loads active pieces, fabric consumptions, stocks and aggregated sales into
+NumPy arrays once and computes replenishment quantities, fabric rolls,
+surplus distribution and costs without per-piece Python loops.
+
+compute_replenishment() only needs a ReplenishmentInputs, so it can run on
+arrays built by hand (no database).
+"""
+import hashlib
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+SIZES = ['P', 'M', 'G', 'GG']
+SIZE_INDEX = {size: index for index, size in enumerate(SIZES)}
+
+# Sales window and minimum stock of launched pieces
+WINDOW_DAYS = 120
+MINIMUM_STOCK = 5
+# Longest sales window accepted from the API (ten years)
+MAX_WINDOW_DAYS = 3650
+
+
+def _cents(value):
+    return int((value * 100).to_integral_value())
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class ReplenishmentInputs:
+    """
+    Catalog and sales as arrays
+
+    Piece axis (n): active pieces; fabric axis (f) and category axis (c)
+    cover the active pieces and every piece with sales in the window.
+
+    Attributes:
+        fabric_index, category_index: (n,) position of each piece's fabric/category
+        launched, in_launch: (n,) launch_status == 'lancada' / 'em_lancamento'
+        consumption: (n, 4) fabric m² per unit, per size
+        stock, initial, sold: (n, 4) current stock, initial quantity, units sold in the window
+        m2_per_roll: (f,) roll_weight_kg * yield_area_per_kg
+        roll_price_cents: (f,) price per roll in cents
+        production_cost_cents: (c,) production cost per piece in cents
+        sold_by_category: (f, c, 4) units sold in the window per fabric, category and size
+        pieces, fabrics, categories: Model instances matching the axes (optional, for display)
+    """
+
+    def __init__(self, fabric_index, category_index, launched, in_launch, consumption, stock, initial, sold,
+                 m2_per_roll, roll_price_cents, production_cost_cents, sold_by_category,
+                 pieces=None, fabrics=None, categories=None):
+        self.fabric_index = np.asarray(fabric_index, dtype=np.intp)
+        self.category_index = np.asarray(category_index, dtype=np.intp)
+        self.launched = np.asarray(launched, dtype=bool)
+        self.in_launch = np.asarray(in_launch, dtype=bool)
+        self.consumption = np.asarray(consumption, dtype=np.float64).reshape(-1, len(SIZES))
+        self.stock = np.asarray(stock, dtype=np.int64).reshape(-1, len(SIZES))
+        self.initial = np.asarray(initial, dtype=np.int64).reshape(-1, len(SIZES))
+        self.sold = np.asarray(sold, dtype=np.int64).reshape(-1, len(SIZES))
+        self.m2_per_roll = np.asarray(m2_per_roll, dtype=np.float64)
+        self.roll_price_cents = np.asarray(roll_price_cents, dtype=np.int64)
+        self.production_cost_cents = np.asarray(production_cost_cents, dtype=np.int64)
+        self.sold_by_category = np.asarray(sold_by_category, dtype=np.int64).reshape(
+            len(self.m2_per_roll), len(self.production_cost_cents), len(SIZES)
+        )
+        self.pieces = pieces
+        self.fabrics = fabrics
+        self.categories = categories
+
+
+class ReplenishmentResult:
+    """
+    Output of compute_replenishment
+
+    Attributes:
+        needed: (n, 4) units to reach the target stock
+        surplus: (n, 4) extra units made from the rounded-up fabric rolls
+        quantities: (n, 4) needed + surplus
+        rolls: (f,) rolls to buy per fabric
+        fabric_m2: (f,) m² needed per fabric
+        surplus_m2: (f,) m² left over from the rounded-up rolls
+        leftover_m2: (f,) m² still unused after the surplus units (negative when
+            the rounded split uses more fabric than the rolls hold)
+        fabric_used: (f,) fabrics with any needed unit (listed in the results)
+        fabric_cost, production_cost, total_cost: Decimal
+        total_pieces: int
+    """
+
+    def __init__(self, needed, surplus, rolls, fabric_m2, surplus_m2, fabric_used,
+                 fabric_cost_cents, production_cost_cents, leftover_m2=None):
+        self.needed = needed
+        self.surplus = surplus
+        self.quantities = needed + surplus
+        self.rolls = rolls
+        self.fabric_m2 = fabric_m2
+        self.surplus_m2 = surplus_m2
+        self.leftover_m2 = surplus_m2 if leftover_m2 is None else leftover_m2
+        self.fabric_used = fabric_used
+        self.fabric_cost = _money(fabric_cost_cents)
+        self.production_cost = _money(production_cost_cents)
+        self.total_cost = self.fabric_cost + self.production_cost
+        self.total_pieces = int(self.quantities.sum())
+
+
+def compute_replenishment(inputs, minimum_stock=MINIMUM_STOCK, distribute_surplus=True,
+                          optimize_rolls=False, time_limit=None):
+    """
+    Replenishment quantities, fabric rolls, surplus distribution and costs
+
+    - Pieces 'em_lancamento' get exactly their initial quantity
+    - Launched pieces get minimum_stock + units sold in the window - stock
+    - Rolls are rounded up per fabric; the leftover m² is split between the
+      launched pieces of that fabric by the category share of the fabric
+      sales and the size share of the category sales
+
+    Args:
+        inputs: ReplenishmentInputs
+        minimum_stock: Minimum stock kept for launched pieces, a number or a
+            (n,) array with one minimum per piece
+        distribute_surplus: Turn the leftover m² into extra units
+        optimize_rolls: Choose the extra units with the MILP roll optimizer
+            (sales_stats.roll_optimizer) instead of rounding the split
+        time_limit: Seconds for the optimizer (default: roll_optimizer.TIME_LIMIT)
+
+    Returns:
+        ReplenishmentResult
+    """
+    fabric_count = len(inputs.m2_per_roll)
+
+    # Units needed per variant
+    minimum_stock = np.asarray(minimum_stock, dtype=np.int64)
+    if minimum_stock.ndim:
+        minimum_stock = minimum_stock[:, None]
+    target = np.maximum(0, minimum_stock + inputs.sold - inputs.stock)
+    needed = np.where(inputs.in_launch[:, None], inputs.initial, np.where(inputs.launched[:, None], target, 0))
+
+    # Fabric m² and rolls
+    fabric_m2 = np.bincount(
+        inputs.fabric_index, weights=(inputs.consumption * needed).sum(axis=1), minlength=fabric_count
+    )
+    fabric_used = np.bincount(
+        inputs.fabric_index, weights=(needed > 0).any(axis=1), minlength=fabric_count
+    ) > 0
+
+    has_rolls = fabric_used & (inputs.m2_per_roll > 0)
+    rolls = np.zeros(fabric_count, dtype=np.int64)
+    # Rounded before ceil so float noise does not add a roll on exact multiples
+    rolls[has_rolls] = np.ceil(np.round(fabric_m2[has_rolls] / inputs.m2_per_roll[has_rolls], 9))
+    surplus_m2 = np.where(has_rolls, rolls * inputs.m2_per_roll - fabric_m2, 0.0)
+
+    # Category share of each fabric and size share of each category
+    category_sold = inputs.sold_by_category.sum(axis=2)
+    fabric_sold = category_sold.sum(axis=1)
+    category_share = np.divide(
+        category_sold, fabric_sold[:, None],
+        out=np.zeros(category_sold.shape), where=fabric_sold[:, None] > 0
+    )
+    size_share = np.divide(
+        inputs.sold_by_category, category_sold[:, :, None],
+        out=np.zeros(inputs.sold_by_category.shape), where=category_sold[:, :, None] > 0
+    )
+
+    # Surplus m² for each launched variant, converted to units
+    piece_surplus = surplus_m2[inputs.fabric_index]
+    variant_m2 = (
+        piece_surplus[:, None]
+        * category_share[inputs.fabric_index, inputs.category_index][:, None]
+        * size_share[inputs.fabric_index, inputs.category_index]
+    )
+    eligible = (
+        distribute_surplus
+        & inputs.launched[:, None]
+        & (piece_surplus > 0)[:, None]
+        & (inputs.sold_by_category[inputs.fabric_index, inputs.category_index] > 0)
+        & (inputs.consumption > 0)
+    )
+    target = np.where(eligible, variant_m2 / np.where(inputs.consumption > 0, inputs.consumption, 1.0), 0.0)
+    if optimize_rolls:
+        from .roll_optimizer import TIME_LIMIT, allocate_surplus
+        surplus = allocate_surplus(
+            inputs.fabric_index, inputs.consumption, surplus_m2, target, eligible,
+            time_limit=TIME_LIMIT if time_limit is None else time_limit,
+        )
+    else:
+        surplus = np.maximum(np.rint(target), 0).astype(np.int64)
+
+    # Costs in cents
+    quantities = needed + surplus
+    fabric_cost_cents = int((rolls * inputs.roll_price_cents)[fabric_used].sum())
+    production_cost_cents = int((quantities.sum(axis=1) * inputs.production_cost_cents[inputs.category_index]).sum())
+
+    # Rounded so exact fits do not show float noise (+ 0.0 drops negative zeros)
+    leftover_m2 = np.round(surplus_m2 - np.bincount(
+        inputs.fabric_index, weights=(inputs.consumption * surplus).sum(axis=1), minlength=fabric_count
+    ), 6) + 0.0
+
+    return ReplenishmentResult(
+        needed, surplus, rolls, fabric_m2, surplus_m2, fabric_used, fabric_cost_cents, production_cost_cents,
+        leftover_m2=leftover_m2,
+    )
+
+
+def load_replenishment_inputs(today=None, window_days=WINDOW_DAYS):
+    """
+    Build ReplenishmentInputs from the database (two queries)
+
+    Args:
+        today: Last day of the sales window (default: today)
+        window_days: Days of sales considered
+    """
+    return load_window_inputs(today=today, windows=[window_days])[window_days]
+
+
+def load_window_inputs(today=None, windows=(WINDOW_DAYS,)):
+    """
+    Build ReplenishmentInputs for several sales windows (two queries)
+    The catalog arrays are shared; each window only has its own sales arrays
+
+    Args:
+        today: Last day of the sales windows (default: today)
+        windows: Window lengths in days
+
+    Returns:
+        dict: {window_days: ReplenishmentInputs}
+    """
+    from store_collections.models import Piece, StockDailySummary
+
+    today = today or timezone.localdate()
+    windows = sorted(set(windows))
+    cutoffs = {window: today - timedelta(days=window) for window in windows}
+
+    pieces = list(Piece.objects.filter(active_for_replenishment=True).select_related('fabric', 'category'))
+    sales = list(StockDailySummary.objects.filter(
+        saidas__gt=0,
+        day__gte=min(cutoffs.values())
+    ).values(
+        'piece_id', 'piece__fabric_id', 'piece__category_id', 'size'
+    ).annotate(**{
+        f'sold_{window}': Sum('saidas', filter=Q(day__gte=cutoff))
+        for window, cutoff in cutoffs.items()
+    }))
+
+    # Axes: fabrics/categories of active pieces first, then those only seen in sales
+    fabrics = {}
+    categories = {}
+    for piece in pieces:
+        fabrics.setdefault(piece.fabric_id, piece.fabric)
+        categories.setdefault(piece.category_id, piece.category)
+    for sale in sales:
+        fabrics.setdefault(sale['piece__fabric_id'], None)
+        categories.setdefault(sale['piece__category_id'], None)
+
+    fabric_position = {fabric_id: index for index, fabric_id in enumerate(fabrics)}
+    category_position = {category_id: index for index, category_id in enumerate(categories)}
+    piece_position = {piece.pk: index for index, piece in enumerate(pieces)}
+
+    sold = {window: np.zeros((len(pieces), len(SIZES)), dtype=np.int64) for window in windows}
+    sold_by_category = {
+        window: np.zeros((len(fabrics), len(categories), len(SIZES)), dtype=np.int64) for window in windows
+    }
+    for sale in sales:
+        size = SIZE_INDEX[sale['size']]
+        fabric = fabric_position[sale['piece__fabric_id']]
+        category = category_position[sale['piece__category_id']]
+        piece = piece_position.get(sale['piece_id'])
+        for window in windows:
+            quantity = sale[f'sold_{window}'] or 0
+            sold_by_category[window][fabric, category, size] += quantity
+            if piece is not None:
+                sold[window][piece, size] += quantity
+
+    def per_size(prefix, piece):
+        return [getattr(piece, f'{prefix}_{size.lower()}') for size in SIZES]
+
+    catalog = dict(
+        fabric_index=np.array([fabric_position[piece.fabric_id] for piece in pieces], dtype=np.intp),
+        category_index=np.array([category_position[piece.category_id] for piece in pieces], dtype=np.intp),
+        launched=np.array([piece.launch_status == 'lancada' for piece in pieces], dtype=bool),
+        in_launch=np.array([piece.launch_status == 'em_lancamento' for piece in pieces], dtype=bool),
+        consumption=np.array([[float(value) for value in per_size('fabric_consumption', piece)] for piece in pieces],
+                             dtype=np.float64).reshape(-1, len(SIZES)),
+        stock=np.array([per_size('current_stock', piece) for piece in pieces], dtype=np.int64).reshape(-1, len(SIZES)),
+        initial=np.array([per_size('initial_quantity', piece) for piece in pieces],
+                         dtype=np.int64).reshape(-1, len(SIZES)),
+        m2_per_roll=np.array([float(fabric.roll_weight_kg * fabric.yield_area_per_kg) if fabric else 0.0
+                              for fabric in fabrics.values()], dtype=np.float64),
+        roll_price_cents=np.array([_cents(fabric.price_per_roll) if fabric else 0 for fabric in fabrics.values()],
+                                  dtype=np.int64),
+        production_cost_cents=np.array([_cents(category.production_cost_per_piece) if category else 0
+                                        for category in categories.values()], dtype=np.int64),
+        pieces=pieces,
+        fabrics=list(fabrics.values()),
+        categories=list(categories.values()),
+    )
+
+    return {
+        window: ReplenishmentInputs(sold=sold[window], sold_by_category=sold_by_category[window], **catalog)
+        for window in windows
+    }
+
+
+def run_replenishment(today=None, window_days=WINDOW_DAYS, minimum_stock=MINIMUM_STOCK,
+                      optimize_rolls=False, time_limit=None):
+    """
+    Load the inputs from the database and compute the replenishment
+
+    Returns:
+        tuple: (ReplenishmentInputs, ReplenishmentResult)
+    """
+    inputs = load_replenishment_inputs(today=today, window_days=window_days)
+    return inputs, compute_replenishment(
+        inputs, minimum_stock=minimum_stock, optimize_rolls=optimize_rolls, time_limit=time_limit
+    )
+
+
+def replenishment_context(inputs, result):
+    """
+    Results keyed by model instances, as used by replenishment_results.html
+
+    Returns:
+        dict: fabric_rolls, pieces_replenishment, fabric_cost, production_cost,
+            total_cost, total_pieces_count
+    """
+    fabric_rolls = {
+        inputs.fabrics[index]: int(result.rolls[index])
+        for index in np.flatnonzero(result.fabric_used)
+    }
+
+    pieces_replenishment = {}
+    for index in np.flatnonzero(result.quantities.sum(axis=1) > 0):
+        pieces_replenishment[inputs.pieces[index]] = {
+            size: int(quantity)
+            for size, quantity in zip(SIZES, result.quantities[index])
+            if quantity > 0
+        }
+
+    return {
+        'fabric_rolls': fabric_rolls,
+        'pieces_replenishment': pieces_replenishment,
+        'fabric_cost': result.fabric_cost,
+        'production_cost': result.production_cost,
+        'total_cost': result.total_cost,
+        'total_pieces_count': result.total_pieces,
+    }
+
+
+def replenishment_data_version(today=None, window_days=WINDOW_DAYS, minimum_stock=MINIMUM_STOCK,
+                               optimize_rolls=False):
+    """
+    Hash identifying the data a replenishment result is computed from
+    Changes with the latest stock sync, any Piece/Fabric/PieceCategory or
+    accessory/packaging/gift edit or deletion, any accessory linked to or
+    unlinked from a piece, the day (sales window) and the parameters
+    """
+    from business_settings.models import PieceCategory
+    from inventory.models import Gift, InventoryAccessory, Packaging
+    from store_collections.models import Fabric, Piece
+
+    today = today or timezone.localdate()
+    pieces = Piece.objects.aggregate(
+        synced=Max('stock_last_synced'), updated=Max('updated_at'), count=Count('id')
+    )
+    parts = [
+        today, window_days, minimum_stock, optimize_rolls,
+        pieces['synced'], pieces['updated'], pieces['count'],
+    ]
+    for model in (Fabric, PieceCategory, InventoryAccessory, Packaging, Gift):
+        rows = model.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+        parts += [rows['updated'], rows['count']]
+
+    # Linking an accessory does not touch Piece.updated_at; a new link gets a higher id
+    links = Piece.accessories.through.objects.aggregate(last=Max('id'), count=Count('id'))
+    parts += [links['last'], links['count']]
+
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
@@ -0,0 +1,116 @@
+"""
+Streaming export of stored replenishment runs
+Rows are read from the database in chunks and written out one at a time,
+so a plan of any size is exported without building it in memory.
+"""
+import csv
+import json
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import ReplenishmentFabricLine, ReplenishmentLine, ReplenishmentMaterialLine
+
+PIECE_COLUMNS = ['piece_id', 'piece_name', 'fabric_label', 'launch_status', 'size', 'needed', 'surplus', 'quantity']
+FABRIC_COLUMNS = ['fabric_id', 'fabric_name', 'fabric_color', 'rolls', 'm2_needed', 'surplus_m2', 'leftover_m2', 'cost']
+MATERIAL_COLUMNS = [
+    'kind', 'item_id', 'item_name', 'needed', 'minimum_quantity', 'order_quantity', 'unit_price', 'cost',
+    'delivery_time_days',
+]
+
+# Rows fetched per database round trip
+CHUNK_SIZE = 2000
+
+
+class _ExportEncoder(DjangoJSONEncoder):
+    """Decimals as numbers, like the other JSON endpoints"""
+
+    def default(self, value):
+        if isinstance(value, Decimal):
+            return float(value)
+        return super().default(value)
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def piece_rows(run):
+    """Quantities per piece and size of a run as tuples in PIECE_COLUMNS order"""
+    return ReplenishmentLine.objects.filter(run=run).order_by('piece_name', 'id').values_list(
+        *PIECE_COLUMNS
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def fabric_rows(run):
+    """Fabric rolls of a run as tuples in FABRIC_COLUMNS order"""
+    return ReplenishmentFabricLine.objects.filter(run=run).order_by('fabric_name', 'fabric_color').values_list(
+        *FABRIC_COLUMNS
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def material_rows(run):
+    """Accessories, packaging and gifts of a run as tuples in MATERIAL_COLUMNS order"""
+    return ReplenishmentMaterialLine.objects.filter(run=run).values_list(
+        *MATERIAL_COLUMNS
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def stream_csv(run, section='pieces'):
+    """
+    Yield the CSV lines of a run
+
+    Args:
+        section: 'pieces' (quantities per piece and size), 'fabrics' (rolls)
+            or 'materials' (accessories, packaging and gifts)
+    """
+    columns, rows = {
+        'fabrics': (FABRIC_COLUMNS, fabric_rows),
+        'materials': (MATERIAL_COLUMNS, material_rows),
+    }.get(section, (PIECE_COLUMNS, piece_rows))
+    rows = rows(run)
+    writer = csv.writer(_Echo())
+
+    # BOM so spreadsheets open the file as UTF-8
+    yield '\ufeff' + writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_json(run):
+    """
+    Yield a JSON document with the run totals, fabric rolls, materials and piece lines
+    """
+    def dumps(value):
+        return json.dumps(value, cls=_ExportEncoder, ensure_ascii=False)
+
+    header = {
+        'id': run.pk,
+        'status': run.status,
+        'window_days': run.window_days,
+        'minimum_stock': run.minimum_stock,
+        'optimize_rolls': run.optimize_rolls,
+        'finished_at': run.finished_at,
+        'fabric_cost': run.fabric_cost,
+        'production_cost': run.production_cost,
+        'materials_cost': run.materials_cost,
+        'total_cost': run.total_cost,
+        'total_pieces': run.total_pieces,
+    }
+    yield '{"run": ' + dumps(header) + ', "fabrics": ['
+
+    for index, row in enumerate(fabric_rows(run)):
+        yield (', ' if index else '') + dumps(dict(zip(FABRIC_COLUMNS, row)))
+
+    yield '], "materials": ['
+
+    for index, row in enumerate(material_rows(run)):
+        yield (', ' if index else '') + dumps(dict(zip(MATERIAL_COLUMNS, row)))
+
+    yield '], "lines": ['
+
+    for index, row in enumerate(piece_rows(run)):
+        yield (',\n' if index else '\n') + dumps(dict(zip(PIECE_COLUMNS, row)))
+
+    yield '\n]}\n'
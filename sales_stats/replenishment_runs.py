@@ -0,0 +1,285 @@
+"""
+Persisted replenishment runs
+A request creates a ReplenishmentRun and the engine runs in a Celery task,
+storing fabric rolls, quantities per piece and size and costs. Pages read
+stored runs, and a run is reused while the input data version is unchanged.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .materials import material_requirements, materials_cost
+from .models import ReplenishmentFabricLine, ReplenishmentLine, ReplenishmentMaterialLine, ReplenishmentRun
+from .replenishment import (
+    MINIMUM_STOCK, SIZES, WINDOW_DAYS, compute_replenishment, load_replenishment_inputs,
+    replenishment_data_version,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pending/running runs older than this are considered lost (worker down)
+STALE_RUN_AFTER = timedelta(minutes=15)
+
+
+def start_replenishment_run(window_days=WINDOW_DAYS, minimum_stock=MINIMUM_STOCK, optimize_rolls=None,
+                            user=None, force=False, run_async=None):
+    """
+    Reuse the run computed from the current data or queue a new one
+
+    Args:
+        window_days: Days of sales considered
+        minimum_stock: Minimum stock for launched pieces
+        optimize_rolls: Use the MILP roll optimizer (default: REPLENISHMENT_OPTIMIZE_ROLLS)
+        user: User requesting the run
+        force: Always create a new run
+        run_async: Queue the run on Celery (default: REPLENISHMENT_RUN_ASYNC)
+
+    Returns:
+        tuple: (ReplenishmentRun, reused)
+    """
+    if optimize_rolls is None:
+        optimize_rolls = settings.REPLENISHMENT_OPTIMIZE_ROLLS
+    version = replenishment_data_version(
+        window_days=window_days, minimum_stock=minimum_stock, optimize_rolls=optimize_rolls
+    )
+
+    if not force:
+        existing = ReplenishmentRun.objects.filter(data_version=version).filter(
+            Q(status='done') | Q(status__in=['pending', 'running'], created_at__gte=timezone.now() - STALE_RUN_AFTER)
+        ).first()
+        if existing:
+            return existing, True
+
+    run = ReplenishmentRun.objects.create(
+        window_days=window_days,
+        minimum_stock=minimum_stock,
+        optimize_rolls=optimize_rolls,
+        data_version=version,
+        requested_by=user,
+    )
+
+    if run_async is None:
+        run_async = settings.REPLENISHMENT_RUN_ASYNC
+
+    if run_async:
+        from .tasks import run_replenishment_task
+        transaction.on_commit(lambda: run_replenishment_task.delay(run.pk))
+    else:
+        execute_replenishment_run(run)
+
+    return run, False
+
+
+def execute_replenishment_run(run):
+    """
+    Compute a run with the replenishment engine and store its lines,
+    including the accessories, packaging and gifts it needs
+    Failures are stored on the run instead of raised
+
+    Returns:
+        ReplenishmentRun
+    """
+    run.status = 'running'
+    run.started_at = timezone.now()
+    run.error = ''
+    run.save(update_fields=['status', 'started_at', 'error'])
+
+    try:
+        inputs = load_replenishment_inputs(window_days=run.window_days)
+        result = compute_replenishment(
+            inputs,
+            minimum_stock=run.minimum_stock,
+            optimize_rolls=run.optimize_rolls,
+            time_limit=settings.REPLENISHMENT_OPTIMIZER_TIME_LIMIT,
+        )
+        materials = material_requirements(inputs, result)
+
+        with transaction.atomic():
+            # A retried run starts from scratch
+            run.fabric_lines.all().delete()
+            run.lines.all().delete()
+            run.material_lines.all().delete()
+
+            ReplenishmentFabricLine.objects.bulk_create(_fabric_lines(run, inputs, result))
+            ReplenishmentLine.objects.bulk_create(_piece_lines(run, inputs, result), batch_size=1000)
+            ReplenishmentMaterialLine.objects.bulk_create(
+                ReplenishmentMaterialLine(run=run, **line) for line in materials
+            )
+
+            run.fabric_cost = result.fabric_cost
+            run.production_cost = result.production_cost
+            run.materials_cost = materials_cost(materials)
+            run.total_cost = result.total_cost + run.materials_cost
+            run.total_pieces = result.total_pieces
+            run.status = 'done'
+            run.finished_at = timezone.now()
+            run.save()
+
+        logger.info(f"Replenishment run {run.pk} done: {run.total_pieces} pieces, R$ {run.total_cost}")
+
+    except Exception as e:
+        logger.error(f"Replenishment run {run.pk} failed: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+        run.status = 'failed'
+        run.error = str(e)
+        run.finished_at = timezone.now()
+        run.save(update_fields=['status', 'error', 'finished_at'])
+
+    return run
+
+
+def _decimal(value, places):
+    return Decimal(f"{value:.{places}f}")
+
+
+def _fabric_lines(run, inputs, result):
+    lines = []
+    for index in np.flatnonzero(result.fabric_used):
+        fabric = inputs.fabrics[index]
+        rolls = int(result.rolls[index])
+        lines.append(ReplenishmentFabricLine(
+            run=run,
+            fabric=fabric,
+            fabric_name=fabric.name,
+            fabric_color=fabric.color,
+            m2_needed=_decimal(result.fabric_m2[index], 3),
+            rolls=rolls,
+            surplus_m2=_decimal(max(result.surplus_m2[index], 0), 3),
+            leftover_m2=_decimal(result.leftover_m2[index], 3),
+            cost=fabric.price_per_roll * rolls,
+        ))
+    return lines
+
+
+def _piece_lines(run, inputs, result):
+    lines = []
+    for index in np.flatnonzero(result.quantities.sum(axis=1) > 0):
+        piece = inputs.pieces[index]
+        for size_index, size in enumerate(SIZES):
+            quantity = int(result.quantities[index, size_index])
+            if quantity <= 0:
+                continue
+            lines.append(ReplenishmentLine(
+                run=run,
+                piece=piece,
+                piece_name=piece.name,
+                fabric_label=f"{piece.fabric.name} - {piece.fabric.color}",
+                launch_status=piece.launch_status,
+                size=size,
+                needed=int(result.needed[index, size_index]),
+                surplus=int(result.surplus[index, size_index]),
+                quantity=quantity,
+            ))
+    return lines
+
+
+def invalidate_replenishment_runs():
+    """
+    Stop reusing stored runs for data changes the version key does not see
+    (e.g. a rebuild of the stock rollup); the next request recomputes
+    """
+    ReplenishmentRun.objects.exclude(data_version='').update(data_version='')
+
+
+def latest_run():
+    """Most recent finished run, or None"""
+    return ReplenishmentRun.objects.filter(status='done').first()
+
+
+def run_context(run):
+    """
+    Template context of a run (replenishment_results.html)
+
+    Returns:
+        dict: run, fabric_lines, material_lines, piece_groups ([{'line', 'sizes'}]) and the totals
+    """
+    piece_groups = {}
+    for line in run.lines.all():
+        key = line.piece_id or f"name:{line.piece_name}"
+        piece_groups.setdefault(key, {'line': line, 'sizes': []})['sizes'].append(line)
+
+    return {
+        'run': run,
+        'fabric_lines': list(run.fabric_lines.all()),
+        'material_lines': list(run.material_lines.all()),
+        'piece_groups': list(piece_groups.values()),
+        'fabric_cost': run.fabric_cost,
+        'production_cost': run.production_cost,
+        'materials_cost': run.materials_cost,
+        'total_cost': run.total_cost,
+        'total_pieces_count': run.total_pieces,
+    }
+
+
+def compare_runs(base, other):
+    """
+    Differences between two runs
+
+    Returns:
+        dict: 'pieces' rows (piece_name, size, base, other, difference),
+            'fabrics' rows (fabric_name, fabric_color, base, other, difference)
+            and 'totals' rows (label, base, other, difference)
+    """
+    def piece_quantities(run):
+        return {
+            (line.piece_id or f"name:{line.piece_name}", line.size): line
+            for line in run.lines.all()
+        }
+
+    def fabric_rolls(run):
+        return {
+            line.fabric_id or f"name:{line.fabric_name}": line
+            for line in run.fabric_lines.all()
+        }
+
+    base_lines = piece_quantities(base)
+    other_lines = piece_quantities(other)
+    pieces = []
+    for key in set(base_lines) | set(other_lines):
+        line = other_lines.get(key) or base_lines[key]
+        base_quantity = base_lines[key].quantity if key in base_lines else 0
+        other_quantity = other_lines[key].quantity if key in other_lines else 0
+        pieces.append({
+            'piece_name': line.piece_name,
+            'size': line.size,
+            'base': base_quantity,
+            'other': other_quantity,
+            'difference': other_quantity - base_quantity,
+        })
+    pieces.sort(key=lambda row: (row['piece_name'], SIZES.index(row['size'])))
+
+    base_fabrics = fabric_rolls(base)
+    other_fabrics = fabric_rolls(other)
+    fabrics = []
+    for key in set(base_fabrics) | set(other_fabrics):
+        line = other_fabrics.get(key) or base_fabrics[key]
+        base_rolls = base_fabrics[key].rolls if key in base_fabrics else 0
+        other_rolls = other_fabrics[key].rolls if key in other_fabrics else 0
+        fabrics.append({
+            'fabric_name': line.fabric_name,
+            'fabric_color': line.fabric_color,
+            'base': base_rolls,
+            'other': other_rolls,
+            'difference': other_rolls - base_rolls,
+        })
+    fabrics.sort(key=lambda row: (row['fabric_name'], row['fabric_color']))
+
+    totals = [
+        {'label': label, 'base': getattr(base, field), 'other': getattr(other, field),
+         'difference': getattr(other, field) - getattr(base, field)}
+        for label, field in [
+            ('Peças', 'total_pieces'),
+            ('Custo de Tecidos', 'fabric_cost'),
+            ('Custo de Produção', 'production_cost'),
+            ('Custo de Materiais', 'materials_cost'),
+            ('Total', 'total_cost'),
+        ]
+    ]
+
+    return {'pieces': pieces, 'fabrics': fabrics, 'totals': totals}
@@ -0,0 +1,191 @@
+"""
+What-if scenarios for the replenishment parameters
+Evaluates many parameter sets (sales window, minimum stock per category,
+surplus distribution, fabric prices) over one load of the catalog and
+sales, returning the cost, roll and unit totals of each scenario.
+"""
+import copy
+from decimal import Decimal, InvalidOperation
+import numpy as np
+from django.conf import settings
+from .replenishment import (
+    MAX_WINDOW_DAYS, MINIMUM_STOCK, WINDOW_DAYS, _cents, _money, compute_replenishment, load_window_inputs,
+)
+
+# Scenarios evaluated per call
+MAX_SCENARIOS = 50
+
+
+def _integer(value, label, minimum=0, maximum=None):
+    # int() would truncate 5.7 and accept True
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{label} deve ser um número inteiro")
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{label} deve ser um número inteiro")
+    if number < minimum:
+        raise ValueError(f"{label} deve ser no mínimo {minimum}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{label} deve ser no máximo {maximum}")
+    return number
+
+
+def _price(value, label):
+    try:
+        price = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"{label} deve ser um valor numérico")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"{label} não pode ser negativo")
+    return price
+
+
+def parse_scenario(data, position=1):
+    """
+    Validate one scenario and fill in the defaults
+
+    Args:
+        data: dict with any of
+            name: Label of the scenario
+            window_days: Days of sales considered (default: 120, at most MAX_WINDOW_DAYS)
+            minimum_stock: Minimum stock of launched pieces (default: 5)
+            category_minimums: {category id or name: minimum stock}
+            distribute_surplus: Turn leftover fabric into extra units (default: True)
+            optimize_rolls: Allocate the leftover with the MILP roll optimizer
+                (default: REPLENISHMENT_OPTIMIZE_ROLLS)
+            fabric_price_factor: Multiplier on every roll price (default: 1)
+            fabric_prices: {fabric id: price per roll}, applied after the factor
+        position: Position of the scenario in the request (for messages)
+
+    Raises:
+        ValueError: Invalid parameter (message in Portuguese, shown to the user)
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Cenário {position}: formato inválido")
+
+    label = f"Cenário {position}"
+    try:
+        category_minimums = data.get('category_minimums') or {}
+        fabric_prices = data.get('fabric_prices') or {}
+        if not isinstance(category_minimums, dict) or not isinstance(fabric_prices, dict):
+            raise ValueError("category_minimums e fabric_prices devem ser objetos")
+
+        return {
+            'name': str(data.get('name') or label),
+            'window_days': _integer(
+                data.get('window_days', WINDOW_DAYS), 'window_days', minimum=1, maximum=MAX_WINDOW_DAYS
+            ),
+            'minimum_stock': _integer(data.get('minimum_stock', MINIMUM_STOCK), 'minimum_stock'),
+            'category_minimums': {
+                str(key): _integer(value, f"Estoque mínimo da categoria {key}")
+                for key, value in category_minimums.items()
+            },
+            'distribute_surplus': bool(data.get('distribute_surplus', True)),
+            'optimize_rolls': bool(data.get('optimize_rolls', settings.REPLENISHMENT_OPTIMIZE_ROLLS)),
+            'fabric_price_factor': _price(data.get('fabric_price_factor', 1), 'fabric_price_factor'),
+            'fabric_prices': {
+                _integer(key, 'ID do tecido'): _price(value, f"Preço do tecido {key}")
+                for key, value in fabric_prices.items()
+            },
+        }
+    except ValueError as e:
+        raise ValueError(f"{label}: {e}")
+
+
+def _minimum_per_piece(inputs, scenario):
+    """(n,) minimum stock of every piece, with the category overrides applied"""
+    minimum = np.full(len(inputs.category_index), scenario['minimum_stock'], dtype=np.int64)
+
+    for key, value in scenario['category_minimums'].items():
+        positions = [
+            position for position, category in enumerate(inputs.categories)
+            if category and (key == str(category.pk) or key.lower() == category.name.lower())
+        ]
+        if not positions:
+            raise ValueError(f"{scenario['name']}: categoria {key} não encontrada")
+        minimum[np.isin(inputs.category_index, positions)] = value
+
+    return minimum
+
+
+def _roll_prices(inputs, scenario):
+    """(f,) roll prices in cents with the factor and per-fabric prices applied"""
+    factor = scenario['fabric_price_factor']
+    prices = inputs.roll_price_cents
+    if factor != 1:
+        prices = np.rint(prices * float(factor)).astype(np.int64)
+    if scenario['fabric_prices']:
+        prices = prices.copy()
+        for position, fabric in enumerate(inputs.fabrics):
+            if fabric and fabric.pk in scenario['fabric_prices']:
+                prices[position] = _cents(scenario['fabric_prices'][fabric.pk])
+    return prices
+
+
+def evaluate_scenarios(scenarios, today=None):
+    """
+    Compute the replenishment of every scenario over one load of the data
+
+    Args:
+        scenarios: List of scenario dicts (see parse_scenario)
+        today: Last day of the sales windows (default: today)
+
+    Returns:
+        list: One dict per scenario with its parameters, rolls, unused m²,
+            units (needed, surplus, total) and costs, plus the rolls per fabric
+
+    Raises:
+        ValueError: Invalid scenario list
+    """
+    if not isinstance(scenarios, list) or not scenarios:
+        raise ValueError("Informe ao menos um cenário")
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"No máximo {MAX_SCENARIOS} cenários por vez")
+
+    scenarios = [parse_scenario(data, position) for position, data in enumerate(scenarios, start=1)]
+    inputs_by_window = load_window_inputs(today=today, windows=[scenario['window_days'] for scenario in scenarios])
+
+    # The optimizer time limit is for the whole call
+    optimized = sum(scenario['optimize_rolls'] for scenario in scenarios)
+    time_limit = settings.REPLENISHMENT_OPTIMIZER_TIME_LIMIT / max(optimized, 1)
+
+    results = []
+    for scenario in scenarios:
+        inputs = inputs_by_window[scenario['window_days']]
+        roll_prices = _roll_prices(inputs, scenario)
+        if roll_prices is not inputs.roll_price_cents:
+            inputs = copy.copy(inputs)
+            inputs.roll_price_cents = roll_prices
+
+        result = compute_replenishment(
+            inputs,
+            minimum_stock=_minimum_per_piece(inputs, scenario),
+            distribute_surplus=scenario['distribute_surplus'],
+            optimize_rolls=scenario['optimize_rolls'],
+            time_limit=time_limit,
+        )
+
+        results.append({
+            **scenario,
+            'rolls': int(result.rolls[result.fabric_used].sum()),
+            'leftover_m2': float(result.leftover_m2[result.fabric_used].sum()),
+            'needed_units': int(result.needed.sum()),
+            'surplus_units': int(result.surplus.sum()),
+            'total_pieces': result.total_pieces,
+            'fabric_cost': result.fabric_cost,
+            'production_cost': result.production_cost,
+            'total_cost': result.total_cost,
+            'fabrics': [
+                {
+                    'fabric_id': inputs.fabrics[position].pk,
+                    'fabric': f"{inputs.fabrics[position].name} - {inputs.fabrics[position].color}",
+                    'rolls': int(result.rolls[position]),
+                    'cost': _money(result.rolls[position] * inputs.roll_price_cents[position]),
+                }
+                for position in np.flatnonzero(result.fabric_used)
+            ],
+        })
+
+    return results
+
@@ -0,0 +1,131 @@
+"""
+Fabric roll allocation with mixed-integer linear programming
+For each fabric the rolls are the minimum whole rolls covering the needed
+units; the optimizer then picks the extra units per piece and size that use
+as much of the leftover m² as possible (never more than the rolls hold),
+keeping every variant within MIX_TOLERANCE of its share of the category and
+size sales mix. Fabrics the solver cannot finish within the time limit keep
+a greedy allocation.
+"""
+import logging
+import time
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+logger = logging.getLogger(__name__)
+
+# Extra units of a variant stay within ±25% of its sales-mix target
+MIX_TOLERANCE = 0.25
+
+# Extra weight, per m², of the variants furthest below their sales-mix target
+MIX_WEIGHT = 0.01
+
+# Stop once the solution is within this fraction of the optimum
+MIP_GAP = 1e-4
+
+# Seconds for all fabrics together
+TIME_LIMIT = 2.0
+
+
+def _greedy_fill(consumption, lower, upper, target, leftover_m2):
+    """
+    Start from the lower bounds and add units to the variants furthest below
+    their target while they fit (fallback and baseline of the solver)
+    """
+    units = lower.copy()
+    free_m2 = leftover_m2 - float((consumption * units).sum())
+    for index in np.argsort(-(target - units), kind='stable'):
+        while units[index] < upper[index] and consumption[index] <= free_m2 + 1e-9:
+            units[index] += 1
+            free_m2 -= consumption[index]
+    return units
+
+
+def _allocate_fabric(consumption, target, leftover_m2, mix_tolerance, time_limit):
+    """
+    Extra units for the variants of one fabric
+
+    Bounded knapsack over the units above each variant's lower bound: use
+    the most leftover m², preferring the variants furthest below target.
+
+    Args:
+        consumption: (k,) m² per unit
+        target: (k,) fractional units of the proportional split (fitting in the leftover)
+        leftover_m2: m² left in the rounded-up rolls
+        mix_tolerance: Allowed relative distance to the target
+        time_limit: Seconds for the solver
+
+    Returns:
+        tuple: ((k,) integer units, whether the solver's answer was used)
+    """
+    lower = np.floor(target * (1 - mix_tolerance)).astype(np.int64)
+    upper = np.ceil(target * (1 + mix_tolerance)).astype(np.int64)
+    greedy = _greedy_fill(consumption, lower, upper, target, leftover_m2)
+    if time_limit <= 0:
+        return greedy, False
+
+    free_m2 = leftover_m2 - float((consumption * lower).sum())
+    weight = 1 + MIX_WEIGHT * np.clip(target - lower, 0, None)
+    result = milp(
+        -consumption * weight,
+        integrality=np.ones(len(consumption)),
+        bounds=Bounds(np.zeros(len(consumption)), upper - lower),
+        constraints=LinearConstraint(consumption[None, :], -np.inf, free_m2),
+        options={'time_limit': time_limit, 'mip_rel_gap': MIP_GAP},
+    )
+    if result.x is None:
+        return greedy, False
+
+    units = lower + np.rint(result.x).astype(np.int64)
+    used_m2 = (consumption * units).sum()
+    # A time-limited solve can be worse than the greedy start
+    if used_m2 > leftover_m2 + 1e-6 or used_m2 < (consumption * greedy).sum():
+        return greedy, False
+    return units, True
+
+
+def allocate_surplus(fabric_index, consumption, surplus_m2, target, eligible,
+                     mix_tolerance=MIX_TOLERANCE, time_limit=TIME_LIMIT):
+    """
+    Extra units per piece and size filling the leftover m² of every fabric
+
+    Args:
+        fabric_index: (n,) fabric position of each piece
+        consumption: (n, 4) m² per unit
+        surplus_m2: (f,) m² left in the rounded-up rolls
+        target: (n, 4) fractional units of the proportional split
+        eligible: (n, 4) variants that may receive extra units
+        mix_tolerance: Allowed relative distance to the target
+        time_limit: Seconds for all fabrics; a fabric whose solver runs out
+            of time keeps the greedy allocation
+
+    Returns:
+        numpy array: (n, 4) integer extra units
+    """
+    surplus = np.zeros(consumption.shape, dtype=np.int64)
+    fabrics = [fabric for fabric in np.flatnonzero(surplus_m2 > 0) if eligible[fabric_index == fabric].any()]
+    deadline = time.monotonic() + time_limit
+    greedy_fabrics = 0
+
+    for position, fabric in enumerate(fabrics):
+        mask = eligible & (fabric_index == fabric)[:, None]
+        fabric_target = target[mask]
+
+        # Pieces of the same category each get the whole category share in the
+        # proportional split; scale the targets down so they fit in the leftover
+        target_m2 = float((consumption[mask] * fabric_target).sum())
+        if target_m2 > surplus_m2[fabric]:
+            fabric_target = fabric_target * (surplus_m2[fabric] / target_m2)
+
+        # Share the remaining time between the fabrics still to solve
+        remaining = deadline - time.monotonic()
+        surplus[mask], solved = _allocate_fabric(
+            consumption[mask], fabric_target, float(surplus_m2[fabric]), mix_tolerance,
+            remaining / (len(fabrics) - position),
+        )
+        greedy_fabrics += not solved
+
+    if greedy_fabrics:
+        logger.info(f"Roll optimizer kept the greedy allocation for {greedy_fabrics} of {len(fabrics)} fabrics")
+
+    return surplus
@@ -0,0 +1,140 @@
+"""
+Collection and fabric sales rollups
+Derives CollectionSalesStatistics and FabricSalesStatistics from the
+per-piece statistics (PieceSalesStatistics, kept current from StockHistory
+and SalesData by piece_statistics) with one grouped query per table, and
+writes them with bulk upserts, so dashboards read precomputed numbers.
+"""
+import logging
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+
+def _seller(descending):
+    """Name of the best (or worst) selling launched piece of the outer collection"""
+    from .models import PieceSalesStatistics
+
+    order = '-total_units_sold' if descending else 'total_units_sold'
+    return Subquery(PieceSalesStatistics.objects.filter(
+        piece__collection=OuterRef('pk'),
+        piece__launch_status='lancada',
+    ).order_by(order, 'piece__name').values('piece__name')[:1])
+
+
+def rollup_collection_statistics():
+    """
+    Recompute CollectionSalesStatistics for every collection
+
+    Returns:
+        int: Number of collection rows written
+    """
+    from store_collections.models import Collection
+    from .models import CollectionSalesStatistics
+
+    collections = Collection.objects.annotate(
+        pieces_count=Count('pieces', distinct=True),
+        units=Sum('pieces__sales_statistics__total_units_sold', default=0),
+        revenue=Sum('pieces__sales_statistics__total_revenue', default=Decimal('0')),
+        best_seller=_seller(descending=True),
+        worst_seller=_seller(descending=False),
+    ).values(
+        'pk', 'actual_launch_date', 'expected_launch_date',
+        'pieces_count', 'units', 'revenue', 'best_seller', 'worst_seller',
+    )
+
+    now = timezone.now()
+    statistics = [
+        CollectionSalesStatistics(
+            collection_id=row['pk'],
+            total_units_sold=row['units'],
+            total_revenue=row['revenue'],
+            average_piece_price=(row['revenue'] / row['units']).quantize(Decimal('0.01')) if row['units'] else 0,
+            total_pieces_in_collection=row['pieces_count'],
+            best_selling_piece_name=row['best_seller'] or '',
+            worst_selling_piece_name=row['worst_seller'] or '',
+            collection_launch_date=row['actual_launch_date'] or row['expected_launch_date'],
+            last_calculated=now,
+        )
+        for row in collections
+    ]
+
+    CollectionSalesStatistics.objects.bulk_create(
+        statistics,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['collection'],
+        update_fields=[
+            'total_units_sold', 'total_revenue', 'average_piece_price', 'total_pieces_in_collection',
+            'best_selling_piece_name', 'worst_selling_piece_name', 'collection_launch_date', 'last_calculated',
+        ],
+    )
+    return len(statistics)
+
+
+def rollup_fabric_statistics():
+    """
+    Recompute FabricSalesStatistics for every fabric
+    Fabric consumed: units sold per size x fabric_consumption_* (m²),
+    converted to kg with the fabric yield (yield_area_per_kg)
+
+    Returns:
+        int: Number of fabric rows written
+    """
+    from store_collections.models import Fabric
+    from .models import FabricSalesStatistics
+
+    consumed_m2 = sum(
+        F(f'piece__sales_statistics__total_sold_{size.lower()}') * F(f'piece__fabric_consumption_{size.lower()}')
+        for size in SIZES
+    )
+    fabrics = Fabric.objects.annotate(
+        pieces_count=Count('piece', distinct=True),
+        units=Sum('piece__sales_statistics__total_units_sold', default=0),
+        revenue=Sum('piece__sales_statistics__total_revenue', default=Decimal('0')),
+        consumed_m2=Sum(consumed_m2, output_field=DecimalField(max_digits=14, decimal_places=2), default=Decimal('0')),
+    ).values('pk', 'yield_area_per_kg', 'pieces_count', 'units', 'revenue', 'consumed_m2')
+
+    now = timezone.now()
+    statistics = []
+    for row in fabrics:
+        consumed_kg = Decimal('0')
+        if row['yield_area_per_kg']:
+            consumed_kg = (Decimal(row['consumed_m2']) / row['yield_area_per_kg']).quantize(Decimal('0.01'))
+        statistics.append(FabricSalesStatistics(
+            fabric_id=row['pk'],
+            total_pieces_using_fabric=row['pieces_count'],
+            total_units_sold=row['units'],
+            total_fabric_consumed_kg=consumed_kg,
+            total_revenue_generated=row['revenue'],
+            last_calculated=now,
+        ))
+
+    FabricSalesStatistics.objects.bulk_create(
+        statistics,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['fabric'],
+        update_fields=[
+            'total_pieces_using_fabric', 'total_units_sold', 'total_fabric_consumed_kg',
+            'total_revenue_generated', 'last_calculated',
+        ],
+    )
+    return len(statistics)
+
+
+def refresh_sales_rollups():
+    """
+    Recompute the collection and fabric rollups
+
+    Returns:
+        tuple: (collections written, fabrics written)
+    """
+    collections = rollup_collection_statistics()
+    fabrics = rollup_fabric_statistics()
+    logger.info(f"Sales rollups refreshed: {collections} collections, {fabrics} fabrics")
+    return collections, fabrics
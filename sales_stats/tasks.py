@@ -0,0 +1,68 @@
+"""
+Celery tasks for sales_stats app
+"""
+from celery import shared_task
+import logging
+import subprocess
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def archive_old_data_task():
+    """
+    Monthly task that moves StockHistory and SalesData rows older than the
+    retention period to the cold-storage archive; does nothing until a
+    retention period is set
+    """
+    from django.conf import settings
+    from .archive import archive_old_data
+
+    if not settings.STOCK_HISTORY_RETENTION_DAYS and not settings.SALES_DATA_RETENTION_DAYS:
+        logger.info("Archival disabled (no retention period set)")
+        return "Archival disabled"
+
+    results = archive_old_data()
+    summary = ', '.join(f"{result['table']}: {result['rows']}" for result in results)
+    logger.info(f"Archival finished ({summary})")
+    return summary
+
+
+@shared_task
+def run_replenishment_task(run_id):
+    """
+    Compute a queued ReplenishmentRun (see sales_stats.replenishment_runs)
+    """
+    from .models import ReplenishmentRun
+    from .replenishment_runs import execute_replenishment_run
+
+    run = ReplenishmentRun.objects.get(pk=run_id)
+    execute_replenishment_run(run)
+    return f"Replenishment run {run_id}: {run.status}"
+
+
+@shared_task
+def generate_forecasts_task():
+    """
+    Daily task that forecasts the sales of every piece, collection and fabric
+    with FORECAST_MODEL. Prefork workers are daemon processes and cannot
+    start the pool of sales_stats.parallel, so damped_trend runs the
+    generate_forecasts command in a child process, which can
+    """
+    from django.conf import settings
+    from .forecasting import generate_forecasts
+
+    model = settings.FORECAST_MODEL
+    if model == 'damped_trend':
+        completed = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'generate_forecasts', '--model', model],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        logger.info(completed.stdout)
+        return f"Forecasts generated with {model} in a child process"
+
+    written, fitted = generate_forecasts(model=model)
+    return f"{written} forecasts generated ({fitted} pieces fitted)"
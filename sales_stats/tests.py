@@ -1,3 +1,449 @@
-from django.test import TestCase
+"""
+Array-only tests of the replenishment engine, the roll optimizer, the
+horizon planner and forecast reuse (inputs built by hand, no database), and
+database tests of the sales archive and the piece statistics refresh
+"""
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from store_collections.models import StockHistory
+from store_collections.stock_history import update_daily_summaries
+from store_collections.tests import create_pieces
+from .archive import archive_table, read_archive
+from .forecasting import REFIT_DAYS, SalesMatrix, build_forecasts
+from .models import ArchivedSalesTotal, PieceSalesStatistics, SalesData, StatisticsWatermark
+from .piece_statistics import WATERMARK_NAME, rebuild_archived_sales, recalculate_piece_statistics, refresh_piece_statistics
+from .horizon import business_to_calendar_days, plan_horizon
+from .replenishment import MAX_WINDOW_DAYS, ReplenishmentInputs, compute_replenishment
+from .replenishment_scenarios import parse_scenario
+from .roll_optimizer import MIX_TOLERANCE, allocate_surplus
 
-# Create your tests here.
+
+def build_inputs(**overrides):
+    """
+    One fabric (10 m² per roll, R$ 100,00), two categories (R$ 20,00 and R$ 10,00)
+
+    - Piece 0: launched, category 0, 1 m² per unit, sold P=3 M=2
+    - Piece 1: in launch, category 1, 1.5 m² per unit, initial P=2 M=2
+    - Piece 2: neither launched nor in launch, never replenished
+    """
+    values = dict(
+        fabric_index=[0, 0, 0],
+        category_index=[0, 1, 0],
+        launched=[True, False, False],
+        in_launch=[False, True, False],
+        consumption=[[1, 1, 1, 1], [1.5, 1.5, 1.5, 1.5], [1, 1, 1, 1]],
+        stock=[[0, 5, 10, 0], [0, 0, 0, 0], [0, 0, 0, 0]],
+        initial=[[10, 10, 10, 10], [2, 2, 0, 0], [4, 4, 4, 4]],
+        sold=[[3, 2, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]],
+        m2_per_roll=[10.0],
+        roll_price_cents=[10000],
+        production_cost_cents=[2000, 1000],
+        sold_by_category=[[[3, 2, 0, 0], [0, 0, 0, 0]]],
+    )
+    values.update(overrides)
+    return ReplenishmentInputs(**values)
+
+
+class ComputeReplenishmentTests(SimpleTestCase):
+
+    def test_needed_units(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=5)
+
+        # Launched: minimum + sold - stock (never negative); in launch: initial quantity
+        np.testing.assert_array_equal(result.needed, [[8, 2, 0, 5], [2, 2, 0, 0], [0, 0, 0, 0]])
+
+    def test_minimum_stock_per_piece(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=np.array([0, 5, 5]))
+
+        np.testing.assert_array_equal(result.needed[0], [3, 0, 0, 0])
+
+    def test_rolls_are_rounded_up(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=5)
+
+        # 15 m² for piece 0 + 6 m² for piece 1
+        self.assertAlmostEqual(result.fabric_m2[0], 21.0)
+        self.assertEqual(result.rolls[0], 3)
+        self.assertAlmostEqual(result.surplus_m2[0], 9.0)
+
+    def test_exact_multiple_does_not_add_a_roll(self):
+        inputs = build_inputs(
+            launched=[False, False, False],
+            in_launch=[True, False, False],
+            consumption=[[0.1, 0.1, 0.1, 0.1], [1, 1, 1, 1], [1, 1, 1, 1]],
+            initial=[[100, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]],
+        )
+        result = compute_replenishment(inputs)
+
+        self.assertEqual(result.rolls[0], 1)
+        self.assertAlmostEqual(result.surplus_m2[0], 0.0)
+
+    def test_surplus_follows_the_sales_mix(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=5)
+
+        # 9 m² left: 60% to P and 40% to M of the only category with sales;
+        # pieces not launched get no surplus
+        np.testing.assert_array_equal(result.surplus, [[5, 4, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]])
+        self.assertAlmostEqual(result.leftover_m2[0], 0.0)
+
+    def test_surplus_can_be_disabled(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=5, distribute_surplus=False)
+
+        self.assertFalse(result.surplus.any())
+        np.testing.assert_array_equal(result.quantities, result.needed)
+
+    def test_costs(self):
+        result = compute_replenishment(build_inputs(), minimum_stock=5)
+
+        # 3 rolls x R$ 100; 24 units x R$ 20 + 4 units x R$ 10
+        self.assertEqual(result.fabric_cost, Decimal('300.00'))
+        self.assertEqual(result.production_cost, Decimal('520.00'))
+        self.assertEqual(result.total_cost, Decimal('820.00'))
+        self.assertEqual(result.total_pieces, 28)
+
+    def test_fabric_without_needed_units_buys_nothing(self):
+        inputs = build_inputs(launched=[False, False, False], in_launch=[False, False, False])
+        result = compute_replenishment(inputs)
+
+        self.assertFalse(result.fabric_used[0])
+        self.assertEqual(result.rolls[0], 0)
+        self.assertEqual(result.total_cost, Decimal('0.00'))
+
+
+class AllocateSurplusTests(SimpleTestCase):
+
+    def setUp(self):
+        self.fabric_index = np.array([0, 0, 1])
+        self.consumption = np.array([[1.0, 1.0, 1.0, 1.0], [2.0, 2.0, 2.0, 2.0], [1.0, 1.0, 1.0, 1.0]])
+        self.target = np.array([[3.0, 2.0, 0.0, 0.0], [1.0, 1.5, 0.0, 0.0], [4.0, 0.0, 0.0, 0.0]])
+        self.eligible = self.target > 0
+
+    def allocate(self, surplus_m2, **kwargs):
+        return allocate_surplus(
+            self.fabric_index, self.consumption, np.array(surplus_m2), self.target, self.eligible, **kwargs
+        )
+
+    def assert_valid(self, surplus, surplus_m2):
+        self.assertEqual(surplus.dtype, np.int64)
+        self.assertFalse(surplus[~self.eligible].any())
+        used = np.bincount(self.fabric_index, weights=(self.consumption * surplus).sum(axis=1), minlength=2)
+        self.assertTrue((used <= np.array(surplus_m2) + 1e-9).all())
+        return used
+
+    def test_fills_the_leftover_within_the_mix(self):
+        surplus = self.allocate([10.0, 4.0])
+        used = self.assert_valid(surplus, [10.0, 4.0])
+
+        # The targets use exactly 10 m² and 4 m²
+        np.testing.assert_allclose(used, [10.0, 4.0])
+        lower = np.floor(self.target * (1 - MIX_TOLERANCE))
+        upper = np.ceil(self.target * (1 + MIX_TOLERANCE))
+        self.assertTrue(((surplus >= lower) & (surplus <= upper))[self.eligible].all())
+
+    def test_targets_are_scaled_to_the_leftover(self):
+        surplus = self.allocate([5.0, 0.0])
+
+        self.assert_valid(surplus, [5.0, 0.0])
+        self.assertFalse(surplus[2].any())
+
+    def test_greedy_without_solver_time(self):
+        surplus = self.allocate([10.0, 4.0], time_limit=0)
+
+        self.assert_valid(surplus, [10.0, 4.0])
+        self.assertGreater(surplus.sum(), 0)
+
+    def test_nothing_to_allocate(self):
+        surplus = self.allocate([0.0, 0.0])
+
+        self.assertFalse(surplus.any())
+
+
+class ParseScenarioTests(SimpleTestCase):
+
+    def test_defaults(self):
+        scenario = parse_scenario({})
+
+        self.assertEqual(scenario['window_days'], 120)
+        self.assertEqual(scenario['minimum_stock'], 5)
+
+    def test_window_days_must_be_a_whole_number(self):
+        for value in (5.7, 'abc', True, float('inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_scenario({'window_days': value})
+
+        self.assertEqual(parse_scenario({'window_days': 90.0})['window_days'], 90)
+
+    def test_window_days_is_bounded(self):
+        self.assertEqual(parse_scenario({'window_days': MAX_WINDOW_DAYS})['window_days'], MAX_WINDOW_DAYS)
+        for value in (0, MAX_WINDOW_DAYS + 1, 800000):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_scenario({'window_days': value})
+
+
+class PlanHorizonTests(SimpleTestCase):
+
+    def build(self):
+        """Piece 0 launched selling 1 P per day (120 in 120 days) with 12 in stock; piece 1 in launch"""
+        return ReplenishmentInputs(
+            fabric_index=[0, 0],
+            category_index=[0, 0],
+            launched=[True, False],
+            in_launch=[False, True],
+            consumption=[[1, 1, 1, 1], [2, 2, 2, 2]],
+            stock=[[12, 5, 5, 5], [0, 0, 0, 0]],
+            initial=[[0, 0, 0, 0], [3, 0, 0, 0]],
+            sold=[[120, 0, 0, 0], [0, 0, 0, 0]],
+            m2_per_roll=[10.0],
+            roll_price_cents=[10000],
+            production_cost_cents=[2000],
+            sold_by_category=[[[120, 0, 0, 0]]],
+        )
+
+    def test_business_days(self):
+        np.testing.assert_array_equal(business_to_calendar_days([10, 3, 0]), [14, 5, 0])
+
+    def test_orders_are_placed_lead_time_ahead(self):
+        plan = plan_horizon(self.build(), lead_days=[14, 14], weeks=4, minimum_stock=5, window_days=120)
+
+        # 7 units per week needed from week 2 on, ordered two weeks earlier
+        np.testing.assert_array_equal(plan.orders[0, 0], [7, 7, 7, 0])
+        self.assertEqual(plan.stockout_week[0, 0], 2)
+        self.assertFalse(plan.late[0, 0])
+        # Sizes at the minimum without sales need nothing
+        self.assertFalse(plan.orders[0, 1:].any())
+        self.assertEqual(plan.stockout_week[0, 1], -1)
+
+    def test_late_requirements_are_ordered_now(self):
+        plan = plan_horizon(self.build(), lead_days=[21, 21], weeks=4, minimum_stock=5, window_days=120)
+
+        np.testing.assert_array_equal(plan.orders[0, 0], [14, 7, 0, 0])
+        self.assertTrue(plan.late[0, 0])
+
+    def test_pieces_in_launch_order_their_initial_quantity_now(self):
+        plan = plan_horizon(self.build(), lead_days=[14, 14], weeks=4, minimum_stock=5, window_days=120)
+
+        np.testing.assert_array_equal(plan.order_now[1], [3, 0, 0, 0])
+        self.assertFalse(plan.orders[1, :, 1:].any())
+
+    def test_fabric_and_rolls_now(self):
+        plan = plan_horizon(self.build(), lead_days=[14, 14], weeks=4, minimum_stock=5, window_days=120)
+
+        # Week 0: 7 units x 1 m² + 3 units x 2 m²
+        np.testing.assert_allclose(plan.fabric_m2[0], [13.0, 7.0, 7.0, 0.0])
+        self.assertEqual(plan.rolls_now[0], 2)
+
+
+class ForecastReuseTests(SimpleTestCase):
+    """Piece 1 sells daily, piece 2 every 10 days (Croston), piece 3 never"""
+
+    days = 180
+
+    def matrix(self, shift=0, extra_sale=False):
+        pieces = [
+            {'pk': pk, 'name': f'Peça {pk}', 'sale_price': Decimal('100.00'),
+             'collection_id': 1, 'collection__name': 'Verão', 'fabric_id': 1,
+             'fabric__name': 'Linho', 'fabric__color': 'Cru'}
+            for pk in (1, 2, 3)
+        ]
+        # Sales by absolute day, so the window can slide over them
+        units = np.zeros((3, self.days + shift))
+        units[0] = 2
+        units[1, 5::10] = 3
+        if extra_sale:
+            units[1, -1] = 1
+        # Piece 2 starts a refit week on the first `today`
+        start = date(2026, 1, 4) + timedelta(days=shift)
+        return SalesMatrix(pieces, units[:, shift:], start), start + timedelta(days=self.days)
+
+    def previous(self, forecasts):
+        return {
+            forecast.target_id: {
+                'input_hash': forecast.input_hash,
+                'predicted_units': forecast.predicted_units,
+                'predicted_revenue': forecast.predicted_revenue,
+                'confidence_interval_lower': forecast.confidence_interval_lower,
+                'confidence_interval_upper': forecast.confidence_interval_upper,
+                'model_used': forecast.model_used,
+            }
+            for forecast in forecasts
+            if forecast.forecast_type == 'piece' and forecast.input_hash
+        }
+
+    def test_only_croston_and_idle_pieces_store_a_hash(self):
+        matrix, today = self.matrix()
+        forecasts, fitted = build_forecasts(matrix, today=today)
+
+        self.assertEqual(fitted, 3)
+        self.assertEqual(sorted(self.previous(forecasts)), [2, 3])
+
+    def test_sliding_window_without_sales_reuses_the_forecast(self):
+        matrix, today = self.matrix()
+        previous = self.previous(build_forecasts(matrix, today=today)[0])
+
+        # Day 61 sells nothing for piece 2 and drops a day without its sales
+        matrix, today = self.matrix(shift=1)
+        forecasts, fitted = build_forecasts(matrix, today=today, previous=previous)
+
+        self.assertEqual(fitted, 1)
+        self.assertEqual(self.previous(forecasts), previous)
+
+    def test_new_sale_refits_the_piece(self):
+        matrix, today = self.matrix()
+        previous = self.previous(build_forecasts(matrix, today=today)[0])
+
+        matrix, today = self.matrix(shift=1, extra_sale=True)
+        forecasts, fitted = build_forecasts(matrix, today=today, previous=previous)
+
+        self.assertEqual(fitted, 2)
+        self.assertNotEqual(self.previous(forecasts)[2]['input_hash'], previous[2]['input_hash'])
+
+    def test_reused_forecast_is_close_to_a_refit(self):
+        matrix, today = self.matrix()
+        previous = self.previous(build_forecasts(matrix, today=today)[0])
+
+        # Four days later, same sales: piece 2 is reused, a refit drifts slightly
+        matrix, today = self.matrix(shift=4)
+        reused, fitted = build_forecasts(matrix, today=today, previous=previous)
+        refit, _ = build_forecasts(matrix, today=today)
+
+        self.assertEqual(fitted, 1)
+        reused, refit = reused[1], refit[1]
+        self.assertEqual(reused.predicted_units, previous[2]['predicted_units'])
+        self.assertLessEqual(abs(reused.predicted_units - refit.predicted_units), 1)
+        self.assertAlmostEqual(
+            float(reused.confidence_interval_upper), float(refit.confidence_interval_upper),
+            delta=0.05 * float(refit.confidence_interval_upper),
+        )
+
+    def test_reused_forecasts_are_refitted_weekly(self):
+        matrix, today = self.matrix()
+        previous = self.previous(build_forecasts(matrix, today=today)[0])
+
+        forecasts, fitted = build_forecasts(matrix, today=today + timedelta(days=REFIT_DAYS), previous=previous)
+
+        self.assertEqual(fitted, 3)
+
+
+def create_sale(external_id, piece, days_ago, quantity, unit_price):
+    return SalesData.objects.create(
+        external_id=external_id,
+        sale_date=timezone.localdate() - timedelta(days=days_ago),
+        piece_sku=f'SKU-{external_id}',
+        piece_name=piece.name if piece else 'Sem vínculo',
+        quantity_sold=quantity,
+        unit_price=Decimal(unit_price),
+        total_amount=Decimal(unit_price) * quantity,
+        piece=piece,
+    )
+
+
+def create_outflow(piece, size, quantity):
+    """One saída of `piece` yesterday, added to its StockDailySummary row"""
+    record = StockHistory.objects.create(
+        piece=piece, size=size, quantity=quantity, movement_type='saida',
+        stock_after_movement=0, date=timezone.now() - timedelta(days=1),
+    )
+    update_daily_summaries([record])
+
+
+class ArchiveTests(TestCase):
+    """Sales older than the retention leave the table but not the statistics"""
+
+    def setUp(self):
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        settings_override = override_settings(ARCHIVE_ROOT=archive_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.piece, = create_pieces(1)
+        create_sale('antigo-1', self.piece, 400, 2, '60.00')
+        create_sale('antigo-2', self.piece, 390, 1, '55.00')
+        create_sale('sem-peca', None, 400, 4, '10.00')
+        create_sale('recente', self.piece, 10, 1, '70.00')
+
+    def test_old_sales_are_moved_to_the_archive(self):
+        result = archive_table('sales_data', retention_days=365)
+
+        self.assertEqual(result['rows'], 3)
+        self.assertEqual(list(SalesData.objects.values_list('external_id', flat=True)), ['recente'])
+
+        archived = {row['external_id']: row for row in read_archive('sales_data')}
+        self.assertEqual(sorted(archived), ['antigo-1', 'antigo-2', 'sem-peca'])
+        self.assertEqual(archived['antigo-1']['total_amount'], Decimal('120.00'))
+        self.assertEqual(archived['antigo-1']['piece_id'], self.piece.pk)
+        self.assertIsNone(archived['sem-peca']['piece_id'])
+
+    def test_archived_revenue_is_kept_in_the_totals(self):
+        recalculate_piece_statistics([self.piece.pk])
+        before = PieceSalesStatistics.objects.get(piece=self.piece).total_revenue
+
+        archive_table('sales_data', retention_days=365)
+        recalculate_piece_statistics([self.piece.pk])
+
+        total = ArchivedSalesTotal.objects.get(piece=self.piece)
+        self.assertEqual((total.units_sold, total.revenue), (3, Decimal('175.00')))
+        self.assertEqual(before, Decimal('245.00'))
+        self.assertEqual(PieceSalesStatistics.objects.get(piece=self.piece).total_revenue, before)
+
+    def test_second_run_archives_nothing(self):
+        archive_table('sales_data', retention_days=365)
+        result = archive_table('sales_data', retention_days=365)
+
+        self.assertEqual(result['rows'], 0)
+        self.assertEqual(ArchivedSalesTotal.objects.get(piece=self.piece).revenue, Decimal('175.00'))
+
+    def test_totals_are_rebuilt_from_the_archive_files(self):
+        archive_table('sales_data', retention_days=365)
+        ArchivedSalesTotal.objects.update(units_sold=0, revenue=0)
+
+        self.assertEqual(rebuild_archived_sales(), 1)
+        total = ArchivedSalesTotal.objects.get()
+        self.assertEqual((total.piece_id, total.units_sold, total.revenue), (self.piece.pk, 3, Decimal('175.00')))
+
+
+class PieceStatisticsRefreshTests(TestCase):
+    """Only the pieces touched since the watermark are recalculated"""
+
+    def setUp(self):
+        self.sold, self.idle = create_pieces(2)
+
+    def statistics(self, piece):
+        return PieceSalesStatistics.objects.get(piece=piece)
+
+    def test_first_refresh_recalculates_every_piece(self):
+        self.assertEqual(refresh_piece_statistics(), 2)
+        self.assertTrue(StatisticsWatermark.objects.filter(name=WATERMARK_NAME).exists())
+
+    def test_later_refreshes_only_recalculate_touched_pieces(self):
+        refresh_piece_statistics()
+        self.assertEqual(refresh_piece_statistics(), 0)
+
+        create_sale('venda', self.sold, 1, 2, '150.00')
+        create_outflow(self.sold, 'M', 2)
+        self.assertEqual(refresh_piece_statistics(), 1)
+
+        stats = self.statistics(self.sold)
+        self.assertEqual((stats.total_units_sold, stats.total_sold_m), (2, 2))
+        self.assertEqual((stats.total_revenue, stats.average_sale_price), (Decimal('300.00'), Decimal('150.00')))
+
+        # A stock movement alone also touches the piece
+        create_outflow(self.idle, 'P', 1)
+        self.assertEqual(refresh_piece_statistics(), 1)
+        self.assertEqual(self.statistics(self.idle).total_units_sold, 1)
+
+    def test_outflows_without_sales_have_no_revenue(self):
+        create_outflow(self.idle, 'G', 3)
+        refresh_piece_statistics()
+
+        stats = self.statistics(self.idle)
+        self.assertEqual(stats.total_units_sold, 3)
+        self.assertEqual((stats.total_revenue, stats.average_sale_price), (Decimal('0'), Decimal('0')))
+
+    def test_full_refresh_ignores_the_watermark(self):
+        refresh_piece_statistics()
+
+        self.assertEqual(refresh_piece_statistics(full=True), 2)
@@ -9,6 +9,141 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+SIZES = ['P', 'M', 'G', 'GG']
+
+# SalesData rows resolved per bulk update
+RESOLVE_CHUNK_SIZE = 2000
+
+
+def size_breakdown(size, quantity):
+    """quantity_* fields of a sale of `quantity` units of one size (all zero if unknown)"""
+    return {f'quantity_{option.lower()}': quantity if option == size else 0 for option in SIZES}
+
+
+# StatisticsWatermark of the pieces whose stored sales were last resolved
+RESOLUTION_WATERMARK = 'tiny_sales_resolution'
+
+
+def _resolve_rows(rows, resolver):
+    """
+    Resolve SalesData rows with `resolver` and bulk-write the changed ones
+
+    Returns:
+        tuple: (rows resolved, rows left unresolved, set of piece ids whose sales changed)
+    """
+    from .models import SalesData
+
+    resolved = unresolved = 0
+    touched = set()
+    changed = []
+    fields = ['piece', 'size'] + [f'quantity_{size.lower()}' for size in SIZES]
+    rows = rows.only('pk', 'piece_sku', 'piece_name', 'tiny_product_id', 'quantity_sold', 'piece_id', 'size')
+    for sale in rows.order_by('pk').iterator(chunk_size=RESOLVE_CHUNK_SIZE):
+        piece_id, size = resolver.resolve(sale.tiny_product_id, sale.piece_sku, sale.piece_name)
+        if piece_id is None:
+            unresolved += 1
+        else:
+            resolved += 1
+        if (piece_id, size) != (sale.piece_id, sale.size):
+            touched.update(value for value in (piece_id, sale.piece_id) if value)
+            sale.piece_id, sale.size = piece_id, size
+            for field, value in size_breakdown(size, sale.quantity_sold).items():
+                setattr(sale, field, value)
+            changed.append(sale)
+        if len(changed) == RESOLVE_CHUNK_SIZE:
+            SalesData.objects.bulk_update(changed, fields)
+            changed = []
+
+    SalesData.objects.bulk_update(changed, fields, batch_size=RESOLVE_CHUNK_SIZE)
+    resolver.save_learned()
+    return resolved, unresolved, touched
+
+
+def resolve_sales_data(resolve_all=False):
+    """
+    Link stored SalesData rows to their piece and size through the Tiny
+    product index (rebuilt first); a full pass, run by the resolve_sales_data
+    command
+
+    Args:
+        resolve_all: Re-resolve every row, not only the unresolved ones
+
+    Returns:
+        tuple: (rows resolved, rows left unresolved, set of piece ids whose sales changed)
+    """
+    from store_collections.tiny_index import TinyIndexResolver, rebuild_tiny_index
+    from .models import SalesData
+
+    rebuild_tiny_index()
+    rows = SalesData.objects.all()
+    if not resolve_all:
+        rows = rows.filter(piece__isnull=True)
+
+    resolved, unresolved, touched = _resolve_rows(rows, TinyIndexResolver())
+    logger.info(f"Sales data resolved: {resolved} linked, {unresolved} unresolved")
+    return resolved, unresolved, touched
+
+
+def resolve_piece_sales(pieces):
+    """
+    Link the stored unresolved sales that belong to some pieces (e.g. just
+    linked to Tiny ERP): only rows carrying one of their product/variation
+    IDs, learned SKUs or names are read. The pieces must already be indexed
+
+    Returns:
+        tuple: (rows resolved, rows left unresolved, set of piece ids whose sales changed)
+    """
+    from django.db.models import Q
+    from django.db.models.functions import Lower, Trim
+    from store_collections.models import TinyProductIndex
+    from store_collections.tiny_index import TinyIndexResolver
+    from .models import SalesData
+
+    piece_ids = [piece.pk for piece in pieces]
+    if not piece_ids:
+        return 0, 0, set()
+
+    keys = TinyProductIndex.objects.filter(piece_id__in=piece_ids).values_list('kind', 'key')
+    ids = [key for kind, key in keys if kind != 'sku']
+    skus = [key for kind, key in keys if kind == 'sku']
+    names = [piece.name.strip().lower() for piece in pieces]
+
+    rows = SalesData.objects.filter(piece__isnull=True).annotate(name_key=Lower(Trim('piece_name'))).filter(
+        Q(tiny_product_id__in=ids) | Q(piece_sku__in=skus) | Q(name_key__in=names)
+    )
+    return _resolve_rows(rows, TinyIndexResolver())
+
+
+def resolve_linked_sales():
+    """
+    Link the stored sales of pieces linked or edited since the last call
+    (Piece.updated_at past a StatisticsWatermark); the first call resolves
+    every unresolved row once. Rows that never match are not read again
+
+    Returns:
+        tuple: (rows resolved, rows left unresolved, set of piece ids whose sales changed)
+    """
+    from django.utils import timezone
+    from store_collections.models import Piece
+    from store_collections.tiny_index import index_pieces
+    from .models import StatisticsWatermark
+
+    started_at = timezone.now()
+    watermark = StatisticsWatermark.objects.filter(name=RESOLUTION_WATERMARK).first()
+
+    if watermark is None:
+        result = resolve_sales_data()
+    else:
+        pieces = list(Piece.objects.filter(updated_at__gte=watermark.processed_until).only('pk', 'name'))
+        index_pieces(pieces)
+        result = resolve_piece_sales(pieces)
+
+    StatisticsWatermark.objects.update_or_create(
+        name=RESOLUTION_WATERMARK,
+        defaults={'processed_until': started_at},
+    )
+    return result
+
 
 class TinyERPSalesAPI:
     """
@@ -63,6 +198,7 @@ class TinyERPSalesAPI:
                             'sale_date': datetime.strptime(pedido.get('data_pedido', ''), '%d/%m/%Y').date() if pedido.get('data_pedido') else datetime.now().date(),
                             'piece_sku': produto.get('codigo', ''),
                             'piece_name': produto.get('descricao', ''),
+                            'tiny_product_id': str(produto.get('id_produto', '')),
                             'quantity_sold': int(produto.get('quantidade', 0)),
                             'unit_price': Decimal(str(produto.get('valor_unitario', 0))),
                             'total_amount': Decimal(str(produto.get('valor_total', 0))),
@@ -78,25 +214,39 @@ class TinyERPSalesAPI:
             logger.error(f"Error parsing Tiny ERP response: {e}")
             return []
 
-    def sync_sales_record(self, sales_data):
+    def sync_sales_record(self, sales_data, resolver=None):
         """
         Sync a single sales record to the database
+        The piece and size are resolved through the Tiny product index
         Returns (sales_object, created_flag)
         """
+        from store_collections.tiny_index import TinyIndexResolver
         from .models import SalesData
 
+        standalone = resolver is None
+        resolver = resolver or TinyIndexResolver()
+
         try:
+            piece_id, size = resolver.resolve(
+                sales_data.get('tiny_product_id'), sales_data['piece_sku'], sales_data['piece_name']
+            )
             sale, created = SalesData.objects.update_or_create(
                 external_id=sales_data['external_id'],
                 defaults={
                     'sale_date': sales_data['sale_date'],
                     'piece_sku': sales_data['piece_sku'],
                     'piece_name': sales_data['piece_name'],
+                    'tiny_product_id': sales_data.get('tiny_product_id', ''),
                     'quantity_sold': sales_data['quantity_sold'],
                     'unit_price': sales_data['unit_price'],
                     'total_amount': sales_data['total_amount'],
+                    'piece_id': piece_id,
+                    'size': size,
+                    **size_breakdown(size, sales_data['quantity_sold']),
                 }
             )
+            if standalone:
+                resolver.save_learned()
             return sale, created
         except Exception as e:
             logger.error(f"Error syncing sales record {sales_data.get('external_id')}: {e}")
@@ -107,14 +257,17 @@ class TinyERPSalesAPI:
         Fetch and sync all sales data from Tiny ERP
         Returns (created_count, updated_count, error_count)
         """
+        from store_collections.tiny_index import TinyIndexResolver
+
         sales_data_list = self.fetch_sales_data()
+        resolver = TinyIndexResolver()
 
         created_count = 0
         updated_count = 0
         error_count = 0
 
         for sales_data in sales_data_list:
-            sale, created = self.sync_sales_record(sales_data)
+            sale, created = self.sync_sales_record(sales_data, resolver)
             if sale:
                 if created:
                     created_count += 1
@@ -122,6 +275,7 @@ class TinyERPSalesAPI:
                     updated_count += 1
             else:
                 error_count += 1
+        resolver.save_learned()
 
         logger.info(f"Sales sync completed: {created_count} created, {updated_count} updated, {error_count} errors")
         return created_count, updated_count, error_count
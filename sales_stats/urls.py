@@ -6,4 +6,11 @@ app_name = 'sales_stats'
 urlpatterns = [
     path('', views.statistics_dashboard, name='dashboard'),
     path('gerar-reposicao/', views.generate_replenishment, name='generate_replenishment'),
+    path('reposicao/', views.latest_replenishment, name='latest_replenishment'),
+    path('reposicao/comparar/', views.compare_replenishment_runs, name='compare_replenishment_runs'),
+    path('reposicao/<int:run_id>/', views.replenishment_run, name='replenishment_run'),
+    path('reposicao/<int:run_id>/exportar.csv', views.export_replenishment_csv, name='export_replenishment_csv'),
+    path('reposicao/<int:run_id>/exportar.json', views.export_replenishment_json, name='export_replenishment_json'),
+    path('api/cenarios/', views.replenishment_scenarios_api, name='replenishment_scenarios_api'),
+    path('api/horizonte/', views.replenishment_horizon_api, name='replenishment_horizon_api'),
 ]
@@ -1,11 +1,16 @@
-from django.shortcuts import render, redirect
+import json
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.utils import timezone
-from datetime import timedelta
-from decimal import Decimal
-from collections import defaultdict
-import math
-from store_collections.models import Piece, Fabric, StockHistory
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from .horizon import HORIZON_WEEKS, horizon_summary, run_horizon_plan
+from .models import ReplenishmentRun
+from .replenishment import MAX_WINDOW_DAYS, MINIMUM_STOCK, WINDOW_DAYS
+from .replenishment_export import stream_csv, stream_json
+from .replenishment_runs import compare_runs, latest_run, run_context, start_replenishment_run
+from .replenishment_scenarios import evaluate_scenarios
 
 
 def statistics_dashboard(request):
@@ -13,223 +18,213 @@ def statistics_dashboard(request):
     Dashboard page for statistics with button to generate replenishment numbers
     """
     context = {
-        'title': 'Estatísticas'
+        'title': 'Estatísticas',
+        'recent_runs': ReplenishmentRun.objects.all()[:10],
+        'finished_runs': ReplenishmentRun.objects.filter(status='done')[:10],
+        'optimize_rolls': settings.REPLENISHMENT_OPTIMIZE_ROLLS,
     }
     return render(request, 'sales_stats/dashboard.html', context)
 
 
 def generate_replenishment(request):
     """
-    Calculate replenishment quantities based on sales data from last 120 days
+    Queue a replenishment calculation based on sales data from last 120 days
+    Reuses the latest run while stock, pieces, fabrics, categories and materials are unchanged
     """
     if request.method != 'POST':
         return redirect('sales_stats:dashboard')
 
-    # Calculate date 120 days ago
-    cutoff_date = timezone.now() - timedelta(days=120)
-
-    # Get all sales (saida) from last 120 days
-    sales = StockHistory.objects.filter(
-        movement_type='saida',
-        date__gte=cutoff_date
-    ).select_related('piece', 'piece__fabric', 'piece__category')
-
-    # Group sales by fabric
-    fabric_sales = defaultdict(lambda: {
-        'categories': defaultdict(lambda: {
-            'sizes': defaultdict(int),
-            'total': 0
-        }),
-        'total': 0
-    })
+    user = request.user if request.user.is_authenticated else None
+    run, reused = start_replenishment_run(
+        optimize_rolls=bool(request.POST.get('optimize_rolls')),
+        user=user,
+        force=bool(request.POST.get('force')),
+    )
 
-    # Process sales data
-    for sale in sales:
-        fabric = sale.piece.fabric
-        category = sale.piece.category
-        size = sale.size
-        quantity = sale.quantity
-
-        fabric_sales[fabric]['categories'][category]['sizes'][size] += quantity
-        fabric_sales[fabric]['categories'][category]['total'] += quantity
-        fabric_sales[fabric]['total'] += quantity
-
-    # Calculate percentages
-    fabric_percentages = {}
-    for fabric, data in fabric_sales.items():
-        fabric_percentages[fabric] = {
-            'categories': {}
-        }
-
-        for category, cat_data in data['categories'].items():
-            cat_percentage = (cat_data['total'] / data['total']) * 100 if data['total'] > 0 else 0
-
-            size_percentages = {}
-            for size, size_total in cat_data['sizes'].items():
-                size_percentages[size] = (size_total / cat_data['total']) * 100 if cat_data['total'] > 0 else 0
-
-            fabric_percentages[fabric]['categories'][category] = {
-                'percentage': cat_percentage,
-                'sizes': size_percentages
-            }
+    if reused:
+        messages.info(request, 'Nenhuma alteração desde o último cálculo, exibindo o resultado existente.')
 
-    # Calculate replenishment for each piece
-    replenishment_data = defaultdict(lambda: defaultdict(int))
-    fabric_consumption = defaultdict(Decimal)
-
-    # Get all active pieces for replenishment
-    active_pieces = Piece.objects.filter(active_for_replenishment=True).select_related('fabric', 'category')
-
-    for piece in active_pieces:
-        fabric = piece.fabric
-        category = piece.category
-
-        # Get consumption for each size
-        consumptions = {
-            'P': piece.fabric_consumption_p,
-            'M': piece.fabric_consumption_m,
-            'G': piece.fabric_consumption_g,
-            'GG': piece.fabric_consumption_gg
-        }
-
-        # Get current stock for each size
-        current_stocks = {
-            'P': piece.current_stock_p,
-            'M': piece.current_stock_m,
-            'G': piece.current_stock_g,
-            'GG': piece.current_stock_gg
-        }
-
-        # Get initial quantities for each size
-        initial_quantities = {
-            'P': piece.initial_quantity_p,
-            'M': piece.initial_quantity_m,
-            'G': piece.initial_quantity_g,
-            'GG': piece.initial_quantity_gg
-        }
-
-        # Get sales for this piece in the period
-        piece_sales = sales.filter(piece=piece)
-        piece_sales_by_size = defaultdict(int)
-        for sale in piece_sales:
-            piece_sales_by_size[sale.size] += sale.quantity
-
-        for size in ['P', 'M', 'G', 'GG']:
-            if piece.launch_status == 'em_lancamento':
-                # For "Em lançamento" pieces, replenish exactly the initial quantity
-                needed = initial_quantities[size]
-            else:
-                # For "Lançada" pieces: minimum 5 + sales in period - current stock
-                minimum_stock = 5
-                sold_in_period = piece_sales_by_size[size]
-                target_stock = minimum_stock + sold_in_period
-                needed = max(0, target_stock - current_stocks[size])
-
-            if needed > 0:
-                replenishment_data[piece][size] = needed
-                fabric_consumption[fabric] += consumptions[size] * Decimal(needed)
-
-    # Calculate fabric rolls needed
-    fabric_rolls = {}
-    fabric_surplus = {}
-
-    for fabric, total_m2_needed in fabric_consumption.items():
-        # Calculate m² per roll: roll_weight_kg * yield_area_per_kg
-        m2_per_roll = fabric.roll_weight_kg * fabric.yield_area_per_kg
-
-        # Calculate number of rolls needed (rounded up)
-        rolls_needed = math.ceil(total_m2_needed / m2_per_roll)
-
-        # Calculate total m² available with rounded rolls
-        total_m2_available = m2_per_roll * Decimal(rolls_needed)
-
-        # Calculate surplus
-        surplus = total_m2_available - total_m2_needed
-
-        fabric_rolls[fabric] = rolls_needed
-        fabric_surplus[fabric] = surplus
-
-    # Distribute surplus fabric using percentages
-    surplus_pieces = defaultdict(lambda: defaultdict(int))
-
-    for fabric, surplus_m2 in fabric_surplus.items():
-        if surplus_m2 <= 0 or fabric not in fabric_percentages:
-            continue
-
-        # Get pieces that are "Lançada" (surplus is not for "Em lançamento" pieces)
-        launched_pieces = [p for p in active_pieces if p.fabric == fabric and p.launch_status == 'lancada']
-
-        for piece in launched_pieces:
-            category = piece.category
-
-            if category not in fabric_percentages[fabric]['categories']:
-                continue
-
-            cat_percentage = fabric_percentages[fabric]['categories'][category]['percentage']
-
-            consumptions = {
-                'P': piece.fabric_consumption_p,
-                'M': piece.fabric_consumption_m,
-                'G': piece.fabric_consumption_g,
-                'GG': piece.fabric_consumption_gg
-            }
+    return redirect('sales_stats:replenishment_run', run_id=run.pk)
+
+
+def latest_replenishment(request):
+    """
+    Latest finished replenishment run
+    """
+    run = latest_run()
+    if not run:
+        messages.info(request, 'Nenhum cálculo de reposição concluído ainda.')
+        return redirect('sales_stats:dashboard')
 
-            for size in ['P', 'M', 'G', 'GG']:
-                if size not in fabric_percentages[fabric]['categories'][category]['sizes']:
-                    continue
+    return redirect('sales_stats:replenishment_run', run_id=run.pk)
 
-                size_percentage = fabric_percentages[fabric]['categories'][category]['sizes'][size]
 
-                # Calculate m² for this variation
-                variation_m2 = surplus_m2 * Decimal(cat_percentage / 100) * Decimal(size_percentage / 100)
+def replenishment_run(request, run_id):
+    """
+    Results of one replenishment run (refreshes while it is being calculated)
+    """
+    run = get_object_or_404(ReplenishmentRun, pk=run_id)
+
+    context = {
+        'title': 'Números de Reposição',
+        'previous_run': ReplenishmentRun.objects.filter(status='done', created_at__lt=run.created_at).first(),
+        **run_context(run),
+    }
+
+    return render(request, 'sales_stats/replenishment_results.html', context)
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_replenishment_csv(request, run_id):
+    """
+    Stream a finished run as CSV
+    ?secao=tecidos exports the fabric rolls and ?secao=materiais the
+    accessories, packaging and gifts instead of the pieces
+    """
+    run = get_object_or_404(ReplenishmentRun, pk=run_id, status='done')
+    secao = request.GET.get('secao')
+    if secao not in ('tecidos', 'materiais'):
+        secao = 'pecas'
+    section = {'tecidos': 'fabrics', 'materiais': 'materials', 'pecas': 'pieces'}[secao]
+    filename = f"reposicao-{run.pk}-{secao}.csv"
 
-                # Calculate number of pieces (rounded to nearest integer)
-                if consumptions[size] > 0:
-                    pieces_count = round(float(variation_m2 / consumptions[size]))
-                    if pieces_count > 0:
-                        surplus_pieces[piece][size] = pieces_count
+    response = StreamingHttpResponse(stream_csv(run, section), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
-    # Combine replenishment and surplus
-    final_replenishment = defaultdict(lambda: defaultdict(int))
 
-    for piece, sizes in replenishment_data.items():
-        for size, quantity in sizes.items():
-            final_replenishment[piece][size] = quantity
+@login_required
+@require_http_methods(["GET"])
+def export_replenishment_json(request, run_id):
+    """
+    Stream a finished run as JSON (totals, fabric rolls, materials and piece lines)
+    """
+    run = get_object_or_404(ReplenishmentRun, pk=run_id, status='done')
 
-    for piece, sizes in surplus_pieces.items():
-        for size, quantity in sizes.items():
-            final_replenishment[piece][size] += quantity
+    response = StreamingHttpResponse(stream_json(run), content_type='application/json')
+    response['Content-Disposition'] = f'attachment; filename="reposicao-{run.pk}.json"'
+    return response
 
-    # Convert defaultdict to regular dict for template compatibility
-    final_replenishment_dict = {}
-    for piece, sizes in final_replenishment.items():
-        final_replenishment_dict[piece] = dict(sizes)
 
-    # Calculate costs
-    # 1. Fabric cost: price per roll × number of rolls
-    fabric_cost = Decimal('0')
-    for fabric, rolls in fabric_rolls.items():
-        fabric_cost += fabric.price_per_roll * Decimal(rolls)
+def compare_replenishment_runs(request):
+    """
+    Compare two replenishment runs: ?base=<id>&other=<id>
+    Defaults to the two latest finished runs
+    """
+    finished_runs = ReplenishmentRun.objects.filter(status='done')
 
-    # 2. Production cost: production cost per piece × total pieces
-    production_cost = Decimal('0')
-    total_pieces_count = 0
-    for piece, sizes in final_replenishment_dict.items():
-        piece_total = sum(sizes.values())
-        total_pieces_count += piece_total
-        production_cost += piece.category.production_cost_per_piece * Decimal(piece_total)
+    other_id = request.GET.get('other')
+    other = get_object_or_404(finished_runs, pk=other_id) if other_id else finished_runs.first()
+    if not other:
+        messages.info(request, 'Nenhum cálculo de reposição concluído ainda.')
+        return redirect('sales_stats:dashboard')
 
-    # 3. Total cost
-    total_cost = fabric_cost + production_cost
+    base_id = request.GET.get('base')
+    if base_id:
+        base = get_object_or_404(finished_runs, pk=base_id)
+    else:
+        base = finished_runs.filter(created_at__lt=other.created_at).first()
+    if not base:
+        messages.info(request, 'É preciso ter dois cálculos concluídos para comparar.')
+        return redirect('sales_stats:replenishment_run', run_id=other.pk)
 
     context = {
-        'title': 'Números de Reposição',
-        'fabric_rolls': fabric_rolls,
-        'pieces_replenishment': final_replenishment_dict,
-        'fabric_cost': fabric_cost,
-        'production_cost': production_cost,
-        'total_cost': total_cost,
-        'total_pieces_count': total_pieces_count
+        'title': 'Comparar Reposições',
+        'base': base,
+        'other': other,
+        'finished_runs': finished_runs[:30],
+        **compare_runs(base, other),
     }
 
-    return render(request, 'sales_stats/replenishment_results.html', context)
+    return render(request, 'sales_stats/replenishment_compare.html', context)
+
+
+@login_required
+@require_http_methods(["POST"])
+def replenishment_scenarios_api(request):
+    """
+    JSON endpoint evaluating several replenishment parameter sets at once
+    Body: {"scenarios": [{"name", "window_days", "minimum_stock", "category_minimums",
+    "distribute_surplus", "optimize_rolls", "fabric_price_factor", "fabric_prices"}, ...]}
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Dados JSON inválidos'
+        }, status=400)
+
+    try:
+        results = evaluate_scenarios(data.get('scenarios') if isinstance(data, dict) else None)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'scenarios': [
+            {
+                'name': result['name'],
+                'window_days': result['window_days'],
+                'minimum_stock': result['minimum_stock'],
+                'category_minimums': result['category_minimums'],
+                'distribute_surplus': result['distribute_surplus'],
+                'optimize_rolls': result['optimize_rolls'],
+                'fabric_price_factor': float(result['fabric_price_factor']),
+                'fabric_prices': {
+                    fabric_id: float(price) for fabric_id, price in result['fabric_prices'].items()
+                },
+                'rolls': result['rolls'],
+                'leftover_m2': round(result['leftover_m2'], 3),
+                'needed_units': result['needed_units'],
+                'surplus_units': result['surplus_units'],
+                'total_pieces': result['total_pieces'],
+                'fabric_cost': float(result['fabric_cost']),
+                'production_cost': float(result['production_cost']),
+                'total_cost': float(result['total_cost']),
+                'fabrics': [
+                    {**fabric, 'cost': float(fabric['cost'])}
+                    for fabric in result['fabrics']
+                ],
+            }
+            for result in results
+        ]
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def replenishment_horizon_api(request):
+    """
+    JSON endpoint with the lead-time-aware order plan
+    Query: ?weeks=12&window_days=120&minimum_stock=5
+    """
+    try:
+        weeks = int(request.GET.get('weeks', HORIZON_WEEKS))
+        window_days = int(request.GET.get('window_days', WINDOW_DAYS))
+        minimum_stock = int(request.GET.get('minimum_stock', MINIMUM_STOCK))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'weeks, window_days e minimum_stock devem ser números inteiros'
+        }, status=400)
+
+    if not 1 <= weeks <= 52 or not 1 <= window_days <= MAX_WINDOW_DAYS or minimum_stock < 0:
+        return JsonResponse({
+            'success': False,
+            'error': f'Use de 1 a 52 semanas, window_days de 1 a {MAX_WINDOW_DAYS} e minimum_stock não negativo'
+        }, status=400)
+
+    inputs, plan = run_horizon_plan(weeks=weeks, window_days=window_days, minimum_stock=minimum_stock)
+
+    return JsonResponse({
+        'success': True,
+        'horizon_weeks': weeks,
+        'window_days': window_days,
+        'minimum_stock': minimum_stock,
+        **horizon_summary(inputs, plan),
+    })
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Fabric, Collection, Piece, PieceColor, PieceImage, StockHistory
+from .models import (Fabric, Collection, Piece, PieceColor, PieceImage, StockHistory, StockDailySummary,
+                     MonthlyStockSnapshot, TinyProductIndex)
 
 
 @admin.register(Fabric)
@@ -65,7 +66,7 @@ class PieceAdmin(admin.ModelAdmin):
     list_filter = ['status', 'launch_status', 'active_for_replenishment', 'collection', 'category', 'created_at']
     inlines = [PieceColorInline, PieceImageInline]
     filter_horizontal = ['accessories']
-    actions = ['sync_stock_from_tiny']
+    actions = ['sync_stock_from_tiny', 'batch_link_to_tiny']
 
     fieldsets = (
         ('Basic Information', {
@@ -152,6 +153,33 @@ class PieceAdmin(admin.ModelAdmin):
 
     sync_stock_from_tiny.short_description = 'Sincronizar estoque do Tiny ERP'
 
+    def batch_link_to_tiny(self, request, queryset):
+        """Admin action to auto-link selected unlinked pieces to Tiny ERP products"""
+        from .tiny_batch_link import TinyERPBatchLinker
+        from .tiny_search import TinyERPCatalogError
+
+        try:
+            result = TinyERPBatchLinker().run(queryset)
+        except TinyERPCatalogError as e:
+            self.message_user(request, f'{e}; nenhuma peça foi vinculada.', level='error')
+            return
+
+        if result['linked']:
+            self.message_user(
+                request,
+                f'{len(result["linked"])} peça(s) vinculada(s) ao Tiny ERP com estoque inicial sincronizado.',
+                level='success'
+            )
+        not_linked = [piece.name for piece, reason in result['unmatched']] + [piece.name for piece in result['failed']]
+        if not_linked:
+            self.message_user(
+                request,
+                f'{len(not_linked)} peça(s) sem correspondência segura: {", ".join(not_linked[:10])}',
+                level='warning'
+            )
+
+    batch_link_to_tiny.short_description = 'Vincular automaticamente ao Tiny ERP (em lote)'
+
 
 @admin.register(PieceColor)
 class PieceColorAdmin(admin.ModelAdmin):
@@ -187,3 +215,42 @@ class StockHistoryAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         # Histórico não pode ser editado (read-only)
         return False
+
+
+@admin.register(StockDailySummary)
+class StockDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['piece', 'size', 'day', 'entradas', 'saidas', 'closing_stock']
+    search_fields = ['piece__name', 'piece__collection__name']
+    list_filter = ['size', 'day']
+    date_hierarchy = 'day'
+    ordering = ['-day', 'piece', 'size']
+
+    def has_add_permission(self, request):
+        # Resumo é mantido junto com o histórico
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MonthlyStockSnapshot)
+class MonthlyStockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['piece', 'size', 'month', 'stock', 'unit_cost']
+    search_fields = ['piece__name', 'piece__collection__name']
+    list_filter = ['month', 'size']
+    readonly_fields = ['piece', 'size', 'month', 'stock', 'unit_cost', 'created_at']
+
+    def has_add_permission(self, request):
+        # Fechamento é gerado pelo comando snapshot_monthly_stock
+        return False
+
+
+@admin.register(TinyProductIndex)
+class TinyProductIndexAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'key', 'piece', 'size', 'updated_at']
+    search_fields = ['key', 'piece__name']
+    list_filter = ['kind', 'size']
+    raw_id_fields = ['piece']
@@ -0,0 +1,29 @@
+"""
+Management command to create upcoming monthly StockHistory partitions
+Usage:
+    python manage.py create_stock_partitions --months-ahead 6
+"""
+from django.core.management.base import BaseCommand
+from store_collections.partitions import ensure_stock_history_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Cria as partições mensais futuras do histórico de estoque (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Number of future months to create (default 3)',
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write(self.style.WARNING("Histórico de estoque não é particionado neste banco de dados"))
+            return
+
+        names = ensure_stock_history_partitions(months_ahead=options['months_ahead'])
+        for name in names:
+            self.stdout.write(f"✓ {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} partição(ões) verificada(s)"))
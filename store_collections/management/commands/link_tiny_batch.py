@@ -0,0 +1,78 @@
+"""
+Management command to link unlinked pieces to Tiny ERP products in batch
+Usage:
+    python manage.py link_tiny_batch --dry-run
+    python manage.py link_tiny_batch --collection-id 3 --min-score 0.9
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from store_collections.models import Piece
+from store_collections.tiny_batch_link import TinyERPBatchLinker
+from store_collections.tiny_search import TinyERPCatalogError
+
+
+class Command(BaseCommand):
+    help = 'Vincula em lote peças sem vínculo aos produtos do Tiny ERP (por similaridade de nome/SKU)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection-id',
+            type=int,
+            help='Only link pieces of a specific collection',
+        )
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            default=0.85,
+            help='Minimum name/SKU similarity to accept a match (0 to 1, default 0.85)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent Tiny ERP requests (default 4)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show matches without linking',
+        )
+
+    def handle(self, *args, **options):
+        collection_id = options.get('collection_id')
+        dry_run = options.get('dry_run', False)
+
+        start_time = timezone.now()
+
+        pieces = Piece.objects.select_related('collection')
+        if collection_id:
+            pieces = pieces.filter(collection_id=collection_id)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("⚠️  DRY RUN MODE - Nenhuma peça será vinculada"))
+
+        linker = TinyERPBatchLinker(min_score=options['min_score'], workers=options['workers'])
+        try:
+            result = linker.run(pieces, dry_run=dry_run)
+        except TinyERPCatalogError as e:
+            raise CommandError(f'{e}; nenhuma peça foi vinculada')
+
+        for piece, product, score in result['matches']:
+            self.stdout.write(f'✓ {piece.name} → {product["name"]} (ID {product["id"]}, {score:.0%})')
+
+        for piece, reason in result['unmatched']:
+            self.stdout.write(self.style.WARNING(f'✗ {piece.name}: {reason}'))
+
+        for piece in result['failed']:
+            self.stdout.write(self.style.ERROR(f'✗ {piece.name}: falha ao obter variações no Tiny ERP'))
+
+        duration = (timezone.now() - start_time).total_seconds()
+
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write(f"🔗 Correspondências: {len(result['matches'])}")
+        self.stdout.write(f"❓ Sem correspondência: {len(result['unmatched'])}")
+        if not dry_run:
+            self.stdout.write(f"✓ Vinculadas: {len(result['linked'])}")
+            self.stdout.write(f"✗ Falhas: {len(result['failed'])}")
+        self.stdout.write(f"⏱️  Tempo total: {duration:.2f} segundos")
+        self.stdout.write("=" * 60)
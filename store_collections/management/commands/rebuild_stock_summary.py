@@ -0,0 +1,39 @@
+"""
+Management command to rebuild the daily stock rollup from StockHistory
+Usage:
+    python manage.py rebuild_stock_summary
+    python manage.py rebuild_stock_summary --since 2025-01-01
+"""
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from store_collections.stock_history import rebuild_daily_summary
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo diário de estoque (StockDailySummary) a partir do histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only rebuild days from this date on (YYYY-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options.get('since'):
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('Data inválida, use o formato AAAA-MM-DD')
+
+        start_time = timezone.now()
+        self.stdout.write("Reconstruindo resumo diário de estoque...")
+
+        written = rebuild_daily_summary(since=since)
+
+        duration = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} linha(s) de resumo gravada(s) em {duration:.2f} segundos"
+        ))
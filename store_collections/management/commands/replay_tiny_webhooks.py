@@ -0,0 +1,118 @@
+"""
+Management command to replay Tiny ERP stock notifications locally
+Stands in for Tiny ERP when testing the stock webhook receiver
+Usage:
+    python manage.py replay_tiny_webhooks notifications.json
+    python manage.py replay_tiny_webhooks --sample 20
+"""
+import json
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from store_collections.models import Piece
+
+
+class Command(BaseCommand):
+    help = 'Reenvia notificações de estoque do Tiny ERP para o webhook local (teste)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            nargs='?',
+            help='JSON file with a list of notifications (or one notification per line)',
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=0,
+            help='Generate N random notifications for linked pieces instead of reading a file',
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0,
+            help='Seconds to wait between notifications',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Queue the verification fetch (requires Celery worker and Tiny ERP token)',
+        )
+
+    def handle(self, *args, **options):
+        if options['file']:
+            notifications = self.load_file(options['file'])
+        elif options['sample']:
+            notifications = self.sample_notifications(options['sample'])
+        else:
+            raise CommandError('Informe um arquivo de notificações ou use --sample N')
+
+        token = settings.TINY_WEBHOOK_TOKEN or 'replay-local'
+        url = f"{reverse('store_collections:tiny_stock_webhook')}?token={token}"
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+        applied = 0
+        with override_settings(TINY_WEBHOOK_TOKEN=token, TINY_WEBHOOK_VERIFY=options['verify']):
+            for i, notification in enumerate(notifications, 1):
+                response = client.post(url, data=json.dumps(notification), content_type='application/json')
+                result = response.json()
+
+                if response.status_code == 200 and result.get('applied'):
+                    applied += 1
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[{i}/{len(notifications)}] Peça {result['piece_id']} ({result['size']}) "
+                        f"{'atualizada' if result['changed'] else 'sem alteração'}"
+                    ))
+                else:
+                    self.stdout.write(self.style.WARNING(
+                        f"[{i}/{len(notifications)}] {response.status_code}: "
+                        f"{result.get('error') or result.get('message')}"
+                    ))
+
+                if options['delay']:
+                    time.sleep(options['delay'])
+
+        self.stdout.write(self.style.SUCCESS(f'\n{applied}/{len(notifications)} notificação(ões) aplicada(s)'))
+
+    def load_file(self, path):
+        """Read notifications from a JSON list or JSON lines file"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                content = f.read().strip()
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler {path}: {e}')
+
+        try:
+            if content.startswith('['):
+                return json.loads(content)
+            return [json.loads(line) for line in content.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise CommandError(f'JSON inválido em {path}: {e}')
+
+    def sample_notifications(self, count):
+        """Build random stock notifications for linked variations"""
+        variations = []
+        for piece in Piece.objects.filter(tiny_parent_id__isnull=False):
+            for size in ['p', 'm', 'g', 'gg']:
+                variation_id = getattr(piece, f'tiny_variation_id_{size}')
+                if variation_id:
+                    variations.append((variation_id, getattr(piece, f'current_stock_{size}')))
+
+        if not variations:
+            raise CommandError('Nenhuma variação vinculada ao Tiny ERP encontrada')
+
+        notifications = []
+        for _ in range(count):
+            variation_id, stock = random.choice(variations)
+            notifications.append({
+                'versao': '1.0.0',
+                'tipo': 'estoque',
+                'dados': {
+                    'idProduto': variation_id,
+                    'saldo': max(0, stock + random.randint(-3, 3)),
+                },
+            })
+        return notifications
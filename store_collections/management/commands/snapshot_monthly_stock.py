@@ -0,0 +1,35 @@
+"""
+Management command to store the month-end stock of every variant
+Usage:
+    python manage.py snapshot_monthly_stock              (previous month)
+    python manage.py snapshot_monthly_stock --month 2025-10
+"""
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from store_collections.stock_snapshots import take_monthly_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Grava o fechamento mensal de estoque por peça e tamanho'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            help='Month to close (YYYY-MM, default: previous month)',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('month'):
+            try:
+                month = date.fromisoformat(f"{options['month']}-01")
+            except ValueError:
+                raise CommandError('Mês inválido, use o formato AAAA-MM')
+        else:
+            month = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        written = take_monthly_snapshot(month)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Fechamento de {month:%m/%Y}: {written} variação(ões) gravada(s)"
+        ))
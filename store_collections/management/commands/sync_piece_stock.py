@@ -4,7 +4,7 @@ Syncs InventoryPiece stock to linked Pieces
 """
 from django.core.management.base import BaseCommand
 from store_collections.models import Piece
-from store_collections.tiny_erp_sync import TinyERPStockSync
+from store_collections.tiny_erp_sync import SYNC_CHUNK_SIZE, TinyERPStockSync
 import logging
 
 logger = logging.getLogger(__name__)
@@ -89,12 +89,17 @@ class Command(BaseCommand):
         self.stdout.write(f"Found {total} linked pieces to sync")
         success_count = 0
         error_count = 0
+        changes = []
         for i, piece in enumerate(pieces, 1):
             self.stdout.write(f"[{i}/{total}] {piece.collection.name} - {piece.category}")
-            if sync_service.sync_piece_stock(piece):
+            if sync_service.sync_piece_stock(piece, changes=changes):
                 self.stdout.write(self.style.SUCCESS(f"  P={piece.current_stock_p}, M={piece.current_stock_m}, G={piece.current_stock_g}, GG={piece.current_stock_gg}"))
                 success_count += 1
             else:
                 self.stdout.write(self.style.ERROR("  Failed"))
                 error_count += 1
+            # History is written once per chunk of pieces
+            if len(changes) >= SYNC_CHUNK_SIZE:
+                sync_service.record_changes(changes)
+        sync_service.record_changes(changes)
         self.stdout.write(self.style.SUCCESS(f"Stock sync completed: {success_count} success, {error_count} errors"))
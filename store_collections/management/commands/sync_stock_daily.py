@@ -5,7 +5,8 @@ Records stock history for all pieces with movements
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from store_collections.models import Piece
-from store_collections.tiny_erp_sync import TinyERPStockSync
+from store_collections.stock_history import changed_sizes
+from store_collections.tiny_erp_sync import SYNC_CHUNK_SIZE, TinyERPStockSync
 import logging
 
 logger = logging.getLogger(__name__)
@@ -59,6 +60,8 @@ class Command(BaseCommand):
         success_count = 0
         error_count = 0
         movements_count = 0
+        # Stock changes are written to history once per chunk of pieces
+        changes = []
 
         for i, piece in enumerate(linked_pieces, 1):
             try:
@@ -68,17 +71,17 @@ class Command(BaseCommand):
 
                 # Sync with history recording (unless dry-run)
                 record_history = not dry_run
-                success = sync_service.sync_piece_stock(piece, record_history=record_history)
+                pending = len(changes)
+                success = sync_service.sync_piece_stock(piece, record_history=record_history, changes=changes)
 
                 if success:
                     success_count += 1
 
-                    # Count movements in this sync (check if history was created)
+                    # Count the movements of this piece's change (if any)
                     if record_history:
-                        # Get history records created in the last 5 seconds
-                        recent_history = piece.stock_history.filter(
-                            date__gte=timezone.now() - timezone.timedelta(seconds=5)
-                        ).count()
+                        recent_history = sum(
+                            len(changed_sizes(old_stock, new_stock)) for _, old_stock, new_stock in changes[pending:]
+                        )
                         if recent_history > 0:
                             movements_count += recent_history
                             self.stdout.write(
@@ -102,6 +105,29 @@ class Command(BaseCommand):
                     import traceback
                     logger.error(traceback.format_exc())
 
+            # Metrics are refreshed for every variant below, not per chunk
+            if len(changes) >= SYNC_CHUNK_SIZE:
+                sync_service.record_changes(changes, refresh_metrics=False)
+
+        if changes:
+            sync_service.record_changes(changes, refresh_metrics=False)
+
+        # Sales windows move every day, refresh the metrics of every variant
+        if not dry_run:
+            from sales_stats.metrics import refresh_variant_metrics
+            metrics_count = refresh_variant_metrics()
+            self.stdout.write(f"\n📈 Métricas de venda atualizadas: {metrics_count} variações")
+
+            from sales_stats.piece_statistics import refresh_piece_statistics
+            statistics_count = refresh_piece_statistics()
+            self.stdout.write(f"📊 Estatísticas de venda recalculadas: {statistics_count} peça(s)")
+
+            from sales_stats.rollups import refresh_sales_rollups
+            collections_count, fabrics_count = refresh_sales_rollups()
+            self.stdout.write(
+                f"📊 Totais atualizados: {collections_count} coleção(ões), {fabrics_count} tecido(s)"
+            )
+
         # Summary
         end_time = timezone.now()
         duration = (end_time - start_time).total_seconds()
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0009_fabric_price_per_roll'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='piece',
+            name='tiny_parent_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Parent product ID in Tiny ERP', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='piece',
+            name='tiny_variation_id_g',
+            field=models.CharField(blank=True, db_index=True, help_text='Variation ID for size G in Tiny ERP', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='piece',
+            name='tiny_variation_id_gg',
+            field=models.CharField(blank=True, db_index=True, help_text='Variation ID for size GG in Tiny ERP', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='piece',
+            name='tiny_variation_id_m',
+            field=models.CharField(blank=True, db_index=True, help_text='Variation ID for size M in Tiny ERP', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='piece',
+            name='tiny_variation_id_p',
+            field=models.CharField(blank=True, db_index=True, help_text='Variation ID for size P in Tiny ERP', max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_daily_summary(apps, schema_editor):
+    """
+    Build the summary of the existing history (the same pass as
+    stock_history.rebuild_daily_summary), so readers of the rollup do not
+    start from an empty history
+    """
+    StockDailySummary = apps.get_model('store_collections', 'StockDailySummary')
+    StockHistory = apps.get_model('store_collections', 'StockHistory')
+    alias = schema_editor.connection.alias
+
+    rows = StockHistory.objects.using(alias).order_by('piece_id', 'size', 'date', 'created_at').values_list(
+        'piece_id', 'size', 'date', 'movement_type', 'quantity', 'stock_after_movement'
+    )
+    batch = []
+    current_key = None
+    for piece_id, size, date, movement_type, quantity, stock_after in rows.iterator(chunk_size=2000):
+        key = (piece_id, size, timezone.localdate(date))
+        if key != current_key:
+            if len(batch) >= 2000:
+                StockDailySummary.objects.using(alias).bulk_create(batch)
+                batch = []
+            current_key = key
+            batch.append(StockDailySummary(piece_id=piece_id, size=size, day=key[2]))
+
+        summary = batch[-1]
+        if movement_type == 'saida':
+            summary.saidas += quantity
+        else:
+            summary.entradas += quantity
+        summary.closing_stock = stock_after
+
+    StockDailySummary.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0010_alter_piece_tiny_parent_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], max_length=2)),
+                ('day', models.DateField(help_text='Dia das movimentações')),
+                ('entradas', models.PositiveIntegerField(default=0, help_text='Unidades que entraram no dia (entrada + inicial)')),
+                ('saidas', models.PositiveIntegerField(default=0, help_text='Unidades que saíram no dia')),
+                ('closing_stock', models.PositiveIntegerField(default=0, help_text='Estoque ao final do dia')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('piece', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_daily_summaries', to='store_collections.piece')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Estoque',
+                'verbose_name_plural': 'Resumos Diários de Estoque',
+                'ordering': ['-day', 'piece', 'size'],
+                'indexes': [models.Index(fields=['day'], name='store_colle_day_633f4b_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockdailysummary',
+            constraint=models.UniqueConstraint(fields=('piece', 'size', 'day'), name='unique_stock_daily_summary'),
+        ),
+        migrations.RunPython(fill_daily_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,175 @@
+# Converts StockHistory into a PostgreSQL table range-partitioned by month on
+# `date`, with a BRIN index on `date`. Other databases have no BRIN, so the
+# date index is replaced by a B-tree index under the same name, keeping the
+# database in line with the migration state.
+
+import django.contrib.postgres.indexes
+from datetime import date
+from django.db import migrations
+
+TABLE = 'store_collections_stockhistory'
+LEGACY = 'store_collections_stockhistory_legacy'
+SEQUENCE = 'store_collections_stockhistory_part_id_seq'
+PIECE_INDEX = 'store_colle_piece_i_3d550d_idx'
+DATE_INDEX = 'store_colle_date_09e4cd_idx'
+MOVEMENT_INDEX = 'store_colle_movemen_48a744_idx'
+BRIN_INDEX = 'stockhistory_date_brin'
+MONTHS_AHEAD = 3
+
+
+def _month(value, offset=0):
+    index = value.year * 12 + (value.month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _free_primary_key_name(cursor):
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+        [LEGACY]
+    )
+    row = cursor.fetchone()
+    if row:
+        cursor.execute(f'ALTER TABLE "{LEGACY}" RENAME CONSTRAINT "{row[0]}" TO "{LEGACY}_pkey"')
+
+
+def partition_stock_history(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor != 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{MOVEMENT_INDEX}"')
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{DATE_INDEX}"')
+        schema_editor.execute(f'CREATE INDEX "{BRIN_INDEX}" ON "{TABLE}" ("date")')
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(date), MAX(id) FROM "{TABLE}"')
+        min_date, max_id = cursor.fetchone()
+
+        # Keep the old heap aside; its index names must be freed for the new table
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        _free_primary_key_name(cursor)
+        for index in (PIECE_INDEX, DATE_INDEX, MOVEMENT_INDEX):
+            cursor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}"')
+        if max_id:
+            cursor.execute(f"SELECT setval('{SEQUENCE}', %s)", [max_id])
+
+        # The partition key must be part of the primary key
+        cursor.execute(f'''
+            CREATE TABLE "{TABLE}" (
+                "id" bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+                "size" varchar(2) NOT NULL,
+                "quantity" integer NOT NULL CHECK ("quantity" >= 0),
+                "movement_type" varchar(10) NOT NULL,
+                "stock_after_movement" integer NOT NULL CHECK ("stock_after_movement" >= 0),
+                "date" timestamp with time zone NOT NULL,
+                "created_at" timestamp with time zone NOT NULL,
+                "piece_id" bigint NOT NULL
+                    REFERENCES "store_collections_piece" ("id") DEFERRABLE INITIALLY DEFERRED,
+                PRIMARY KEY ("id", "date")
+            ) PARTITION BY RANGE ("date")
+        ''')
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}"."id"')
+
+        # One partition per month from the oldest row up to a few months ahead
+        first = _month(min_date.date() if min_date else date.today())
+        last = _month(date.today(), MONTHS_AHEAD)
+        current = first
+        while current <= last:
+            following = _month(current, 1)
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_y{current.year}m{current.month:02d}" PARTITION OF "{TABLE}" '
+                f"FOR VALUES FROM ('{current.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+            )
+            current = following
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'CREATE INDEX "{PIECE_INDEX}" ON "{TABLE}" ("piece_id", "size", "date")')
+        cursor.execute(f'CREATE INDEX "{BRIN_INDEX}" ON "{TABLE}" USING brin ("date")')
+
+        cursor.execute(f'''
+            INSERT INTO "{TABLE}"
+                ("id", "size", "quantity", "movement_type", "stock_after_movement", "date", "created_at", "piece_id")
+            SELECT "id", "size", "quantity", "movement_type", "stock_after_movement", "date", "created_at", "piece_id"
+            FROM "{LEGACY}"
+            ORDER BY "date"
+        ''')
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+        cursor.execute(f'ANALYZE "{TABLE}"')
+
+
+def unpartition_stock_history(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor != 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{BRIN_INDEX}"')
+        schema_editor.execute(f'CREATE INDEX "{DATE_INDEX}" ON "{TABLE}" ("date")')
+        schema_editor.execute(f'CREATE INDEX "{MOVEMENT_INDEX}" ON "{TABLE}" ("movement_type")')
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        _free_primary_key_name(cursor)
+        cursor.execute(f'DROP INDEX IF EXISTS "{PIECE_INDEX}"')
+        cursor.execute(f'DROP INDEX IF EXISTS "{BRIN_INDEX}"')
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY NONE')
+
+        cursor.execute(f'''
+            CREATE TABLE "{TABLE}" (
+                "id" bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+                "size" varchar(2) NOT NULL,
+                "quantity" integer NOT NULL CHECK ("quantity" >= 0),
+                "movement_type" varchar(10) NOT NULL,
+                "stock_after_movement" integer NOT NULL CHECK ("stock_after_movement" >= 0),
+                "date" timestamp with time zone NOT NULL,
+                "created_at" timestamp with time zone NOT NULL,
+                "piece_id" bigint NOT NULL
+                    REFERENCES "store_collections_piece" ("id") DEFERRABLE INITIALLY DEFERRED
+            )
+        ''')
+        # Indexes first: they cannot be created once deferred FK checks are pending
+        cursor.execute(f'CREATE INDEX "{PIECE_INDEX}" ON "{TABLE}" ("piece_id", "size", "date")')
+        cursor.execute(f'CREATE INDEX "{DATE_INDEX}" ON "{TABLE}" ("date")')
+        cursor.execute(f'CREATE INDEX "{MOVEMENT_INDEX}" ON "{TABLE}" ("movement_type")')
+        cursor.execute(f'''
+            INSERT INTO "{TABLE}"
+                ("id", "size", "quantity", "movement_type", "stock_after_movement", "date", "created_at", "piece_id")
+            SELECT "id", "size", "quantity", "movement_type", "stock_after_movement", "date", "created_at", "piece_id"
+            FROM "{LEGACY}"
+        ''')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f'COALESCE((SELECT MAX("id") FROM "{TABLE}"), 1))'
+        )
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+        cursor.execute(f'DROP SEQUENCE "{SEQUENCE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0011_stockdailysummary_and_more'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='stockhistory',
+                    name='store_colle_date_09e4cd_idx',
+                ),
+                migrations.RemoveIndex(
+                    model_name='stockhistory',
+                    name='store_colle_movemen_48a744_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='stockhistory',
+                    index=django.contrib.postgres.indexes.BrinIndex(fields=['date'], name='stockhistory_date_brin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(partition_stock_history, unpartition_stock_history),
+            ],
+        ),
+    ]
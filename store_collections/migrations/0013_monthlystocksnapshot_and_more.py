@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0012_partition_stockhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyStockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], max_length=2)),
+                ('month', models.DateField(help_text='Primeiro dia do mês do fechamento')),
+                ('stock', models.PositiveIntegerField(default=0, help_text='Estoque no fim do mês')),
+                ('unit_cost', models.DecimalField(decimal_places=2, default=0, help_text='Custo unitário no fechamento', max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fechamento Mensal de Estoque',
+                'verbose_name_plural': 'Fechamentos Mensais de Estoque',
+                'ordering': ['-month', 'piece', 'size'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='stockhistory',
+            name='store_colle_piece_i_3d550d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stockhistory',
+            index=models.Index(fields=['piece', 'size', '-date'], include=('stock_after_movement',), name='stockhistory_asof_idx'),
+        ),
+        migrations.AddField(
+            model_name='monthlystocksnapshot',
+            name='piece',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stock_snapshots', to='store_collections.piece'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlystocksnapshot',
+            index=models.Index(fields=['month'], name='store_colle_month_beee10_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlystocksnapshot',
+            constraint=models.UniqueConstraint(fields=('piece', 'size', 'month'), name='unique_monthly_stock_snapshot'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0013_monthlystocksnapshot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockdailysummary',
+            index=models.Index(fields=['updated_at'], name='store_colle_updated_b57885_idx'),
+        ),
+    ]
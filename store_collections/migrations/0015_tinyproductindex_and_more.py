@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store_collections', '0014_stockdailysummary_store_colle_updated_b57885_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TinyProductIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Produto'), ('variation', 'Variação'), ('sku', 'SKU')], max_length=10)),
+                ('key', models.CharField(help_text='ID ou SKU no Tiny ERP', max_length=100)),
+                ('size', models.CharField(blank=True, choices=[('P', 'P'), ('M', 'M'), ('G', 'G'), ('GG', 'GG')], help_text='Vazio para o produto pai', max_length=2)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('piece', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiny_index_entries', to='store_collections.piece')),
+            ],
+            options={
+                'verbose_name': 'Índice de Produtos Tiny',
+                'verbose_name_plural': 'Índices de Produtos Tiny',
+                'ordering': ['kind', 'key'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tinyproductindex',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='unique_tiny_product_index'),
+        ),
+    ]
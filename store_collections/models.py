@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from business_settings.models import Supplier, PieceCategory
 
@@ -111,30 +112,35 @@ class Piece(models.Model):
         max_length=100,
         null=True,
         blank=True,
+        db_index=True,
         help_text="Parent product ID in Tiny ERP"
     )
     tiny_variation_id_p = models.CharField(
         max_length=100,
         null=True,
         blank=True,
+        db_index=True,
         help_text="Variation ID for size P in Tiny ERP"
     )
     tiny_variation_id_m = models.CharField(
         max_length=100,
         null=True,
         blank=True,
+        db_index=True,
         help_text="Variation ID for size M in Tiny ERP"
     )
     tiny_variation_id_g = models.CharField(
         max_length=100,
         null=True,
         blank=True,
+        db_index=True,
         help_text="Variation ID for size G in Tiny ERP"
     )
     tiny_variation_id_gg = models.CharField(
         max_length=100,
         null=True,
         blank=True,
+        db_index=True,
         help_text="Variation ID for size GG in Tiny ERP"
     )
 
@@ -245,13 +251,111 @@ class StockHistory(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        # On PostgreSQL the table is range-partitioned by month on `date`
+        # (migration 0012); BRIN suits the append-only, time-ordered inserts
         indexes = [
-            models.Index(fields=['piece', 'size', 'date']),
-            models.Index(fields=['date']),
-            models.Index(fields=['movement_type']),
+            # Covers "latest movement per variant up to a date" (point-in-time stock)
+            models.Index(
+                fields=['piece', 'size', '-date'],
+                include=['stock_after_movement'],
+                name='stockhistory_asof_idx'
+            ),
+            BrinIndex(fields=['date'], name='stockhistory_date_brin'),
         ]
         verbose_name = "Histórico de Estoque"
         verbose_name_plural = "Históricos de Estoque"
 
     def __str__(self):
         return f"{self.piece.name} ({self.size}) - {self.movement_type} {self.quantity} em {self.date.strftime('%d/%m/%Y')}"
+
+
+class StockDailySummary(models.Model):
+    """
+    Daily rollup of StockHistory per piece and size
+    Maintained in the same transaction as history writes, so analytics read
+    one row per variant per day instead of every movement
+    """
+    SIZE_CHOICES = StockHistory.SIZE_CHOICES
+
+    piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name='stock_daily_summaries')
+    size = models.CharField(max_length=2, choices=SIZE_CHOICES)
+    day = models.DateField(help_text="Dia das movimentações")
+    entradas = models.PositiveIntegerField(default=0, help_text="Unidades que entraram no dia (entrada + inicial)")
+    saidas = models.PositiveIntegerField(default=0, help_text="Unidades que saíram no dia")
+    closing_stock = models.PositiveIntegerField(default=0, help_text="Estoque ao final do dia")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day', 'piece', 'size']
+        constraints = [
+            models.UniqueConstraint(fields=['piece', 'size', 'day'], name='unique_stock_daily_summary'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+            # Pieces touched since the last statistics refresh
+            models.Index(fields=['updated_at']),
+        ]
+        verbose_name = "Resumo Diário de Estoque"
+        verbose_name_plural = "Resumos Diários de Estoque"
+
+    def __str__(self):
+        return f"{self.piece.name} ({self.size}) - {self.day.strftime('%d/%m/%Y')}: +{self.entradas} -{self.saidas}"
+
+
+class MonthlyStockSnapshot(models.Model):
+    """
+    Stock per piece and size at the end of a month
+    Optional shortcut for point-in-time queries and month-end valuation
+    """
+    SIZE_CHOICES = StockHistory.SIZE_CHOICES
+
+    piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name='monthly_stock_snapshots')
+    size = models.CharField(max_length=2, choices=SIZE_CHOICES)
+    month = models.DateField(help_text="Primeiro dia do mês do fechamento")
+    stock = models.PositiveIntegerField(default=0, help_text="Estoque no fim do mês")
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Custo unitário no fechamento")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', 'piece', 'size']
+        constraints = [
+            models.UniqueConstraint(fields=['piece', 'size', 'month'], name='unique_monthly_stock_snapshot'),
+        ]
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+        verbose_name = "Fechamento Mensal de Estoque"
+        verbose_name_plural = "Fechamentos Mensais de Estoque"
+
+    def __str__(self):
+        return f"{self.piece.name} ({self.size}) - {self.month.strftime('%m/%Y')}: {self.stock}"
+
+
+class TinyProductIndex(models.Model):
+    """
+    Resolution index from Tiny ERP identifiers to a piece and size
+    Product and variation entries are rebuilt from the tiny_* fields of the
+    pieces; SKU entries are learned from sales resolved by product ID
+    """
+    KIND_CHOICES = [
+        ('product', 'Produto'),
+        ('variation', 'Variação'),
+        ('sku', 'SKU'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=100, help_text="ID ou SKU no Tiny ERP")
+    piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name='tiny_index_entries')
+    size = models.CharField(max_length=2, choices=Piece.SIZE_CHOICES, blank=True, help_text="Vazio para o produto pai")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['kind', 'key']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='unique_tiny_product_index'),
+        ]
+        verbose_name = "Índice de Produtos Tiny"
+        verbose_name_plural = "Índices de Produtos Tiny"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.key} → {self.piece.name} {self.size}".strip()
@@ -0,0 +1,106 @@
+"""
+Monthly range partitions for StockHistory (PostgreSQL only)
+The table is partitioned by month on `date` (see migration 0012); partitions
+must exist before rows for that month arrive, otherwise they land in the
+DEFAULT partition (and are moved out when the month's partition is created)
+"""
+import logging
+from datetime import date
+from django.db import connection as default_connection
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = 'store_collections_stockhistory'
+DEFAULT_PARTITION = f'{TABLE_NAME}_default'
+
+COLUMNS = '"id", "size", "quantity", "movement_type", "stock_after_movement", "date", "created_at", "piece_id"'
+
+
+def month_start(value, offset=0):
+    """First day of the month of `value`, shifted by `offset` months"""
+    month_index = value.year * 12 + (value.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(start):
+    """Partition table name for the month starting at `start`"""
+    return f"{TABLE_NAME}_y{start.year}m{start.month:02d}"
+
+
+def is_partitioned(connection=None):
+    """Whether StockHistory is a partitioned table in this database"""
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE_NAME])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def create_month_partition(cursor, start):
+    """
+    Create the partition for the month starting at `start` if missing
+    Rows of that month already in the DEFAULT partition (e.g. after a missed
+    run) would make the CREATE fail, so DEFAULT is detached, the partition
+    created, the rows moved into it and DEFAULT attached again, in one
+    transaction
+
+    Returns:
+        int: Rows moved out of the DEFAULT partition
+    """
+    name = partition_name(start)
+    cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+    if cursor.fetchone():
+        return 0
+
+    first, end = f"'{start.isoformat()} 00:00:00+00'", f"'{month_start(start, 1).isoformat()} 00:00:00+00'"
+    bounds = f"FROM ({first}) TO ({end})"
+    in_month = f'"date" >= {first} AND "date" < {end}'
+
+    cursor.execute(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE {in_month} LIMIT 1')
+    if not cursor.fetchone():
+        cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{TABLE_NAME}" FOR VALUES {bounds}')
+        return 0
+
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{TABLE_NAME}" FOR VALUES {bounds}')
+        cursor.execute(
+            f'INSERT INTO "{name}" ({COLUMNS}) SELECT {COLUMNS} FROM "{DEFAULT_PARTITION}" WHERE {in_month}'
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE {in_month}')
+        cursor.execute(f'ALTER TABLE "{TABLE_NAME}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+
+    logger.warning(f"Moved {moved} StockHistory rows from the DEFAULT partition into {name}")
+    return moved
+
+
+def ensure_stock_history_partitions(months_ahead=3, connection=None):
+    """
+    Create the monthly partitions from the current month up to `months_ahead`
+    months in the future
+
+    Returns:
+        list: Names of the partitions checked/created (empty if not partitioned)
+    """
+    connection = connection or default_connection
+    if not is_partitioned(connection):
+        logger.info("StockHistory is not partitioned, nothing to do")
+        return []
+
+    current = month_start(timezone.now().date())
+    names = []
+
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = month_start(current, offset)
+            create_month_partition(cursor, start)
+            names.append(partition_name(start))
+
+    logger.info(f"StockHistory partitions ensured: {', '.join(names)}")
+    return names
@@ -2,7 +2,7 @@ from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
-from .models import Collection, Piece, StockHistory
+from .models import Collection, Piece
 from calendar_app.models import CalendarEvent
 
 
@@ -130,6 +130,7 @@ def piece_saved(sender, instance, created, **kwargs):
     # Import here to avoid circular imports
     from sales_stats.models import PieceSalesStatistics, CollectionSalesStatistics
     from .tiny_erp_sync import TinyERPStockSync
+    from .tiny_index import index_pieces
 
     # Get the fields that were updated
     update_fields = kwargs.get('update_fields')
@@ -139,6 +140,10 @@ def piece_saved(sender, instance, created, **kwargs):
     stock_sync_fields = {'current_stock_p', 'current_stock_m', 'current_stock_g', 'current_stock_gg', 'stock_last_synced'}
     is_stock_sync_update = update_fields is not None and set(update_fields) == stock_sync_fields
 
+    # Keep the Tiny resolution index in step with the tiny_* fields
+    if not is_stock_sync_update:
+        index_pieces([instance])
+
     if instance.tiny_parent_id and not is_stock_sync_update:
         # Sync immediately after linking or when piece is updated
         sync_service = TinyERPStockSync()
@@ -171,15 +176,3 @@ def piece_saved(sender, instance, created, **kwargs):
         collection_stats.total_pieces_in_collection = pieces_count
         collection_stats.save()
 
-
-@receiver(post_save, sender=StockHistory)
-def stock_history_saved(sender, instance, created, **kwargs):
-    """
-    Triggered when a StockHistory entry is saved.
-    Changes piece launch_status from 'em_lancamento' to 'lancada' when there's a stock entry.
-    """
-    if created and instance.movement_type == 'entrada':
-        piece = instance.piece
-        if piece.launch_status == 'em_lancamento':
-            piece.launch_status = 'lancada'
-            piece.save(update_fields=['launch_status'])
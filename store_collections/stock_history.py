@@ -0,0 +1,285 @@
+"""
+Stock history recording shared by every stock writer
+(daily/piece sync, Tiny ERP webhook)
+Keeps the StockDailySummary rollup and the pieces launch status in step
+with StockHistory
+"""
+import logging
+from datetime import datetime, time
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+
+def movement_type_for(old_value, new_value):
+    """
+    Classify a stock change
+
+    Returns:
+        str: 'inicial', 'entrada' or 'saida'
+    """
+    if old_value == 0 and new_value > 0:
+        return 'inicial'
+    if new_value > old_value:
+        return 'entrada'
+    return 'saida'
+
+
+def changed_sizes(old_stock, new_stock):
+    """Sizes of `new_stock` whose value differs from `old_stock`"""
+    return [size for size in SIZES if size in new_stock and old_stock[size] != new_stock[size]]
+
+
+def record_stock_history(piece, old_stock, new_stock, date=None):
+    """
+    Record stock changes in history and in the daily rollup
+    Only creates records when there is actual stock change
+
+    Args:
+        piece: Piece object
+        old_stock: Dict with old stock values {'P': 10, 'M': 20, ...}
+        new_stock: Dict with new stock values {'P': 8, 'M': 22, ...}
+        date: Movement date (default now)
+
+    Returns:
+        list: Created StockHistory records
+    """
+    return record_stock_history_bulk([(piece, old_stock, new_stock)], date=date)
+
+
+def record_stock_history_bulk(changes, date=None, refresh_metrics=True):
+    """
+    Record the stock changes of several pieces at once
+    Rows are inserted with bulk_create (no per-row signals), then the daily
+    rollup and the launch status of the affected pieces are updated; their
+    VariantSalesMetrics are refreshed once the transaction commits
+
+    Args:
+        changes: Iterable of (piece, old_stock, new_stock) tuples
+        date: Movement date (default now)
+        refresh_metrics: Refresh the metrics of the affected pieces on commit;
+            bulk syncs pass False and refresh once when they finish
+
+    Returns:
+        list: Created StockHistory records
+    """
+    from .models import StockHistory
+
+    date = date or timezone.now()
+    records = []
+    pieces = {}
+
+    for piece, old_stock, new_stock in changes:
+        # Only record sizes that changed
+        for size in changed_sizes(old_stock, new_stock):
+            old_value = old_stock[size]
+            new_value = new_stock[size]
+            difference = new_value - old_value
+            movement_type = movement_type_for(old_value, new_value)
+
+            records.append(StockHistory(
+                piece=piece,
+                size=size,
+                quantity=abs(difference),
+                movement_type=movement_type,
+                stock_after_movement=new_value,
+                date=date
+            ))
+            pieces[piece.pk] = piece
+
+            logger.info(
+                f"Stock history recorded: {piece.name} ({size}) - "
+                f"{movement_type} {abs(difference)} units, stock after: {new_value}"
+            )
+
+    if not records:
+        return records
+
+    with transaction.atomic():
+        StockHistory.objects.bulk_create(records)
+        update_daily_summaries(records)
+
+        promoted = promote_launched_pieces(
+            {record.piece_id for record in records if record.movement_type == 'entrada'}
+        )
+
+    # Keep the caller's instances in step with the UPDATE
+    for piece_id in promoted:
+        pieces[piece_id].launch_status = 'lancada'
+
+    if refresh_metrics:
+        transaction.on_commit(lambda: _refresh_metrics(list(pieces)), robust=True)
+
+    return records
+
+
+def _refresh_metrics(piece_ids):
+    from sales_stats.metrics import refresh_variant_metrics
+
+    refresh_variant_metrics(piece_ids)
+
+
+def promote_launched_pieces(piece_ids=None):
+    """
+    Move pieces still 'em_lancamento' to 'lancada' once they had a stock entry
+    Single UPDATE, no Piece signals (and so no Tiny ERP sync) are triggered
+
+    Args:
+        piece_ids: Pieces that just received an 'entrada' movement
+            (default: every piece with an 'entrada' in history)
+
+    Returns:
+        list: IDs of the promoted pieces
+    """
+    from .models import Piece, StockHistory
+
+    pending = Piece.objects.filter(launch_status='em_lancamento')
+    if piece_ids is None:
+        pending = pending.filter(pk__in=StockHistory.objects.filter(
+            movement_type='entrada'
+        ).values('piece_id'))
+    elif not piece_ids:
+        return []
+    else:
+        pending = pending.filter(pk__in=piece_ids)
+
+    promoted = list(pending.values_list('pk', flat=True))
+    if promoted:
+        pending.filter(pk__in=promoted).update(launch_status='lancada', updated_at=timezone.now())
+        logger.info(f"Launch status set to 'lancada' for {len(promoted)} piece(s)")
+
+    return promoted
+
+
+def update_daily_summary(record):
+    """
+    Add one StockHistory record to its StockDailySummary row
+    Must run in the same transaction as the history write
+
+    Args:
+        record: StockHistory object just created
+    """
+    update_daily_summaries([record])
+
+
+def update_daily_summaries(records):
+    """
+    Add StockHistory records to their StockDailySummary rows
+    Missing rows are bulk-created, then every row is locked, incremented in
+    memory and bulk-updated: a constant number of queries per batch.
+    Must run in the same transaction as the history write
+
+    Args:
+        records: StockHistory objects just created, in movement order
+    """
+    from .models import StockDailySummary
+
+    totals = {}
+    for record in records:
+        key = (record.piece_id, record.size, timezone.localdate(record.date))
+        entradas, saidas, _ = totals.get(key, (0, 0, 0))
+        if record.movement_type == 'saida':
+            saidas += record.quantity
+        else:
+            entradas += record.quantity
+        totals[key] = (entradas, saidas, record.stock_after_movement)
+
+    if not totals:
+        return
+
+    StockDailySummary.objects.bulk_create(
+        [StockDailySummary(piece_id=piece_id, size=size, day=day) for piece_id, size, day in totals],
+        ignore_conflicts=True,
+    )
+
+    summaries = StockDailySummary.objects.select_for_update().filter(
+        piece_id__in={key[0] for key in totals},
+        day__in={key[2] for key in totals},
+    )
+    now = timezone.now()
+    changed = []
+    for summary in summaries:
+        key = (summary.piece_id, summary.size, summary.day)
+        if key not in totals:
+            continue
+        entradas, saidas, closing_stock = totals[key]
+        summary.entradas += entradas
+        summary.saidas += saidas
+        summary.closing_stock = closing_stock
+        summary.updated_at = now
+        changed.append(summary)
+
+    StockDailySummary.objects.bulk_update(
+        changed, ['entradas', 'saidas', 'closing_stock', 'updated_at'], batch_size=1000
+    )
+
+
+def rebuild_daily_summary(since=None, batch_size=2000):
+    """
+    Rebuild StockDailySummary from StockHistory
+    Streams history ordered by piece, size and date, so memory stays flat
+
+    Args:
+        since: Only rebuild days from this date on (default: from the oldest
+            live history row, days whose history was archived are kept)
+        batch_size: Rows per bulk insert
+
+    Returns:
+        int: Number of summary rows written
+    """
+    from django.db.models import Min
+    from .models import StockDailySummary, StockHistory
+
+    if since is None:
+        oldest = StockHistory.objects.aggregate(oldest=Min('date'))['oldest']
+        since = timezone.localdate(oldest) if oldest else None
+
+    history = StockHistory.objects.all()
+    summaries = StockDailySummary.objects.all()
+    if since:
+        summaries = summaries.filter(day__gte=since)
+        history = history.filter(date__gte=timezone.make_aware(datetime.combine(since, time.min)))
+
+    rows = history.order_by('piece_id', 'size', 'date', 'created_at').values_list(
+        'piece_id', 'size', 'date', 'movement_type', 'quantity', 'stock_after_movement'
+    )
+
+    written = 0
+    batch = []
+    current_key = None
+
+    with transaction.atomic():
+        summaries.delete()
+
+        for piece_id, size, date, movement_type, quantity, stock_after in rows.iterator(chunk_size=batch_size):
+            key = (piece_id, size, timezone.localdate(date))
+
+            if key != current_key:
+                # The previous day is complete, flush when the batch is full
+                if len(batch) >= batch_size:
+                    StockDailySummary.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+
+                current_key = key
+                batch.append(StockDailySummary(piece_id=piece_id, size=size, day=key[2]))
+
+            summary = batch[-1]
+            if movement_type == 'saida':
+                summary.saidas += quantity
+            else:
+                summary.entradas += quantity
+            summary.closing_stock = stock_after
+
+        StockDailySummary.objects.bulk_create(batch)
+        written += len(batch)
+
+    # Sales totals changed without a stock sync
+    from sales_stats.replenishment_runs import invalidate_replenishment_runs
+    invalidate_replenishment_runs()
+
+    logger.info(f"Stock daily summary rebuilt: {written} rows")
+    return written
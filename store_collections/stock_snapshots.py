@@ -0,0 +1,203 @@
+"""
+Point-in-time stock reconstruction
+Answers "what was the stock per piece and size at moment X" with one query
+over StockHistory, optionally starting from a MonthlyStockSnapshot
+"""
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def month_end(month):
+    """Last instant (aware, local time) of the month starting at `month`"""
+    following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(datetime.combine(following, time.min)) - timedelta(microseconds=1)
+
+
+def latest_movements(until, since=None):
+    """
+    Latest StockHistory row per (piece, size) up to `until`
+
+    Uses DISTINCT ON on PostgreSQL (served by stockhistory_asof_idx) and a
+    ROW_NUMBER() window elsewhere
+
+    Args:
+        until: Aware datetime (inclusive)
+        since: Only consider movements after this datetime (exclusive)
+
+    Returns:
+        dict: {(piece_id, size): (stock_after_movement, date)}
+    """
+    from .models import StockHistory
+
+    history = StockHistory.objects.filter(date__lte=until)
+    if since is not None:
+        history = history.filter(date__gt=since)
+
+    if connection.vendor == 'postgresql':
+        rows = history.order_by('piece_id', 'size', '-date', '-created_at').distinct('piece_id', 'size')
+    else:
+        rows = history.annotate(row_number=Window(
+            RowNumber(),
+            partition_by=[F('piece_id'), F('size')],
+            order_by=[F('date').desc(), F('created_at').desc()],
+        )).filter(row_number=1)
+
+    return {
+        (piece_id, size): (stock, date)
+        for piece_id, size, stock, date in rows.values_list('piece_id', 'size', 'stock_after_movement', 'date')
+    }
+
+
+def latest_snapshot_month(moment):
+    """
+    Most recent MonthlyStockSnapshot month whose month end is not after `moment`
+
+    Returns:
+        date or None
+    """
+    from .models import MonthlyStockSnapshot
+
+    current_month = timezone.localtime(moment).date().replace(day=1)
+    if moment < month_end(current_month):
+        current_month = (current_month - timedelta(days=1)).replace(day=1)
+
+    return MonthlyStockSnapshot.objects.filter(
+        month__lte=current_month
+    ).order_by('-month').values_list('month', flat=True).first()
+
+
+def stock_as_of(moment, use_snapshots=True):
+    """
+    Stock of every variant with history at `moment`
+
+    When a monthly snapshot exists before `moment`, only movements after that
+    month end are scanned and the snapshot fills in the untouched variants
+
+    Args:
+        moment: Aware datetime
+        use_snapshots: Start from the latest MonthlyStockSnapshot (default True)
+
+    Returns:
+        dict: {(piece_id, size): stock}
+    """
+    from .models import MonthlyStockSnapshot
+
+    stock = {}
+    since = None
+
+    snapshot_month = latest_snapshot_month(moment) if use_snapshots else None
+    if snapshot_month:
+        since = month_end(snapshot_month)
+        stock = {
+            (piece_id, size): value
+            for piece_id, size, value in MonthlyStockSnapshot.objects.filter(
+                month=snapshot_month
+            ).values_list('piece_id', 'size', 'stock')
+        }
+
+    if since is None or moment > since:
+        for key, (value, date) in latest_movements(moment, since=since).items():
+            stock[key] = value
+
+    return stock
+
+
+def inventory_valuation(moment, use_snapshots=True):
+    """
+    Stock and value (stock x unit cost) per variant at `moment`
+    A month end with a snapshot is read from the snapshot alone, valued at
+    the cost stored when the month was closed
+
+    Returns:
+        dict: {'variants': [...], 'total_units': int, 'total_value': Decimal, 'from_snapshot': bool}
+    """
+    from .models import MonthlyStockSnapshot, Piece
+
+    snapshot_month = latest_snapshot_month(moment) if use_snapshots else None
+
+    if snapshot_month and month_end(snapshot_month) == moment:
+        rows = [
+            (snapshot.piece_id, snapshot.piece.name, snapshot.size, snapshot.stock, snapshot.unit_cost)
+            for snapshot in MonthlyStockSnapshot.objects.filter(month=snapshot_month).select_related('piece')
+        ]
+        from_snapshot = True
+    else:
+        stock = stock_as_of(moment, use_snapshots=use_snapshots)
+        pieces = Piece.objects.in_bulk({piece_id for piece_id, size in stock})
+        rows = [
+            (piece_id, pieces[piece_id].name, size, value, pieces[piece_id].total_cost)
+            for (piece_id, size), value in stock.items()
+            if piece_id in pieces
+        ]
+        from_snapshot = False
+
+    variants = []
+    total_units = 0
+    total_value = Decimal('0')
+
+    for piece_id, piece_name, size, value, unit_cost in sorted(rows):
+        variant_value = unit_cost * value
+        total_units += value
+        total_value += variant_value
+        variants.append({
+            'piece_id': piece_id,
+            'piece_name': piece_name,
+            'size': size,
+            'stock': value,
+            'unit_cost': unit_cost,
+            'value': variant_value,
+        })
+
+    return {
+        'variants': variants,
+        'total_units': total_units,
+        'total_value': total_value,
+        'from_snapshot': from_snapshot,
+    }
+
+
+def take_monthly_snapshot(month):
+    """
+    Store the stock of every variant at the end of `month`
+
+    Args:
+        month: Any date within the month to close
+
+    Returns:
+        int: Number of snapshot rows written
+    """
+    from .models import MonthlyStockSnapshot, Piece
+
+    month = month.replace(day=1)
+
+    with transaction.atomic():
+        # Drop a previous close of this month so it is rebuilt from history
+        MonthlyStockSnapshot.objects.filter(month=month).delete()
+
+        stock = stock_as_of(month_end(month))
+        costs = dict(Piece.objects.filter(
+            pk__in={piece_id for piece_id, size in stock}
+        ).values_list('pk', 'total_cost'))
+
+        snapshots = [
+            MonthlyStockSnapshot(
+                piece_id=piece_id,
+                size=size,
+                month=month,
+                stock=value,
+                unit_cost=costs[piece_id],
+            )
+            for (piece_id, size), value in stock.items()
+            if piece_id in costs
+        ]
+        MonthlyStockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+    logger.info(f"Monthly stock snapshot {month:%m/%Y}: {len(snapshots)} variants")
+    return len(snapshots)
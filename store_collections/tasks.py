@@ -28,3 +28,60 @@ def sync_stock_daily_task(self):
         logger.error(f"Error in daily stock synchronization: {exc}")
         # Retry after 5 minutes if failed
         raise self.retry(exc=exc, countdown=300)
+
+
+@shared_task(bind=True, max_retries=3)
+def verify_variation_stock_task(self, variation_id):
+    """
+    Verification fetch queued after a Tiny ERP stock webhook
+    Re-reads the variation balance from the API and corrects it if the
+    notification was out of order or lost an intermediate change
+    """
+    from .tiny_search import TinyERPSearch
+    from .tiny_webhook import apply_variation_stock, find_piece_by_variation
+
+    try:
+        piece, size = find_piece_by_variation(variation_id)
+        if piece is None:
+            return "Variation not linked"
+
+        balance = TinyERPSearch().get_variation_stock(variation_id, default=None)
+        if balance is None:
+            raise RuntimeError("Could not fetch variation stock from Tiny ERP")
+
+        if balance != getattr(piece, f'current_stock_{size.lower()}'):
+            logger.warning(f"Webhook stock mismatch for variation {variation_id}, correcting to {balance}")
+            apply_variation_stock(variation_id, balance, verify=False)
+            return "Stock corrected"
+
+        return "Stock verified"
+
+    except Exception as exc:
+        logger.error(f"Error verifying variation {variation_id} stock: {exc}")
+        raise self.retry(exc=exc, countdown=60)
+
+
+@shared_task
+def create_stock_partitions_task():
+    """
+    Monthly task that creates the upcoming StockHistory partitions
+    so new movements never fall into the DEFAULT partition
+    """
+    from .partitions import ensure_stock_history_partitions
+
+    names = ensure_stock_history_partitions(months_ahead=3)
+    return f"{len(names)} partitions ensured"
+
+
+@shared_task
+def snapshot_monthly_stock_task():
+    """
+    Monthly task that stores the previous month-end stock per variant
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from .stock_snapshots import take_monthly_snapshot
+
+    month = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+    written = take_monthly_snapshot(month)
+    return f"{written} variants stored for {month:%m/%Y}"
@@ -1,3 +1,180 @@
-from django.test import TestCase
+"""
+Database tests of the Tiny ERP stock webhook and the Tiny resolution index
+Tiny IDs are set with queryset updates, so saving a piece never calls the API
+"""
+import json
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from business_settings.models import PieceCategory, Supplier
+from .models import Collection, Fabric, Piece, StockHistory, TinyProductIndex
+from .tiny_index import TinyIndexResolver, index_pieces, rebuild_tiny_index
 
-# Create your tests here.
+
+def create_pieces(count, **fields):
+    """
+    `count` launched pieces of one collection, category and fabric
+    Piece i is named 'Peca i' with 5 units of every size
+    """
+    supplier = Supplier.objects.create(name='Fornecedor', delivery_time_days=10)
+    category = PieceCategory.objects.create(name='Vestido', production_cost_per_piece=Decimal('12.50'))
+    fabric = Fabric.objects.create(
+        name='Linho', color='Areia', supplier=supplier,
+        roll_weight_kg=Decimal('20'), yield_area_per_kg=Decimal('3.5'), price_per_roll=Decimal('400'),
+    )
+    collection = Collection.objects.create(
+        name='Verão', modeling_time=5, pilot_piece_time=5, test_piece_time=5,
+        production_time=20, preparation_time=3, transportation_time=4,
+    )
+
+    values = dict(
+        collection=collection, category=category, fabric=fabric, launch_status='lancada',
+        sale_price=Decimal('150'), total_cost=Decimal('60'),
+        fabric_consumption_p=Decimal('1.2'), fabric_consumption_m=Decimal('1.4'),
+        fabric_consumption_g=Decimal('1.6'), fabric_consumption_gg=Decimal('1.8'),
+        initial_quantity_p=5, initial_quantity_m=5, initial_quantity_g=5, initial_quantity_gg=5,
+        current_stock_p=5, current_stock_m=5, current_stock_g=5, current_stock_gg=5,
+    )
+    values.update(fields)
+    return [Piece.objects.create(name=f'Peca {i}', **values) for i in range(count)]
+
+
+def link_to_tiny(piece, parent_id, **variation_ids):
+    """Set the Tiny IDs of `piece` (e.g. p='201') without triggering a sync"""
+    Piece.objects.filter(pk=piece.pk).update(
+        tiny_parent_id=parent_id,
+        **{f'tiny_variation_id_{size}': variation_id for size, variation_id in variation_ids.items()},
+    )
+    piece.refresh_from_db()
+
+
+@override_settings(TINY_WEBHOOK_TOKEN='segredo', TINY_WEBHOOK_VERIFY=False)
+class TinyStockWebhookTests(TestCase):
+    def setUp(self):
+        self.piece, = create_pieces(1)
+        link_to_tiny(self.piece, '100', p='201', m='202')
+        self.payload = json.dumps({'tipo': 'estoque', 'dados': {'idProduto': '202', 'saldo': 2}})
+
+    def post(self, query=''):
+        return self.client.post(
+            reverse('store_collections:tiny_stock_webhook') + query, self.payload, content_type='application/json'
+        )
+
+    def assertStockUnchanged(self):
+        self.piece.refresh_from_db()
+        self.assertEqual(self.piece.current_stock_m, 5)
+        self.assertFalse(StockHistory.objects.exists())
+
+    def test_missing_token_is_rejected(self):
+        response = self.post()
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'success': False, 'error': 'Token inválido'})
+        self.assertStockUnchanged()
+
+    def test_wrong_token_is_rejected(self):
+        self.assertEqual(self.post('?token=errado').status_code, 403)
+        self.assertStockUnchanged()
+
+    def test_logged_in_user_still_needs_the_token(self):
+        self.client.force_login(User.objects.create_user('loja', password='senha'))
+
+        self.assertEqual(self.post('?token=errado').status_code, 403)
+        self.assertStockUnchanged()
+
+    @override_settings(TINY_WEBHOOK_TOKEN='')
+    def test_every_request_is_rejected_without_a_configured_token(self):
+        self.assertEqual(self.post('?token=').status_code, 403)
+        self.assertStockUnchanged()
+
+    def test_valid_token_applies_the_balance(self):
+        response = self.post('?token=segredo')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'success': True, 'applied': True, 'piece_id': self.piece.pk, 'size': 'M', 'changed': True,
+        })
+        self.piece.refresh_from_db()
+        self.assertEqual(self.piece.current_stock_m, 2)
+        history = StockHistory.objects.get()
+        self.assertEqual((history.size, history.movement_type, history.quantity), ('M', 'saida', 3))
+
+    def test_unknown_variation_is_acknowledged(self):
+        self.payload = json.dumps({'tipo': 'estoque', 'dados': {'idProduto': '999', 'saldo': 2}})
+        response = self.post('?token=segredo')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['applied'])
+        self.assertStockUnchanged()
+
+
+class TinyIndexTests(TestCase):
+    def setUp(self):
+        self.first, self.second = create_pieces(2)
+        link_to_tiny(self.first, '100', p='201', m='202')
+        link_to_tiny(self.second, '110', p='211')
+        rebuild_tiny_index()
+
+    def entries(self, kind):
+        return dict(
+            (key, (piece_id, size))
+            for key, piece_id, size in TinyProductIndex.objects.filter(kind=kind).values_list('key', 'piece_id', 'size')
+        )
+
+    def test_rebuild_indexes_products_and_variations(self):
+        self.assertEqual(self.entries('product'), {'100': (self.first.pk, ''), '110': (self.second.pk, '')})
+        self.assertEqual(self.entries('variation'), {
+            '201': (self.first.pk, 'P'), '202': (self.first.pk, 'M'), '211': (self.second.pk, 'P'),
+        })
+
+    def test_skus_are_learned_from_lines_resolved_by_id(self):
+        resolver = TinyIndexResolver()
+        self.assertEqual(resolver.resolve('202', 'VES-M'), (self.first.pk, 'M'))
+        self.assertEqual(resolver.save_learned(), 1)
+
+        # A later line carrying only the SKU
+        self.assertEqual(TinyIndexResolver().resolve('', 'VES-M'), (self.first.pk, 'M'))
+
+    def test_learned_sku_is_corrected_by_a_later_id_match(self):
+        resolver = TinyIndexResolver()
+        resolver.resolve('202', 'VES')
+        resolver.save_learned()
+
+        resolver = TinyIndexResolver()
+        self.assertEqual(resolver.resolve('211', 'VES'), (self.second.pk, 'P'))
+        resolver.save_learned()
+
+        self.assertEqual(self.entries('sku'), {'VES': (self.second.pk, 'P')})
+
+    def test_name_is_the_last_resort(self):
+        resolver = TinyIndexResolver()
+
+        self.assertEqual(resolver.resolve('', '', '  peca 1 '), (self.second.pk, ''))
+        self.assertEqual(resolver.resolve('999', 'DESCONHECIDO', 'Outra'), (None, ''))
+
+    def test_skus_of_an_unlinked_variation_are_pruned(self):
+        resolver = TinyIndexResolver()
+        resolver.resolve('201', 'VES-P')
+        resolver.resolve('202', 'VES-M')
+        resolver.save_learned()
+
+        Piece.objects.filter(pk=self.first.pk).update(tiny_variation_id_m=None)
+        index_pieces([self.first])
+
+        self.assertEqual(self.entries('sku'), {'VES-P': (self.first.pk, 'P')})
+        self.assertNotIn('202', self.entries('variation'))
+
+    def test_rebuild_drops_the_entries_of_unlinked_pieces(self):
+        resolver = TinyIndexResolver()
+        resolver.resolve('201', 'VES-P')
+        resolver.resolve('211', 'SAI-P')
+        resolver.save_learned()
+
+        Piece.objects.filter(pk=self.first.pk).update(
+            tiny_parent_id=None, tiny_variation_id_p=None, tiny_variation_id_m=None
+        )
+        rebuild_tiny_index()
+
+        self.assertFalse(TinyProductIndex.objects.filter(piece=self.first).exists())
+        self.assertEqual(self.entries('sku'), {'SAI-P': (self.second.pk, 'P')})
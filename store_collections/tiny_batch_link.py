@@ -0,0 +1,255 @@
+"""
+Batch linking of Collection Pieces to Tiny ERP products
+Pulls the Tiny catalog once, matches unlinked pieces by name/SKU similarity
+and links them in bulk, fetching product details and stock concurrently
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+
+def normalize_text(value):
+    """Lowercase, strip accents and collapse non-alphanumeric characters"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', value.lower()))
+
+
+class TinyCatalogIndex:
+    """
+    In-memory index of the Tiny ERP catalog
+    Exact normalized names resolve directly (to every product with that name);
+    other names are compared only against products sharing at least one token
+    with them
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.by_name = defaultdict(list)
+        self.by_token = defaultdict(set)
+
+        for position, product in enumerate(products):
+            name = normalize_text(product['name'])
+            product['_name'] = name
+            product['_sku'] = normalize_text(product['sku']).replace(' ', '')
+            self.by_name[name].append(position)
+            for token in name.split():
+                self.by_token[token].add(position)
+            for token in normalize_text(product['sku']).split():
+                self.by_token[token].add(position)
+
+    def score(self, name, product):
+        """Similarity between a normalized piece name and a catalog product (0 to 1)"""
+        name_score = SequenceMatcher(None, name, product['_name']).ratio()
+        sku_score = 0
+        if product['_sku']:
+            sku_score = SequenceMatcher(None, name.replace(' ', ''), product['_sku']).ratio()
+        return max(name_score, 0.8 * name_score + 0.2 * sku_score)
+
+    def candidates(self, piece_name):
+        """
+        Return catalog products ranked by similarity to a piece name
+
+        Returns:
+            list: [(score, product), ...] best first
+        """
+        name = normalize_text(piece_name)
+        if not name:
+            return []
+
+        if name in self.by_name:
+            return [(1.0, self.products[position]) for position in self.by_name[name]]
+
+        positions = set()
+        for token in name.split():
+            positions |= self.by_token.get(token, set())
+
+        ranked = [(self.score(name, self.products[i]), self.products[i]) for i in positions]
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked
+
+
+class TinyERPBatchLinker:
+    """
+    Service for linking many unlinked pieces to Tiny ERP products at once
+    """
+
+    def __init__(self, min_score=0.85, workers=4):
+        """
+        Args:
+            min_score: Minimum similarity to accept a match (0 to 1)
+            workers: Number of concurrent Tiny ERP requests
+        """
+        from .tiny_search import TinyERPSearch
+        self.tiny_search = TinyERPSearch()
+        self.min_score = min_score
+        self.workers = workers
+
+    def match_pieces(self, pieces, catalog):
+        """
+        Match pieces to catalog products
+
+        Args:
+            pieces: Iterable of unlinked Piece objects
+            catalog: List of products returned by TinyERPSearch.fetch_catalog
+
+        Returns:
+            tuple: (matches [(piece, product, score)], unmatched [(piece, reason)])
+        """
+        from .models import Piece
+
+        index = TinyCatalogIndex(catalog)
+
+        # Products already linked to some piece cannot be linked again
+        taken = set(
+            Piece.objects.filter(tiny_parent_id__isnull=False).values_list('tiny_parent_id', flat=True)
+        )
+
+        matches = []
+        unmatched = []
+
+        for piece in pieces:
+            ranked = [(score, product) for score, product in index.candidates(piece.name)
+                      if product['id'] not in taken]
+
+            if not ranked or ranked[0][0] < self.min_score:
+                unmatched.append((piece, 'sem correspondência'))
+                continue
+
+            # Close scores, or several free products with the exact same name
+            best_score, best = ranked[0]
+            if len(ranked) > 1 and best_score - ranked[1][0] < 0.02:
+                other = ranked[1][1]
+                unmatched.append((
+                    piece, f'ambíguo: "{best["name"]}" (ID {best["id"]}) / "{other["name"]}" (ID {other["id"]})'
+                ))
+                continue
+
+            taken.add(best['id'])
+            matches.append((piece, best, best_score))
+
+        return matches, unmatched
+
+    def _fetch_variations(self, product_id):
+        """
+        Fetch product details and stock per size for one product
+        Only sizes with a variation get a stock entry; None if any fetch failed
+        """
+        details = self.tiny_search.get_product_details(product_id)
+        if not details:
+            return None
+
+        variation_ids = self.tiny_search.extract_variation_ids(details)
+        stock = {}
+        for size, variation_id in variation_ids.items():
+            if not variation_id:
+                continue
+            quantity = self.tiny_search.get_variation_stock(variation_id, default=None)
+            if quantity is None:
+                return None
+            stock[size] = quantity
+        return variation_ids, stock
+
+    def link(self, matches):
+        """
+        Fetch variations/stock concurrently and bulk-write the links
+
+        Args:
+            matches: List of (piece, product, score) from match_pieces
+
+        Returns:
+            tuple: (linked pieces, failed pieces)
+        """
+        from .models import Piece
+        from .tiny_index import index_pieces
+
+        if not matches:
+            return [], []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(
+                lambda match: self._fetch_variations(match[1]['id']),
+                matches
+            ))
+
+        now = timezone.now()
+        linked = []
+        failed = []
+
+        for (piece, product, score), result in zip(matches, results):
+            if result is None:
+                failed.append(piece)
+                continue
+
+            variation_ids, stock = result
+            piece.tiny_parent_id = product['id']
+            for size in SIZES:
+                setattr(piece, f'tiny_variation_id_{size.lower()}', variation_ids[size])
+                # Sizes without a variation keep their stock
+                if size in stock:
+                    setattr(piece, f'current_stock_{size.lower()}', stock[size])
+            piece.stock_last_synced = now
+            linked.append(piece)
+
+        # bulk_update skips post_save, so no per-piece Tiny sync is triggered
+        fields = ['tiny_parent_id', 'stock_last_synced']
+        fields += [f'tiny_variation_id_{size.lower()}' for size in SIZES]
+        fields += [f'current_stock_{size.lower()}' for size in SIZES]
+        with transaction.atomic():
+            Piece.objects.bulk_update(linked, fields, batch_size=500)
+            index_pieces(linked)
+
+        self._resolve_sales(linked)
+
+        logger.info(f"Batch link completed: {len(linked)} linked, {len(failed)} failed")
+        return linked, failed
+
+    def _resolve_sales(self, pieces):
+        """Link the sales stored before the pieces were linked and refresh their statistics"""
+        from sales_stats.piece_statistics import recalculate_piece_statistics
+        from sales_stats.rollups import refresh_sales_rollups
+        from sales_stats.tiny_erp import resolve_piece_sales
+
+        resolved, _, piece_ids = resolve_piece_sales(pieces)
+        if piece_ids:
+            recalculate_piece_statistics(piece_ids)
+            refresh_sales_rollups()
+        logger.info(f"Batch link: {resolved} stored sales linked")
+
+    def run(self, pieces=None, dry_run=False):
+        """
+        Match and link unlinked pieces in one pass
+
+        Args:
+            pieces: Queryset of pieces to consider (default: all unlinked pieces)
+            dry_run: Only compute matches, without writing anything
+
+        Returns:
+            dict: {'matches', 'unmatched', 'linked', 'failed'}
+        """
+        from .models import Piece
+
+        if pieces is None:
+            pieces = Piece.objects.all()
+        pieces = list(pieces.filter(tiny_parent_id__isnull=True))
+
+        result = {'matches': [], 'unmatched': [], 'linked': [], 'failed': []}
+        if not pieces:
+            return result
+
+        catalog = self.tiny_search.fetch_catalog()
+        result['matches'], result['unmatched'] = self.match_pieces(pieces, catalog)
+
+        if not dry_run:
+            result['linked'], result['failed'] = self.link(result['matches'])
+
+        return result
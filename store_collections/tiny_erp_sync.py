@@ -8,6 +8,9 @@ from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+# Pieces whose stock changes are written to history per batch
+SYNC_CHUNK_SIZE = 200
+
 
 class TinyERPStockSync:
     """
@@ -19,7 +22,7 @@ class TinyERPStockSync:
         from .tiny_search import TinyERPSearch
         self.tiny_search = TinyERPSearch()
 
-    def sync_piece_stock(self, piece, record_history=True):
+    def sync_piece_stock(self, piece, record_history=True, changes=None):
         """
         Sync stock for a single piece from Tiny ERP using its variation IDs
         Fetches fresh stock data from Tiny ERP API for each size
@@ -28,6 +31,9 @@ class TinyERPStockSync:
         Args:
             piece: Piece object to sync
             record_history: Whether to record stock changes in history (default True)
+            changes: Optional list; the (piece, old_stock, new_stock) change is
+                appended to it instead of being recorded, so the caller can
+                record a whole batch at once (see record_changes)
 
         Returns True if successful, False otherwise
         """
@@ -95,7 +101,9 @@ class TinyERPStockSync:
             ])
 
             # Record history if enabled and there are changes
-            if record_history:
+            if record_history and changes is not None:
+                changes.append((piece, old_stock, new_stock))
+            elif record_history:
                 self._record_stock_history(piece, old_stock, new_stock)
 
             logger.info(
@@ -122,59 +130,64 @@ class TinyERPStockSync:
             old_stock: Dict with old stock values {'P': 10, 'M': 20, ...}
             new_stock: Dict with new stock values {'P': 8, 'M': 22, ...}
         """
-        from .models import StockHistory
-
-        sync_date = timezone.now()
-
-        for size in ['P', 'M', 'G', 'GG']:
-            old_value = old_stock[size]
-            new_value = new_stock[size]
-
-            # Only record if there's a change
-            if old_value != new_value:
-                difference = new_value - old_value
-
-                # Determine movement type
-                if old_value == 0 and new_value > 0:
-                    movement_type = 'inicial'
-                elif difference > 0:
-                    movement_type = 'entrada'
-                else:
-                    movement_type = 'saida'
-
-                # Create history record
-                StockHistory.objects.create(
-                    piece=piece,
-                    size=size,
-                    quantity=abs(difference),
-                    movement_type=movement_type,
-                    stock_after_movement=new_value,
-                    date=sync_date
-                )
-
-                logger.info(
-                    f"Stock history recorded: {piece.name} ({size}) - "
-                    f"{movement_type} {abs(difference)} units, stock after: {new_value}"
-                )
+        from .stock_history import record_stock_history
 
-    def sync_all_pieces(self):
+        record_stock_history(piece, old_stock, new_stock)
+
+    def record_changes(self, changes, refresh_metrics=True):
         """
-        Sync stock for all pieces that are linked to Tiny ERP
-        Returns (success_count, error_count)
+        Record a batch of (piece, old_stock, new_stock) changes and empty it
+
+        Args:
+            refresh_metrics: Refresh the metrics of the batch's pieces (False
+                when the caller refreshes once at the end)
+
+        Returns:
+            list: Created StockHistory records
         """
-        from .models import Piece
+        from .stock_history import record_stock_history_bulk
 
-        # Get all pieces that are linked to Tiny ERP (have parent ID)
-        linked_pieces = Piece.objects.filter(tiny_parent_id__isnull=False).select_related('collection')
+        records = record_stock_history_bulk(changes, refresh_metrics=refresh_metrics)
+        changes.clear()
+        return records
+
+    def sync_pieces(self, pieces, chunk_size=SYNC_CHUNK_SIZE):
+        """
+        Sync many pieces, recording their stock history once per chunk and
+        refreshing the metrics of the changed pieces once at the end
+        Returns (success_count, error_count)
+        """
+        from sales_stats.metrics import refresh_variant_metrics
 
         success_count = 0
         error_count = 0
+        changes = []
+        changed_pieces = set()
 
-        for piece in linked_pieces:
-            if self.sync_piece_stock(piece):
+        for piece in pieces:
+            if self.sync_piece_stock(piece, changes=changes):
                 success_count += 1
             else:
                 error_count += 1
+            if len(changes) >= chunk_size:
+                changed_pieces.update(record.piece_id for record in self.record_changes(changes, refresh_metrics=False))
+
+        changed_pieces.update(record.piece_id for record in self.record_changes(changes, refresh_metrics=False))
+        if changed_pieces:
+            refresh_variant_metrics(list(changed_pieces))
+        return success_count, error_count
+
+    def sync_all_pieces(self):
+        """
+        Sync stock for all pieces that are linked to Tiny ERP
+        Returns (success_count, error_count)
+        """
+        from .models import Piece
+
+        # Get all pieces that are linked to Tiny ERP (have parent ID)
+        linked_pieces = Piece.objects.filter(tiny_parent_id__isnull=False).select_related('collection')
+
+        success_count, error_count = self.sync_pieces(linked_pieces)
 
         logger.info(
             f"Stock sync completed: {success_count} successful, {error_count} errors, "
@@ -189,14 +202,7 @@ class TinyERPStockSync:
         """
         pieces = collection.pieces.filter(tiny_parent_id__isnull=False)
 
-        success_count = 0
-        error_count = 0
-
-        for piece in pieces:
-            if self.sync_piece_stock(piece):
-                success_count += 1
-            else:
-                error_count += 1
+        success_count, error_count = self.sync_pieces(pieces)
 
         logger.info(
             f"Stock sync for collection {collection.name}: "
@@ -0,0 +1,188 @@
+"""
+Tiny ERP resolution index
+Maps Tiny product IDs, variation IDs and SKUs to (piece, size) in
+TinyProductIndex, so sales can be linked to pieces with one indexed lookup
+when they are ingested instead of matching names at query time.
+
+Product and variation entries mirror the tiny_parent_id / tiny_variation_id_*
+fields of the pieces. Tiny order lines carry the variation ID and the SKU
+(codigo); the SKU of every line resolved by ID is learned (and corrected
+when a later line resolved by ID disagrees), so later lines with only the
+SKU resolve too. SKU entries whose piece and size no longer have a linked
+product/variation are dropped when the pieces are indexed.
+"""
+import logging
+from django.db import transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+# Pieces indexed per upsert
+CHUNK_SIZE = 2000
+
+INDEX_FIELDS = ['pk', 'tiny_parent_id'] + [f'tiny_variation_id_{size.lower()}' for size in SIZES]
+
+
+def _entries(row):
+    """(kind, key, piece id, size) entries of one Piece values() row"""
+    entries = []
+    if row['tiny_parent_id']:
+        entries.append(('product', str(row['tiny_parent_id']), row['pk'], ''))
+    for size in SIZES:
+        variation_id = row[f'tiny_variation_id_{size.lower()}']
+        if variation_id:
+            entries.append(('variation', str(variation_id), row['pk'], size))
+    return entries
+
+
+def _write(rows):
+    """
+    Upsert the product/variation entries of `rows`, drop the stale ones and
+    the SKU entries pointing at a piece/size no longer linked
+    """
+    from .models import TinyProductIndex
+
+    entries = [entry for row in rows for entry in _entries(row)]
+    piece_ids = [row['pk'] for row in rows]
+
+    with transaction.atomic():
+        TinyProductIndex.objects.bulk_create(
+            [TinyProductIndex(kind=kind, key=key, piece_id=piece_id, size=size)
+             for kind, key, piece_id, size in entries],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['kind', 'key'],
+            update_fields=['piece', 'size', 'updated_at'],
+        )
+        for kind in ('product', 'variation'):
+            TinyProductIndex.objects.filter(piece_id__in=piece_ids, kind=kind).exclude(
+                key__in=[key for entry_kind, key, _, _ in entries if entry_kind == kind]
+            ).delete()
+
+        owned = {(piece_id, size) for _, _, piece_id, size in entries}
+        stale_skus = [
+            pk for pk, piece_id, size in TinyProductIndex.objects.filter(
+                piece_id__in=piece_ids, kind='sku'
+            ).values_list('pk', 'piece_id', 'size')
+            if (piece_id, size) not in owned
+        ]
+        TinyProductIndex.objects.filter(pk__in=stale_skus).delete()
+
+    return len(entries)
+
+
+def index_pieces(pieces):
+    """
+    Refresh the product/variation entries of some pieces (e.g. after linking)
+
+    Returns:
+        int: Entries written
+    """
+    from .models import Piece
+
+    piece_ids = [piece.pk for piece in pieces]
+    written = 0
+    for start in range(0, len(piece_ids), CHUNK_SIZE):
+        written += _write(list(Piece.objects.filter(pk__in=piece_ids[start:start + CHUNK_SIZE]).values(*INDEX_FIELDS)))
+    return written
+
+
+def rebuild_tiny_index():
+    """
+    Rebuild the product/variation entries of every piece; learned SKUs are
+    kept while their piece and size are still linked
+
+    Returns:
+        int: Entries written
+    """
+    from .models import Piece, TinyProductIndex
+
+    linked = Q(tiny_parent_id__isnull=False)
+    for size in SIZES:
+        linked |= Q(**{f'tiny_variation_id_{size.lower()}__isnull': False})
+
+    # Entries (and learned SKUs) of pieces that were unlinked
+    TinyProductIndex.objects.exclude(piece__in=Piece.objects.filter(linked)).delete()
+
+    written = 0
+    chunk = []
+    for row in Piece.objects.filter(linked).order_by('pk').values(*INDEX_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            written += _write(chunk)
+            chunk = []
+    if chunk:
+        written += _write(chunk)
+
+    logger.info(f"Tiny product index rebuilt: {written} entries")
+    return written
+
+
+class TinyIndexResolver:
+    """
+    Resolve Tiny order lines to (piece id, size)
+    Loads the index once; lookups are dictionary hits. The exact piece name
+    (case-insensitive, unique names only) is the last resort for pieces not
+    linked to Tiny ERP, and leaves the size empty.
+    """
+
+    def __init__(self):
+        from .models import Piece, TinyProductIndex
+
+        self.index = {
+            (kind, key): (piece_id, size)
+            for kind, key, piece_id, size in TinyProductIndex.objects.values_list('kind', 'key', 'piece_id', 'size')
+        }
+
+        names = {}
+        for piece_id, name in Piece.objects.values_list('pk', 'name'):
+            key = name.strip().lower()
+            names[key] = None if key in names else piece_id
+        self.names = {name: piece_id for name, piece_id in names.items() if piece_id is not None}
+
+        # SKUs seen on lines resolved by ID: sku -> (piece id, size)
+        self.learned = {}
+
+    def resolve(self, tiny_product_id='', sku='', name=''):
+        """
+        Returns:
+            tuple: (piece id, size) or (None, '') if the line cannot be resolved
+        """
+        tiny_product_id = str(tiny_product_id or '')
+        sku = str(sku or '').strip()
+
+        for kind in ('variation', 'product'):
+            match = self.index.get((kind, tiny_product_id))
+            if match:
+                # Learn new SKUs and correct the ones now resolved elsewhere by ID
+                if sku and self.index.get(('sku', sku)) != match:
+                    self.index[('sku', sku)] = self.learned[sku] = match
+                return match
+
+        if sku and ('sku', sku) in self.index:
+            return self.index[('sku', sku)]
+
+        piece_id = self.names.get((name or '').strip().lower())
+        if piece_id:
+            return piece_id, ''
+        return None, ''
+
+    def save_learned(self):
+        """Store (or correct) the SKUs learned since the last call"""
+        from .models import TinyProductIndex
+
+        # One row per stored key, so the upsert never touches a row twice
+        learned = {sku[:100]: match for sku, match in self.learned.items()}
+        TinyProductIndex.objects.bulk_create(
+            [TinyProductIndex(kind='sku', key=key, piece_id=piece_id, size=size)
+             for key, (piece_id, size) in learned.items()],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['kind', 'key'],
+            update_fields=['piece', 'size', 'updated_at'],
+        )
+        saved = len(learned)
+        self.learned = {}
+        return saved
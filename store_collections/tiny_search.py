@@ -11,6 +11,10 @@ from django.utils import timezone
 logger = logging.getLogger(__name__)
 
 
+class TinyERPCatalogError(Exception):
+    """The Tiny ERP catalog could not be fetched completely"""
+
+
 class TinyERPSearch:
     """
     Service for searching products in Tiny ERP API
@@ -93,6 +97,90 @@ class TinyERPSearch:
             logger.error(f"Error parsing Tiny ERP search response: {e}")
             return []
 
+    def list_products_page(self, page=1):
+        """
+        Fetch one page of the Tiny ERP product catalog
+
+        Args:
+            page (int): Page number (1-based)
+
+        Returns:
+            tuple: (list of products, total number of pages)
+        """
+        if not self.api_token:
+            logger.error("Cannot list products: API token not configured")
+            return [], 0
+
+        try:
+            endpoint = f"{self.api_url}/produtos.pesquisa.php"
+
+            params = {
+                'token': self.api_token,
+                'formato': 'json',
+                'pesquisa': '',
+                'pagina': page,
+            }
+
+            response = requests.get(endpoint, params=params, timeout=30)
+            response.raise_for_status()
+
+            data = response.json()
+            retorno = data.get('retorno', {}) if isinstance(data, dict) else {}
+
+            # Check for API errors
+            if 'codigo_erro' in retorno:
+                error_code = retorno.get('codigo_erro')
+                error_message = retorno.get('erro', 'Unknown error')
+                logger.error(f"Tiny ERP API error {error_code}: {error_message}")
+                return [], 0
+
+            products = []
+            for item in retorno.get('produtos', []):
+                produto = item.get('produto', {})
+                products.append({
+                    'id': str(produto.get('id', '')),
+                    'name': produto.get('nome', ''),
+                    'sku': produto.get('codigo', ''),
+                    # 'N' = simple product, 'P' = parent, 'V' = variation
+                    'variation_type': produto.get('tipoVariacao', 'N'),
+                })
+
+            total_pages = int(retorno.get('numero_paginas', 1) or 1)
+            return products, total_pages
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error listing products page {page} in Tiny ERP: {e}")
+            return [], 0
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error parsing Tiny ERP product list response: {e}")
+            return [], 0
+
+    def fetch_catalog(self):
+        """
+        Fetch the whole Tiny ERP product catalog, page by page
+
+        Returns:
+            list: All parent/simple products (variations are skipped)
+
+        Raises:
+            TinyERPCatalogError: If any page cannot be fetched, so nothing is
+                matched against a partial catalog
+        """
+        catalog = []
+        page = 1
+        total_pages = 1
+
+        while page <= total_pages:
+            products, total_pages = self.list_products_page(page)
+            # list_products_page reports failures as 0 pages
+            if not total_pages:
+                raise TinyERPCatalogError(f"Falha ao obter a página {page} do catálogo do Tiny ERP")
+            catalog.extend(p for p in products if p['variation_type'] != 'V')
+            page += 1
+
+        logger.info(f"Fetched {len(catalog)} products from Tiny ERP catalog")
+        return catalog
+
     def get_product_details(self, product_id):
         """
         Get detailed product information including variations from Tiny ERP
@@ -146,19 +234,20 @@ class TinyERPSearch:
             logger.error(f"Error parsing Tiny ERP product details response: {e}")
             return None
 
-    def get_variation_stock(self, variation_id):
+    def get_variation_stock(self, variation_id, default=0):
         """
         Get stock for a specific product variation using produto.obter.estoque.php
 
         Args:
             variation_id (str): Variation ID in Tiny ERP
+            default: Value returned when the stock cannot be fetched
 
         Returns:
             float: Stock quantity for the variation
         """
         if not self.api_token:
             logger.error("Cannot get variation stock: API token not configured")
-            return 0
+            return default
 
         try:
             endpoint = f"{self.api_url}/produto.obter.estoque.php"
@@ -184,7 +273,7 @@ class TinyERPSearch:
                     error_code = retorno.get('codigo_erro')
                     error_message = retorno.get('erro', 'Unknown error')
                     logger.error(f"Tiny ERP API error {error_code}: {error_message}")
-                    return 0
+                    return default
 
                 # Get stock information
                 produto = retorno.get('produto', {})
@@ -193,14 +282,14 @@ class TinyERPSearch:
                 logger.info(f"Variation {variation_id} stock: {estoque}")
                 return estoque
 
-            return 0
+            return default
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching variation stock from Tiny ERP: {e}")
-            return 0
+            return default
         except (ValueError, KeyError) as e:
             logger.error(f"Error parsing Tiny ERP variation stock response: {e}")
-            return 0
+            return default
 
     def map_size_variations(self, variations):
         """
@@ -240,6 +329,35 @@ class TinyERPSearch:
         logger.info(f"Final mapped variation stock: {size_stock}")
         return size_stock
 
+    def extract_variation_ids(self, product_details):
+        """
+        Map the variations of a product to P, M, G, GG variation IDs
+
+        Args:
+            product_details (dict): Product returned by get_product_details
+
+        Returns:
+            dict: Variation ID by size {P: id, M: id, G: id, GG: id}
+        """
+        variation_ids = {'P': None, 'M': None, 'G': None, 'GG': None}
+
+        for variation in product_details.get('variacoes', []):
+            variation = variation.get('variacao', {})
+            grade = variation.get('grade', {})
+
+            # Get size and variation ID
+            size = grade.get('Tamanho', '').upper().strip()
+            variation_id = variation.get('id')
+
+            if not variation_id:
+                logger.warning(f"Variation '{size}' has no ID, skipping")
+                continue
+
+            if size in variation_ids:
+                variation_ids[size] = str(variation_id)
+
+        return variation_ids
+
     def link_piece_to_tiny(self, piece, product_id):
         """
         Link a Piece to a Tiny ERP product and sync its stock
@@ -271,28 +389,13 @@ class TinyERPSearch:
                 logger.info(f"Product has {len(variacoes)} variations")
 
                 # Map variation IDs to sizes
-                variation_ids = {'P': None, 'M': None, 'G': None, 'GG': None}
+                variation_ids = self.extract_variation_ids(product_details)
                 size_stock = {'P': 0, 'M': 0, 'G': 0, 'GG': 0}
 
-                for variation in variacoes:
-                    variation = variation.get('variacao', {})
-                    grade = variation.get('grade', {})
-
-                    # Get size and variation ID
-                    size = grade.get('Tamanho', '').upper().strip()
-                    variation_id = variation.get('id')
-
-                    if not variation_id:
-                        logger.warning(f"Variation '{size}' has no ID, skipping")
-                        continue
-
-                    # Store variation ID
-                    if size in variation_ids:
-                        variation_ids[size] = str(variation_id)
-
-                        # Fetch stock for this variation
-                        stock = self.get_variation_stock(variation_id)
-                        size_stock[size] = stock
+                # Fetch stock for each mapped variation
+                for size, variation_id in variation_ids.items():
+                    if variation_id:
+                        size_stock[size] = self.get_variation_stock(variation_id)
 
                 # Update piece with variation IDs
                 piece.tiny_variation_id_p = variation_ids['P']
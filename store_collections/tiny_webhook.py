@@ -0,0 +1,148 @@
+"""
+Tiny ERP stock webhook handling
+Applies push notifications of stock changes to Collection Pieces
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIZES = ['P', 'M', 'G', 'GG']
+
+STOCK_SYNC_FIELDS = [
+    'current_stock_p',
+    'current_stock_m',
+    'current_stock_g',
+    'current_stock_gg',
+    'stock_last_synced',
+]
+
+
+def find_piece_by_variation(variation_id, queryset=None):
+    """
+    Resolve a Tiny ERP variation ID to the piece and size it belongs to
+    Each tiny_variation_id_* column is indexed, so this is a single indexed lookup
+
+    Args:
+        variation_id (str): Variation ID in Tiny ERP
+        queryset: Optional Piece queryset (e.g. with select_for_update)
+
+    Returns:
+        tuple: (piece, size) or (None, None) if the variation is not linked
+    """
+    from .models import Piece
+
+    variation_id = str(variation_id)
+    if queryset is None:
+        queryset = Piece.objects.all()
+
+    lookup = Q()
+    for size in SIZES:
+        lookup |= Q(**{f'tiny_variation_id_{size.lower()}': variation_id})
+
+    piece = queryset.filter(lookup).first()
+    if not piece:
+        return None, None
+
+    for size in SIZES:
+        if getattr(piece, f'tiny_variation_id_{size.lower()}') == variation_id:
+            return piece, size
+
+    return None, None
+
+
+def parse_stock_notification(payload):
+    """
+    Extract variation ID and new balance from a Tiny ERP stock notification
+
+    Expected format:
+        {"tipo": "estoque", "dados": {"idProduto": 123, "saldo": 10, ...}}
+
+    Returns:
+        tuple: (variation_id, balance) or (None, None) if invalid
+    """
+    if not isinstance(payload, dict) or payload.get('tipo', 'estoque') != 'estoque':
+        return None, None
+
+    dados = payload.get('dados') or {}
+    variation_id = dados.get('idProduto')
+    balance = dados.get('saldo')
+
+    if variation_id in (None, '') or balance is None:
+        return None, None
+
+    try:
+        balance = max(0, int(float(balance)))
+    except (TypeError, ValueError):
+        return None, None
+
+    return str(variation_id), balance
+
+
+def apply_variation_stock(variation_id, balance, verify=True):
+    """
+    Apply a new stock balance for one variation
+    Updates the piece stock and its history row in a single transaction
+
+    Args:
+        variation_id (str): Variation ID in Tiny ERP
+        balance (int): New stock balance reported by Tiny ERP
+        verify (bool): Queue a verification fetch after commit
+
+    Returns:
+        tuple: (piece, size, changed) - piece is None if the variation is unknown
+    """
+    from .models import Piece
+    from .stock_history import record_stock_history
+
+    with transaction.atomic():
+        piece, size = find_piece_by_variation(
+            variation_id,
+            queryset=Piece.objects.select_for_update()
+        )
+
+        if piece is None:
+            logger.warning(f"Stock notification for unknown variation {variation_id}")
+            return None, None, False
+
+        field = f'current_stock_{size.lower()}'
+        old_value = getattr(piece, field)
+        changed = old_value != balance
+
+        setattr(piece, field, balance)
+        piece.stock_last_synced = timezone.now()
+        # Same update_fields as a regular stock sync, so piece_saved does not re-sync
+        piece.save(update_fields=STOCK_SYNC_FIELDS)
+
+        if changed:
+            record_stock_history(piece, {size: old_value}, {size: balance}, date=piece.stock_last_synced)
+
+        if verify:
+            from .tasks import verify_variation_stock_task
+            transaction.on_commit(lambda: verify_variation_stock_task.apply_async(
+                args=[variation_id],
+                countdown=settings.TINY_WEBHOOK_VERIFY_DELAY
+            ))
+
+    logger.info(
+        f"Webhook stock update: {piece.name} ({size}) {old_value} -> {balance}"
+    )
+    return piece, size, changed
+
+
+def apply_stock_notification(payload, verify=True):
+    """
+    Apply a Tiny ERP stock notification payload
+
+    Returns:
+        tuple: (piece, size, changed) - piece is None if nothing was applied
+    """
+    variation_id, balance = parse_stock_notification(payload)
+    if variation_id is None:
+        logger.warning(f"Invalid Tiny ERP stock notification: {payload}")
+        return None, None, False
+
+    return apply_variation_stock(variation_id, balance, verify=verify)
@@ -16,6 +16,7 @@ urlpatterns = [
     path('fabrics/', views.fabrics_list, name='fabrics_list'),
     # Inventory/Stock page
     path('inventory/', views.inventory_stock, name='inventory_stock'),
+    path('api/stock/as-of/', views.stock_as_of_api, name='stock_as_of'),
     # Accessories search
     path('api/accessories/search/', views.search_accessories, name='search_accessories'),
     # Tiny ERP integration
@@ -23,6 +24,7 @@ urlpatterns = [
     path('api/tiny/link/', views.link_tiny_product, name='link_tiny_product'),
     path('api/sync-piece/<int:piece_id>/', views.sync_single_piece, name='sync_single_piece'),
     path('api/sync-all-pieces/', views.sync_all_pieces_endpoint, name='sync_all_pieces'),
+    path('api/tiny/webhook/stock/', views.tiny_stock_webhook, name='tiny_stock_webhook'),
     # Debug
     path('debug/tiny/', views.tiny_debug, name='tiny_debug'),
 ]
@@ -1,7 +1,9 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from .models import Collection, Piece, Fabric
 from .forms import CollectionForm, PieceForm
@@ -432,6 +434,120 @@ def link_tiny_product(request):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["GET"])
+def stock_as_of_api(request):
+    """
+    JSON endpoint with the stock of every variant at a given moment
+    ?date=AAAA-MM-DD (end of day) or AAAA-MM-DDTHH:MM, or ?month=AAAA-MM (month end)
+    """
+    from datetime import date, datetime, time
+    from django.utils import timezone
+    from .stock_snapshots import inventory_valuation, month_end
+
+    date_param = request.GET.get('date', '').strip()
+    month_param = request.GET.get('month', '').strip()
+
+    try:
+        if month_param:
+            moment = month_end(date.fromisoformat(f'{month_param}-01'))
+        elif 'T' in date_param:
+            moment = datetime.fromisoformat(date_param)
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+        elif date_param:
+            moment = timezone.make_aware(datetime.combine(date.fromisoformat(date_param), time.max))
+        else:
+            return JsonResponse({
+                'success': False,
+                'error': 'Informe a data (date) ou o mês (month)'
+            }, status=400)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Data inválida, use AAAA-MM-DD, AAAA-MM-DDTHH:MM ou AAAA-MM'
+        }, status=400)
+
+    valuation = inventory_valuation(moment)
+
+    return JsonResponse({
+        'success': True,
+        'as_of': moment.isoformat(),
+        'from_snapshot': valuation['from_snapshot'],
+        'total_units': valuation['total_units'],
+        'total_value': float(valuation['total_value']),
+        'variants': [
+            {
+                'piece_id': variant['piece_id'],
+                'piece_name': variant['piece_name'],
+                'size': variant['size'],
+                'stock': variant['stock'],
+                'unit_cost': float(variant['unit_cost']),
+                'value': float(variant['value']),
+            }
+            for variant in valuation['variants']
+        ],
+    })
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def tiny_stock_webhook(request):
+    """
+    Webhook receiver for Tiny ERP stock notifications
+    Updates the stock of the notified variation without polling the catalog
+    """
+    import json
+    from .tiny_webhook import apply_variation_stock, parse_stock_notification
+
+    if not settings.TINY_WEBHOOK_TOKEN or request.GET.get('token') != settings.TINY_WEBHOOK_TOKEN:
+        return JsonResponse({
+            'success': False,
+            'error': 'Token inválido'
+        }, status=403)
+
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Dados JSON inválidos'
+        }, status=400)
+
+    variation_id, balance = parse_stock_notification(payload)
+    if variation_id is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Notificação de estoque inválida'
+        }, status=400)
+
+    try:
+        piece, size, changed = apply_variation_stock(
+            variation_id, balance, verify=settings.TINY_WEBHOOK_VERIFY
+        )
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Erro ao aplicar notificação: {str(e)}'
+        }, status=500)
+
+    # Unknown variations are acknowledged so Tiny does not keep retrying them
+    if piece is None:
+        return JsonResponse({
+            'success': True,
+            'applied': False,
+            'message': 'Variação não vinculada a nenhuma peça'
+        })
+
+    return JsonResponse({
+        'success': True,
+        'applied': True,
+        'piece_id': piece.id,
+        'size': size,
+        'changed': changed,
+    })
+
+
 @login_required
 def tiny_debug(request):
     """
@@ -28,6 +28,22 @@ app.conf.beat_schedule = {
             'expires': 3600,  # Task expires after 1 hour if not executed
         },
     },
+    'create-stock-partitions-monthly': {
+        'task': 'store_collections.tasks.create_stock_partitions_task',
+        'schedule': crontab(day_of_month=1, hour=1, minute=0),  # Run monthly on day 1 at 01:00
+    },
+    'snapshot-monthly-stock': {
+        'task': 'store_collections.tasks.snapshot_monthly_stock_task',
+        'schedule': crontab(day_of_month=1, hour=1, minute=30),  # After the daily sync closed the month
+    },
+    'generate-sales-forecasts': {
+        'task': 'sales_stats.tasks.generate_forecasts_task',
+        'schedule': crontab(hour=3, minute=0),  # Run daily after the stock sync
+    },
+    'archive-old-data-monthly': {
+        'task': 'sales_stats.tasks.archive_old_data_task',
+        'schedule': crontab(day_of_month=1, hour=2, minute=0),  # After the monthly stock snapshot
+    },
 }
 
 # Timezone configuration
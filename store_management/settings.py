@@ -160,3 +160,36 @@ CELERY_ENABLE_UTC = True
 
 # Celery Beat Configuration
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Tiny ERP stock webhook
+# Token expected in the ?token= query string of the webhook URL configured in Tiny
+TINY_WEBHOOK_TOKEN = os.getenv('TINY_WEBHOOK_TOKEN', '')
+# Queue a verification fetch of the variation stock after each notification
+TINY_WEBHOOK_VERIFY = os.getenv('TINY_WEBHOOK_VERIFY', 'True') == 'True'
+# Seconds to wait before re-fetching a variation stock after a notification
+TINY_WEBHOOK_VERIFY_DELAY = int(os.getenv('TINY_WEBHOOK_VERIFY_DELAY', '60'))
+
+# Cold-storage archival (sales_stats.archive)
+# Rows older than the retention period are moved to gzip CSV files under ARCHIVE_ROOT
+ARCHIVE_ROOT = os.getenv('ARCHIVE_ROOT', str(BASE_DIR / 'archive'))
+# Days kept in the live tables; 0 (the default) disables archival of that table,
+# archived rows are deleted from the database, so operators turn it on explicitly
+STOCK_HISTORY_RETENTION_DAYS = int(os.getenv('STOCK_HISTORY_RETENTION_DAYS', '0'))
+SALES_DATA_RETENTION_DAYS = int(os.getenv('SALES_DATA_RETENTION_DAYS', '0'))
+
+# Columnar analytics export (sales_stats.columnar), Arrow IPC files per dataset
+ANALYTICS_EXPORT_ROOT = os.getenv('ANALYTICS_EXPORT_ROOT', str(BASE_DIR / 'analytics'))
+
+# Replenishment runs are computed by a Celery worker; set to False to compute in the request
+REPLENISHMENT_RUN_ASYNC = os.getenv('REPLENISHMENT_RUN_ASYNC', 'True') == 'True'
+
+# Fill the leftover of the rounded-up fabric rolls with the MILP optimizer (sales_stats.roll_optimizer)
+REPLENISHMENT_OPTIMIZE_ROLLS = os.getenv('REPLENISHMENT_OPTIMIZE_ROLLS', 'True') == 'True'
+REPLENISHMENT_OPTIMIZER_TIME_LIMIT = float(os.getenv('REPLENISHMENT_OPTIMIZER_TIME_LIMIT', '2'))
+
+# Model of the nightly forecasts (sales_stats.forecasting.MODELS); with damped_trend the task
+# runs `manage.py generate_forecasts` in a child process, since Celery prefork workers are
+# daemon processes that cannot start the process pool
+FORECAST_MODEL = os.getenv('FORECAST_MODEL', 'ses')
+# Processes fitting per-series forecast models (sales_stats.parallel); 0 uses every core
+FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', '0'))